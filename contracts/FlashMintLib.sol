@@ -40,59 +40,57 @@ library FlashMintLib {
     ILendingPool private constant lendingPool =
         ILendingPool(0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9);
 
+    // Aave oracle prices (in ETH) of the token and DAI, and the unit of the token
+    struct PriceContext {
+        uint256 tokenPrice;
+        uint256 daiPrice;
+        uint256 tokenUnit;
+    }
+
     bytes32 public constant CALLBACK_SUCCESS =
         keccak256("ERC3156FlashBorrower.onFlashLoan");
 
     uint16 private constant referral = 7; // Yearn's aave referral code
 
+    // The price oracle and the decimals of the token are cached in the storage
+    // of the strategy delegatecalling this library, at hashed slots that can't
+    // collide with its own variables
+    bytes32 private constant ORACLE_SLOT = keccak256("FlashMintLib.priceOracle");
+    bytes32 private constant TOKEN_SLOT = keccak256("FlashMintLib.token");
+    uint256 private constant CACHE_MAX_AGE = 1 days;
+
     function doFlashMint(
         bool deficit,
         uint256 amountDesired,
         address token,
         uint256 collatRatioDAI,
-        uint256 depositToCloseLTVGap
+        uint256 depositToCloseLTVGap,
+        uint256 borrowHeadroom
     ) public returns (uint256 amount) {
         if (amountDesired == 0) {
             return 0;
         }
-        amount = amountDesired;
-        address dai = DAI;
-
-        // calculate amount of dai we need
-        uint256 requiredDAI;
-        {
-            requiredDAI = _toDAI(amount, token).mul(COLLAT_RATIO_PRECISION).div(
-                collatRatioDAI
-            );
-
-            uint256 requiredDAIToCloseLTVGap = 0;
-            if (depositToCloseLTVGap > 0) {
-                requiredDAIToCloseLTVGap = _toDAI(depositToCloseLTVGap, token);
-                requiredDAI = requiredDAI.add(requiredDAIToCloseLTVGap);
-            }
-
-            uint256 _maxLiquidity = maxLiquidity();
-            if (requiredDAI > _maxLiquidity) {
-                requiredDAI = _maxLiquidity;
-                // NOTE: if we cap amountDAI, we reduce amountToken we are taking too
-                amount = _fromDAI(
-                    requiredDAI.sub(requiredDAIToCloseLTVGap),
-                    token
-                )
-                    .mul(collatRatioDAI)
-                    .div(COLLAT_RATIO_PRECISION);
-            }
+        if (!_isCacheFresh(token)) {
+            refreshCache(token);
         }
+        uint256 requiredDAI;
+        (amount, requiredDAI) = _flashMintAmounts(
+            amountDesired,
+            token,
+            collatRatioDAI,
+            depositToCloseLTVGap,
+            borrowHeadroom
+        );
 
+        address dai = DAI;
         bytes memory data = abi.encode(deficit, amount);
         uint256 _fee = IERC3156FlashLender(LENDER).flashFee(dai, requiredDAI);
         // Check that fees have not been increased without us knowing
         require(_fee == 0);
-        uint256 _allowance =
-            IERC20(dai).allowance(address(this), address(LENDER));
-        if (_allowance < requiredDAI) {
-            IERC20(dai).approve(address(LENDER), 0);
-            IERC20(dai).approve(address(LENDER), type(uint256).max);
+        // approved on first use, the strategy doesn't approve them at initialization
+        _approveMax(dai, LENDER, requiredDAI);
+        if (token != dai) {
+            _approveMax(dai, address(lendingPool), requiredDAI);
         }
         IERC3156FlashLender(LENDER).flashLoan(
             IERC3156FlashBorrower(address(this)),
@@ -113,6 +111,65 @@ library FlashMintLib {
         return amount; // we need to return the amount of Token we have changed our position in
     }
 
+    // the amount of token doFlashMint would change the position by and the DAI it would mint
+    function quoteFlashMint(
+        uint256 amountDesired,
+        address token,
+        uint256 collatRatioDAI,
+        uint256 depositToCloseLTVGap,
+        uint256 borrowHeadroom
+    ) public view returns (uint256 amount, uint256 requiredDAI) {
+        if (amountDesired == 0) {
+            return (0, 0);
+        }
+        return
+            _flashMintAmounts(
+                amountDesired,
+                token,
+                collatRatioDAI,
+                depositToCloseLTVGap,
+                borrowHeadroom
+            );
+    }
+
+    // calculate amount of dai we need, the prices are fetched once for all the conversions
+    // NOTE: borrowHeadroom is the part of amount our own collateral already covers
+    function _flashMintAmounts(
+        uint256 amountDesired,
+        address token,
+        uint256 collatRatioDAI,
+        uint256 depositToCloseLTVGap,
+        uint256 borrowHeadroom
+    ) internal view returns (uint256 amount, uint256 requiredDAI) {
+        // with DAI as want the minted DAI is the collateral, loanLogic withdraws
+        // requiredDAI - amount of it, so it has to back the whole amount
+        if (token == DAI) {
+            borrowHeadroom = 0;
+        }
+        PriceContext memory prices = _priceContext(token);
+        amount = amountDesired;
+        requiredDAI = _toDAI(amount.sub(borrowHeadroom), prices)
+            .mul(COLLAT_RATIO_PRECISION)
+            .div(collatRatioDAI);
+
+        uint256 requiredDAIToCloseLTVGap =
+            _toDAI(depositToCloseLTVGap, prices);
+        requiredDAI = requiredDAI.add(requiredDAIToCloseLTVGap);
+
+        uint256 _maxLiquidity = maxLiquidity();
+        if (requiredDAI > _maxLiquidity) {
+            requiredDAI = _maxLiquidity;
+            // NOTE: if we cap amountDAI, we reduce amountToken we are taking too
+            amount = _fromDAI(
+                requiredDAI.sub(requiredDAIToCloseLTVGap),
+                prices
+            )
+                .mul(collatRatioDAI)
+                .div(COLLAT_RATIO_PRECISION)
+                .add(borrowHeadroom);
+        }
+    }
+
     function loanLogic(
         bool deficit,
         uint256 amount,
@@ -179,74 +236,116 @@ library FlashMintLib {
         return CALLBACK_SUCCESS;
     }
 
-    function _priceOracle() internal view returns (IPriceOracle) {
+    function _approveMax(
+        address token,
+        address spender,
+        uint256 amount
+    ) private {
+        uint256 _allowance = IERC20(token).allowance(address(this), spender);
+        if (_allowance < amount) {
+            IERC20(token).approve(spender, 0);
+            IERC20(token).approve(spender, type(uint256).max);
+        }
+    }
+
+    function refreshCache(address token) public {
+        address oracle =
+            protocolDataProvider.ADDRESSES_PROVIDER().getPriceOracle();
+        uint256 decimals = uint256(IOptionalERC20(token).decimals());
+        _store(ORACLE_SLOT, uint256(oracle) | (block.timestamp << 160));
+        _store(TOKEN_SLOT, uint256(token) | (decimals << 160));
+    }
+
+    function _isCacheFresh(address token) internal view returns (bool) {
+        uint256 updatedAt = _load(ORACLE_SLOT) >> 160;
         return
-            IPriceOracle(
-                protocolDataProvider.ADDRESSES_PROVIDER().getPriceOracle()
-            );
+            updatedAt > 0 &&
+            block.timestamp <= updatedAt.add(CACHE_MAX_AGE) &&
+            address(_load(TOKEN_SLOT)) == token;
+    }
+
+    function _priceOracle() internal view returns (IPriceOracle) {
+        uint256 cached = _load(ORACLE_SLOT);
+        if (cached == 0) {
+            return
+                IPriceOracle(
+                    protocolDataProvider.ADDRESSES_PROVIDER().getPriceOracle()
+                );
+        }
+        return IPriceOracle(address(cached));
     }
 
-    function _toDAI(uint256 _amount, address asset)
+    function _tokenUnit(address token) internal view returns (uint256) {
+        uint256 cached = _load(TOKEN_SLOT);
+        if (address(cached) == token) {
+            return uint256(10)**(cached >> 160);
+        }
+        return uint256(10)**uint256(IOptionalERC20(token).decimals());
+    }
+
+    function _load(bytes32 slot) private view returns (uint256 value) {
+        assembly {
+            value := sload(slot)
+        }
+    }
+
+    function _store(bytes32 slot, uint256 value) private {
+        assembly {
+            sstore(slot, value)
+        }
+    }
+
+    function _priceContext(address token)
         internal
         view
-        returns (uint256)
+        returns (PriceContext memory)
     {
-        address dai = DAI;
-        if (
-            _amount == 0 || _amount == type(uint256).max || asset == dai // 1:1 change
-        ) {
-            return _amount;
+        if (token == DAI) {
+            // 1:1 change
+            return PriceContext(DAI_DECIMALS, DAI_DECIMALS, DAI_DECIMALS);
         }
 
-        if (asset == WETH) {
+        if (token == WETH) {
             return
-                _amount
-                    .mul(uint256(10)**uint256(IOptionalERC20(dai).decimals()))
-                    .div(_priceOracle().getAssetPrice(dai));
+                PriceContext(
+                    1 ether,
+                    _priceOracle().getAssetPrice(DAI),
+                    1 ether
+                );
         }
 
         address[] memory tokens = new address[](2);
-        tokens[0] = asset;
-        tokens[1] = dai;
+        tokens[0] = token;
+        tokens[1] = DAI;
         uint256[] memory prices = _priceOracle().getAssetsPrices(tokens);
 
-        uint256 ethPrice =
-            _amount.mul(prices[0]).div(
-                uint256(10)**uint256(IOptionalERC20(asset).decimals())
-            );
-        return ethPrice.mul(DAI_DECIMALS).div(prices[1]);
+        return PriceContext(prices[0], prices[1], _tokenUnit(token));
     }
 
-    function _fromDAI(uint256 _amount, address asset)
+    function _toDAI(uint256 _amount, PriceContext memory prices)
         internal
-        view
+        pure
         returns (uint256)
     {
-        address dai = DAI;
-        if (
-            _amount == 0 || _amount == type(uint256).max || asset == dai // 1:1 change
-        ) {
+        if (_amount == 0 || _amount == type(uint256).max) {
             return _amount;
         }
 
-        if (asset == WETH) {
-            return
-                _amount.mul(_priceOracle().getAssetPrice(dai)).div(
-                    uint256(10)**uint256(IOptionalERC20(dai).decimals())
-                );
-        }
-
-        address[] memory tokens = new address[](2);
-        tokens[0] = asset;
-        tokens[1] = dai;
-        uint256[] memory prices = _priceOracle().getAssetsPrices(tokens);
+        uint256 ethPrice = _amount.mul(prices.tokenPrice).div(prices.tokenUnit);
+        return ethPrice.mul(DAI_DECIMALS).div(prices.daiPrice);
+    }
 
-        uint256 ethPrice = _amount.mul(prices[1]).div(DAI_DECIMALS);
+    function _fromDAI(uint256 _amount, PriceContext memory prices)
+        internal
+        pure
+        returns (uint256)
+    {
+        if (_amount == 0 || _amount == type(uint256).max) {
+            return _amount;
+        }
 
-        return
-            ethPrice
-                .mul(uint256(10)**uint256(IOptionalERC20(asset).decimals()))
-                .div(prices[0]);
+        uint256 ethPrice = _amount.mul(prices.daiPrice).div(DAI_DECIMALS);
+        return ethPrice.mul(prices.tokenUnit).div(prices.tokenPrice);
     }
 
     function maxLiquidity() public view returns (uint256) {
@@ -36,22 +36,63 @@ contract LevAaveFactory {
         external
         returns (address payable newStrategy)
     {
-        // Copied from https://github.com/optionality/clone-factory/blob/master/contracts/CloneFactory.sol
-        bytes20 addressBytes = bytes20(original);
+        newStrategy = _cloneLevAave(_vault, 0, false);
+    }
+
+    // one clone per vault, to roll out many strategies in a single tx
+    function cloneLevAaveBatch(address[] calldata _vaults)
+        external
+        returns (address payable[] memory newStrategies)
+    {
+        newStrategies = new address payable[](_vaults.length);
+        for (uint256 i = 0; i < _vaults.length; i++) {
+            newStrategies[i] = _cloneLevAave(_vaults[i], 0, false);
+        }
+    }
+
+    // CREATE2 clone at predictCloneAddress(msg.sender, _salt)
+    function cloneLevAaveDeterministic(address _vault, bytes32 _salt)
+        external
+        returns (address payable newStrategy)
+    {
+        newStrategy = _cloneLevAave(_vault, _salt, true);
+    }
+
+    function predictCloneAddress(address _deployer, bytes32 _salt)
+        external
+        view
+        returns (address)
+    {
+        bytes32 hash =
+            keccak256(
+                abi.encodePacked(
+                    bytes1(0xff),
+                    address(this),
+                    _deployerSalt(_deployer, _salt),
+                    keccak256(_cloneCode())
+                )
+            );
+        return address(uint256(hash));
+    }
+
+    function _cloneLevAave(
+        address _vault,
+        bytes32 _salt,
+        bool _deterministic
+    ) internal returns (address payable newStrategy) {
+        bytes memory cloneCode = _cloneCode();
+        // salts are per deployer so nobody can take someone else's address
+        bytes32 salt = _deployerSalt(msg.sender, _salt);
         assembly {
-            // EIP-1167 bytecode
-            let clone_code := mload(0x40)
-            mstore(
-                clone_code,
-                0x3d602d80600a3d3981f3363d3d373d3d3d363d73000000000000000000000000
-            )
-            mstore(add(clone_code, 0x14), addressBytes)
-            mstore(
-                add(clone_code, 0x28),
-                0x5af43d82803e903d91602b57fd5bf30000000000000000000000000000000000
-            )
-            newStrategy := create(0, clone_code, 0x37)
+            switch _deterministic
+                case 0 {
+                    newStrategy := create(0, add(cloneCode, 0x20), 0x37)
+                }
+                default {
+                    newStrategy := create2(0, add(cloneCode, 0x20), 0x37, salt)
+                }
         }
+        require(newStrategy != address(0)); // dev: clone failed
 
         Strategy(newStrategy).initialize(
             _vault,
@@ -62,4 +103,22 @@ contract LevAaveFactory {
 
         emit Cloned(newStrategy);
     }
+
+    // EIP-1167 bytecode, from https://github.com/optionality/clone-factory/blob/master/contracts/CloneFactory.sol
+    function _cloneCode() internal view returns (bytes memory) {
+        return
+            abi.encodePacked(
+                hex"3d602d80600a3d3981f3363d3d373d3d3d363d73",
+                original,
+                hex"5af43d82803e903d91602b57fd5bf3"
+            );
+    }
+
+    function _deployerSalt(address _deployer, bytes32 _salt)
+        internal
+        pure
+        returns (bytes32)
+    {
+        return keccak256(abi.encodePacked(_deployer, _salt));
+    }
 }
@@ -59,6 +59,32 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
     // 2 = cooldown initiated, future claim period
     enum CooldownStatus {None, Claim, Initiated}
 
+    // everything a monitor needs about the position, see getPositionSnapshot
+    struct PositionSnapshot {
+        uint256 deposits;
+        uint256 borrows;
+        uint256 collatRatio;
+        uint256 targetCollatRatio;
+        uint256 maxCollatRatio;
+        uint256 maxBorrowCollatRatio;
+        uint256 liquidationThreshold;
+        uint256 pendingStkAave;
+        uint256 stkAaveBalance;
+        uint256 aaveBalance;
+        uint256 wantBalance;
+        CooldownStatus cooldownStatus;
+    }
+
+    // what liquidatePosition would do, see quoteFreeFunds
+    struct FreeFundsQuote {
+        uint256 amountFreed;
+        uint256 iterations;
+        uint256 flashMints;
+        uint256 aaveCalls;
+        uint256 deposits;
+        uint256 borrows;
+    }
+
     // SWAP routers
     IUni private constant UNI_V2_ROUTER =
         IUni(0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D);
@@ -71,33 +97,36 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
     uint256 private constant DEFAULT_COLLAT_TARGET_MARGIN = 0.02 ether;
     uint256 private constant DEFAULT_COLLAT_MAX_MARGIN = 0.005 ether;
     uint256 private constant LIQUIDATION_WARNING_THRESHOLD = 0.01 ether;
-
-    uint256 public maxBorrowCollatRatio; // The maximum the aave protocol will let us borrow
-    uint256 public targetCollatRatio; // The LTV we are levering up to
-    uint256 public maxCollatRatio; // Closest to liquidation we'll risk
-    uint256 public daiBorrowCollatRatio; // Used for flashmint
-
+    // gas a deleverage keeps for one more flash mint and the rest of the tx
+    uint256 private constant MIN_GAS_PER_FLASH_MINT = 1_500_000;
+
+    // The config is packed so that a position change loads the ratios and the
+    // operational state from two slots. Ratios are 1e18 scaled, below 1 ether.
+    uint64 public maxBorrowCollatRatio; // The maximum the aave protocol will let us borrow
+    uint64 public targetCollatRatio; // The LTV we are levering up to
+    uint64 public maxCollatRatio; // Closest to liquidation we'll risk
+    uint64 public daiBorrowCollatRatio; // Used for flashmint
+
+    uint128 public minWant;
+    uint64 public minRatio;
     uint8 public maxIterations;
     bool public isFlashMintActive;
     bool public withdrawCheck;
-
-    uint256 public minWant;
-    uint256 public minRatio;
-    uint256 public minRewardToSell;
+    bool private alreadyAdjusted; // Signal whether a position adjust was done in prepareReturn
 
     enum SwapRouter {UniV2, SushiV2, UniV3}
-    SwapRouter public swapRouter = SwapRouter.UniV2; // only applied to aave => want, stkAave => aave always uses v3
 
+    uint96 public minRewardToSell;
+    // gas of claiming and selling rewards, harvests skip them while they are worth less
+    uint32 public rewardClaimGas;
+    SwapRouter public swapRouter = SwapRouter.UniV2; // only applied to aave => want, stkAave => aave always uses v3
     bool public sellStkAave;
     bool public cooldownStkAave;
-    uint256 public maxStkAavePriceImpactBps;
-
+    uint16 public maxStkAavePriceImpactBps;
     uint24 public stkAaveToAaveSwapFee;
     uint24 public aaveToWethSwapFee;
     uint24 public wethToWantSwapFee;
 
-    bool private alreadyAdjusted; // Signal whether a position adjust was done in prepareReturn
-
     uint16 private constant referral = 7; // Yearn's aave referral code
 
     uint256 private constant MAX_BPS = 1e4;
@@ -132,6 +161,7 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         minWant = 100;
         minRatio = 0.005 ether;
         minRewardToSell = 1e15;
+        rewardClaimGas = 500_000;
 
         // reward params
         swapRouter = SwapRouter.UniV2;
@@ -154,13 +184,15 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         // Let collateral targets
         (uint256 ltv, uint256 liquidationThreshold) =
             getProtocolCollatRatios(address(want));
-        targetCollatRatio = liquidationThreshold.sub(
-            DEFAULT_COLLAT_TARGET_MARGIN
+        targetCollatRatio = uint64(
+            liquidationThreshold.sub(DEFAULT_COLLAT_TARGET_MARGIN)
+        );
+        maxCollatRatio = uint64(
+            liquidationThreshold.sub(DEFAULT_COLLAT_MAX_MARGIN)
         );
-        maxCollatRatio = liquidationThreshold.sub(DEFAULT_COLLAT_MAX_MARGIN);
-        maxBorrowCollatRatio = ltv.sub(DEFAULT_COLLAT_MAX_MARGIN);
+        maxBorrowCollatRatio = uint64(ltv.sub(DEFAULT_COLLAT_MAX_MARGIN));
         (uint256 daiLtv, ) = getProtocolCollatRatios(dai);
-        daiBorrowCollatRatio = daiLtv.sub(DEFAULT_COLLAT_MAX_MARGIN);
+        daiBorrowCollatRatio = uint64(daiLtv.sub(DEFAULT_COLLAT_MAX_MARGIN));
 
         DECIMALS = 10**vault.decimals();
 
@@ -168,18 +200,7 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         approveMaxSpend(address(want), address(lendingPool));
         approveMaxSpend(address(aToken), address(lendingPool));
 
-        // approve flashloan spend
-        address _dai = dai;
-        if (address(want) != _dai) {
-            approveMaxSpend(_dai, address(lendingPool));
-        }
-        approveMaxSpend(_dai, FlashMintLib.LENDER);
-
-        // approve swap router spend
-        approveMaxSpend(address(stkAave), address(UNI_V3_ROUTER));
-        approveMaxSpend(aave, address(UNI_V2_ROUTER));
-        approveMaxSpend(aave, address(SUSHI_V2_ROUTER));
-        approveMaxSpend(aave, address(UNI_V3_ROUTER));
+        // flash mint and swap router spend is approved on first use
     }
 
     // SETTERS
@@ -198,10 +219,11 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         require(_maxBorrowCollatRatio < ltv);
         require(_daiBorrowCollatRatio < daiLtv);
 
-        targetCollatRatio = _targetCollatRatio;
-        maxCollatRatio = _maxCollatRatio;
-        maxBorrowCollatRatio = _maxBorrowCollatRatio;
-        daiBorrowCollatRatio = _daiBorrowCollatRatio;
+        // all below aave's ratios, so below 1 ether
+        targetCollatRatio = uint64(_targetCollatRatio);
+        maxCollatRatio = uint64(_maxCollatRatio);
+        maxBorrowCollatRatio = uint64(_maxBorrowCollatRatio);
+        daiBorrowCollatRatio = uint64(_daiBorrowCollatRatio);
     }
 
     function setIsFlashMintActive(bool _isFlashMintActive)
@@ -222,8 +244,9 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
     ) external onlyVaultManagers {
         require(_minRatio < maxBorrowCollatRatio);
         require(_maxIterations > 0 && _maxIterations < 16);
-        minWant = _minWant;
-        minRatio = _minRatio;
+        require(_minWant <= type(uint128).max);
+        minWant = uint128(_minWant);
+        minRatio = uint64(_minRatio);
         maxIterations = _maxIterations;
     }
 
@@ -243,16 +266,31 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
                 _swapRouter == SwapRouter.UniV3
         );
         require(_maxStkAavePriceImpactBps <= MAX_BPS);
+        require(_minRewardToSell <= type(uint96).max);
         swapRouter = _swapRouter;
         sellStkAave = _sellStkAave;
         cooldownStkAave = _cooldownStkAave;
-        minRewardToSell = _minRewardToSell;
-        maxStkAavePriceImpactBps = _maxStkAavePriceImpactBps;
+        minRewardToSell = uint96(_minRewardToSell);
+        maxStkAavePriceImpactBps = uint16(_maxStkAavePriceImpactBps);
         stkAaveToAaveSwapFee = _stkAaveToAaveSwapFee;
         aaveToWethSwapFee = _aaveToWethSwapFee;
         wethToWantSwapFee = _wethToWantSwapFee;
     }
 
+    // 0 claims and sells rewards on every harvest
+    function setRewardClaimGas(uint256 _rewardClaimGas)
+        external
+        onlyVaultManagers
+    {
+        require(_rewardClaimGas <= type(uint32).max);
+        rewardClaimGas = uint32(_rewardClaimGas);
+    }
+
+    // permissionless, picks up changes to the aave price oracle or decimals
+    function refreshAaveCache() external {
+        FlashMintLib.refreshCache(address(want));
+    }
+
     function name() external view override returns (string memory) {
         return "StrategyGenLevAAVE-Flashmint";
     }
@@ -300,8 +338,10 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
             uint256 _debtPayment
         )
     {
-        // claim & sell rewards
-        _claimAndSellRewards();
+        // claim & sell rewards, unless the gas costs more than they are worth
+        if (_rewardsWorthClaiming()) {
+            _claimAndSellRewards();
+        }
 
         // account for profit / losses
         uint256 totalDebt = vault.strategies(address(this)).totalDebt;
@@ -379,6 +419,7 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         }
         // check current position
         uint256 currentCollatRatio = getCurrentCollatRatio();
+        uint256 _targetCollatRatio = targetCollatRatio;
 
         // Either we need to free some funds OR we want to be max levered
         if (_debtOutstanding > wantBalance) {
@@ -387,19 +428,19 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
 
             // NOTE: vault will take free funds during the next harvest
             _freeFunds(amountRequired);
-        } else if (currentCollatRatio < targetCollatRatio) {
+        } else if (currentCollatRatio < _targetCollatRatio) {
             // we should lever up
-            if (targetCollatRatio.sub(currentCollatRatio) > minRatio) {
+            if (_targetCollatRatio.sub(currentCollatRatio) > minRatio) {
                 // we only act on relevant differences
                 _leverMax();
             }
-        } else if (currentCollatRatio > targetCollatRatio) {
-            if (currentCollatRatio.sub(targetCollatRatio) > minRatio) {
+        } else if (currentCollatRatio > _targetCollatRatio) {
+            if (currentCollatRatio.sub(_targetCollatRatio) > minRatio) {
                 (uint256 deposits, uint256 borrows) = getCurrentPosition();
                 uint256 newBorrow =
                     getBorrowFromSupply(
                         deposits.sub(borrows),
-                        targetCollatRatio
+                        _targetCollatRatio
                     );
                 _leverDownTo(newBorrow, borrows);
             }
@@ -444,7 +485,8 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
             //harvest takes priority
             return false;
         }
-        // pull the liquidation liquidationThreshold from aave to be extra safu
+        // pull from aave to be extra safu, a view costs the keeper no gas and a
+        // cut of the threshold has to trigger the tend right away
         (, uint256 liquidationThreshold) =
             getProtocolCollatRatios(address(want));
 
@@ -528,7 +570,8 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         }
 
         // Always keep 1 wei to get around cooldown clear
-        if (sellStkAave && stkAaveBalance >= minRewardToSell.add(1)) {
+        uint256 _minRewardToSell = minRewardToSell;
+        if (sellStkAave && stkAaveBalance >= _minRewardToSell.add(1)) {
             uint256 minAAVEOut =
                 stkAaveBalance.mul(MAX_BPS.sub(maxStkAavePriceImpactBps)).div(
                     MAX_BPS
@@ -538,11 +581,29 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
 
         // sell AAVE for want
         uint256 aaveBalance = balanceOfAave();
-        if (aaveBalance >= minRewardToSell) {
+        if (aaveBalance >= _minRewardToSell) {
             _sellAAVEForWant(aaveBalance, 0);
         }
     }
 
+    function _rewardsWorthClaiming() internal view returns (bool) {
+        uint256 _rewardClaimGas = rewardClaimGas;
+        if (_rewardClaimGas == 0) {
+            return true;
+        }
+        // don't let a claim period pass by
+        if (
+            cooldownStkAave &&
+            balanceOfStkAave() > 0 &&
+            _checkCooldown() == CooldownStatus.Claim
+        ) {
+            return true;
+        }
+        return
+            estimatedRewardsInWant() >
+            ethToWant(tx.gasprice.mul(_rewardClaimGas));
+    }
+
     function _freeFunds(uint256 amountToFree) internal returns (uint256) {
         if (amountToFree == 0) return 0;
 
@@ -568,20 +629,14 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         uint256 totalAmountToBorrow = newBorrow.sub(borrows);
 
         if (isFlashMintActive) {
-            // The best approach is to lever up using regular method, then finish with flash loan
-            totalAmountToBorrow = totalAmountToBorrow.sub(
-                _leverUpStep(totalAmountToBorrow)
-            );
-
-            if (totalAmountToBorrow > minWant) {
-                totalAmountToBorrow = totalAmountToBorrow.sub(
-                    _leverUpFlashLoan(totalAmountToBorrow)
-                );
-            }
+            // Reach the target in one pass: one borrow and one deposit, backed by a flash mint if needed
+            _leverUpFlashLoan(totalAmountToBorrow, deposits, borrows);
         } else {
+            uint256 _minWant = minWant;
+            uint8 _maxIterations = maxIterations;
             for (
                 uint8 i = 0;
-                i < maxIterations && totalAmountToBorrow > minWant;
+                i < _maxIterations && totalAmountToBorrow > _minWant;
                 i++
             ) {
                 totalAmountToBorrow = totalAmountToBorrow.sub(
@@ -591,13 +646,35 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         }
     }
 
-    function _leverUpFlashLoan(uint256 amount) internal returns (uint256) {
-        (uint256 deposits, uint256 borrows) = getCurrentPosition();
-        uint256 depositsToMeetLtv =
-            getDepositFromBorrow(borrows, maxBorrowCollatRatio);
+    function _leverUpFlashLoan(
+        uint256 amount,
+        uint256 deposits,
+        uint256 borrows
+    ) internal returns (uint256) {
+        if (amount <= minWant) return 0;
+
+        uint256 _maxBorrowCollatRatio = maxBorrowCollatRatio;
+        uint256 canBorrow =
+            getBorrowFromDeposit(deposits, _maxBorrowCollatRatio);
+
+        // our own collateral is enough, no need for DAI
+        if (canBorrow >= borrows.add(amount)) {
+            _borrowWant(amount);
+            _depositCollateral(balanceOfWant());
+            return amount;
+        }
+
+        // DAI only has to back what our collateral can't, or close its gap to the LTV
+        uint256 borrowHeadroom = 0;
         uint256 depositsDeficitToMeetLtv = 0;
-        if (depositsToMeetLtv > deposits) {
-            depositsDeficitToMeetLtv = depositsToMeetLtv.sub(deposits);
+        if (canBorrow > borrows) {
+            borrowHeadroom = canBorrow.sub(borrows);
+        } else {
+            uint256 depositsToMeetLtv =
+                getDepositFromBorrow(borrows, _maxBorrowCollatRatio);
+            if (depositsToMeetLtv > deposits) {
+                depositsDeficitToMeetLtv = depositsToMeetLtv.sub(deposits);
+            }
         }
         return
             FlashMintLib.doFlashMint(
@@ -605,7 +682,8 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
                 amount,
                 address(want),
                 daiBorrowCollatRatio,
-                depositsDeficitToMeetLtv
+                depositsDeficitToMeetLtv,
+                borrowHeadroom
             );
     }
 
@@ -655,10 +733,12 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
             }
 
             uint256 _maxCollatRatio = maxCollatRatio;
+            uint256 _minWant = minWant;
+            uint8 _maxIterations = maxIterations;
 
             for (
                 uint8 i = 0;
-                i < maxIterations && totalRepayAmount > minWant;
+                i < _maxIterations && totalRepayAmount > _minWant;
                 i++
             ) {
                 _withdrawExcessCollateral(_maxCollatRatio);
@@ -687,20 +767,127 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         }
     }
 
-    function _leverDownFlashLoan(uint256 amount) internal returns (uint256) {
-        if (amount <= minWant) return 0;
-        (, uint256 borrows) = getCurrentPosition();
-        if (amount > borrows) {
-            amount = borrows;
+    // flash mints until amount is repaid, DssFlash may cap each one below it.
+    // The first one always runs, the next ones only with enough gas left
+    function _leverDownFlashLoan(uint256 amount)
+        internal
+        returns (uint256 repaid)
+    {
+        uint256 _minWant = minWant;
+        while (amount > _minWant) {
+            (, uint256 borrows) = getCurrentPosition();
+            uint256 flashed =
+                FlashMintLib.doFlashMint(
+                    true,
+                    Math.min(amount, borrows),
+                    address(want),
+                    daiBorrowCollatRatio,
+                    0,
+                    0
+                );
+            if (flashed == 0) break;
+            repaid = repaid.add(flashed);
+            amount = amount.sub(flashed);
+            if (gasleft() <= MIN_GAS_PER_FLASH_MINT) break;
+        }
+    }
+
+    // _leverDownTo over the position held in quote
+    function _quoteLeverDownTo(
+        FreeFundsQuote memory quote,
+        uint256 newAmountBorrowed
+    ) internal view {
+        if (quote.borrows > newAmountBorrowed) {
+            uint256 totalRepayAmount = quote.borrows.sub(newAmountBorrowed);
+
+            if (isFlashMintActive) {
+                totalRepayAmount = totalRepayAmount.sub(
+                    _quoteLeverDownFlashLoan(quote, totalRepayAmount)
+                );
+            }
+
+            uint256 _maxCollatRatio = maxCollatRatio;
+
+            for (
+                uint8 i = 0;
+                i < maxIterations && totalRepayAmount > minWant;
+                i++
+            ) {
+                _quoteWithdrawExcessCollateral(quote, _maxCollatRatio);
+                // aave caps the repayment to the debt
+                uint256 toRepay =
+                    Math.min(
+                        Math.min(totalRepayAmount, quote.amountFreed),
+                        quote.borrows
+                    );
+                if (toRepay > 0) {
+                    quote.borrows = quote.borrows.sub(toRepay);
+                    quote.amountFreed = quote.amountFreed.sub(toRepay);
+                    quote.aaveCalls++;
+                }
+                totalRepayAmount = totalRepayAmount.sub(toRepay);
+                quote.iterations++;
+            }
+        }
+
+        uint256 _targetCollatRatio = targetCollatRatio;
+        uint256 targetDeposit =
+            getDepositFromBorrow(quote.borrows, _targetCollatRatio);
+        if (targetDeposit > quote.deposits) {
+            uint256 toDeposit = targetDeposit.sub(quote.deposits);
+            if (toDeposit > minWant) {
+                toDeposit = Math.min(toDeposit, quote.amountFreed);
+                if (toDeposit > 0) {
+                    quote.deposits = quote.deposits.add(toDeposit);
+                    quote.amountFreed = quote.amountFreed.sub(toDeposit);
+                    quote.aaveCalls++;
+                }
+            }
+        } else {
+            _quoteWithdrawExcessCollateral(quote, _targetCollatRatio);
+        }
+    }
+
+    function _quoteLeverDownFlashLoan(
+        FreeFundsQuote memory quote,
+        uint256 amount
+    ) internal view returns (uint256 repaid) {
+        uint256 _minWant = minWant;
+        while (amount > _minWant) {
+            (uint256 flashed, ) =
+                FlashMintLib.quoteFlashMint(
+                    Math.min(amount, quote.borrows),
+                    address(want),
+                    daiBorrowCollatRatio,
+                    0,
+                    0
+                );
+            if (flashed == 0) break;
+
+            // loanLogic: withdraw the want and repay the debt with the balance
+            quote.deposits = quote.deposits.sub(flashed);
+            uint256 balance = quote.amountFreed.add(flashed);
+            uint256 repay = Math.min(balance, quote.borrows);
+            quote.borrows = quote.borrows.sub(repay);
+            quote.amountFreed = balance.sub(repay);
+            quote.flashMints++;
+            quote.aaveCalls += address(want) == dai ? 3 : 4;
+            repaid = repaid.add(flashed);
+            amount = amount.sub(flashed);
+        }
+    }
+
+    function _quoteWithdrawExcessCollateral(
+        FreeFundsQuote memory quote,
+        uint256 collatRatio
+    ) internal view {
+        uint256 theoDeposits = getDepositFromBorrow(quote.borrows, collatRatio);
+        if (quote.deposits > theoDeposits) {
+            uint256 toWithdraw = quote.deposits.sub(theoDeposits);
+            quote.deposits = theoDeposits;
+            quote.amountFreed = quote.amountFreed.add(toWithdraw);
+            quote.aaveCalls++;
         }
-        return
-            FlashMintLib.doFlashMint(
-                true,
-                amount,
-                address(want),
-                daiBorrowCollatRatio,
-                0
-            );
     }
 
     function _withdrawExcessCollateral(uint256 collatRatio)
@@ -789,14 +976,67 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         returns (uint256 currentCollatRatio)
     {
         (uint256 deposits, uint256 borrows) = getCurrentPosition();
+        return getCollatRatio(deposits, borrows);
+    }
 
-        if (deposits > 0) {
-            currentCollatRatio = borrows.mul(COLLATERAL_RATIO_PRECISION).div(
-                deposits
-            );
+    // single call alternative to the position, ratio and reward getters
+    function getPositionSnapshot()
+        external
+        view
+        returns (PositionSnapshot memory snapshot)
+    {
+        (snapshot.deposits, snapshot.borrows) = getCurrentPosition();
+        snapshot.collatRatio = getCollatRatio(
+            snapshot.deposits,
+            snapshot.borrows
+        );
+        snapshot.targetCollatRatio = targetCollatRatio;
+        snapshot.maxCollatRatio = maxCollatRatio;
+        snapshot.maxBorrowCollatRatio = maxBorrowCollatRatio;
+        (, snapshot.liquidationThreshold) = getProtocolCollatRatios(
+            address(want)
+        );
+        snapshot.pendingStkAave = incentivesController.getRewardsBalance(
+            getAaveAssets(),
+            address(this)
+        );
+        snapshot.stkAaveBalance = balanceOfStkAave();
+        snapshot.aaveBalance = balanceOfAave();
+        snapshot.wantBalance = balanceOfWant();
+        if (snapshot.stkAaveBalance > 0) {
+            snapshot.cooldownStatus = _checkCooldown(); // don't check status if we have no stkAave
         }
     }
 
+    // dry run of liquidatePosition(amount): the want it frees, the loop iterations,
+    // flash mints and aave calls it takes and the position it leaves
+    // NOTE: amountFreed is the want balance during the dry run until the end
+    // NOTE: flash mints are counted as if the tx had all the gas they need
+    function quoteFreeFunds(uint256 amount)
+        external
+        view
+        returns (FreeFundsQuote memory quote)
+    {
+        quote.amountFreed = balanceOfWant();
+        (quote.deposits, quote.borrows) = getCurrentPosition();
+        if (quote.amountFreed > amount) {
+            quote.amountFreed = amount;
+            return quote;
+        }
+
+        uint256 amountToFree = amount.sub(quote.amountFreed);
+        if (amountToFree > 0) {
+            uint256 realAssets = quote.deposits.sub(quote.borrows);
+            uint256 newBorrow =
+                getBorrowFromSupply(
+                    realAssets.sub(Math.min(amountToFree, realAssets)),
+                    targetCollatRatio
+                );
+            _quoteLeverDownTo(quote, newBorrow);
+        }
+        quote.amountFreed = Math.min(quote.amountFreed, amount);
+    }
+
     function getCurrentSupply() public view returns (uint256) {
         (uint256 deposits, uint256 borrows) = getCurrentPosition();
         return deposits.sub(borrows);
@@ -900,6 +1140,7 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
             return;
         }
         if (swapRouter == SwapRouter.UniV3) {
+            approveMaxSpendIfNeeded(aave, address(UNI_V3_ROUTER), amountIn);
             UNI_V3_ROUTER.exactInput(
                 ISwapRouter.ExactInputParams(
                     getTokenOutPathV3(address(aave), address(want)),
@@ -914,6 +1155,7 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
                 swapRouter == SwapRouter.UniV2
                     ? UNI_V2_ROUTER
                     : SUSHI_V2_ROUTER;
+            approveMaxSpendIfNeeded(aave, address(router), amountIn);
             router.swapExactTokensForTokens(
                 amountIn,
                 minOut,
@@ -927,6 +1169,11 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
     function _sellSTKAAVEToAAVE(uint256 amountIn, uint256 minOut) internal {
         // Swap Rewards in UNIV3
         // NOTE: Unoptimized, can be frontrun and most importantly this pool is low liquidity
+        approveMaxSpendIfNeeded(
+            address(stkAave),
+            address(UNI_V3_ROUTER),
+            amountIn
+        );
         UNI_V3_ROUTER.exactInputSingle(
             ISwapRouter.ExactInputSingleParams(
                 address(stkAave),
@@ -959,6 +1206,17 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
         liquidationThreshold = liquidationThreshold.mul(BPS_WAD_RATIO);
     }
 
+    function getCollatRatio(uint256 deposits, uint256 borrows)
+        internal
+        pure
+        returns (uint256)
+    {
+        if (deposits == 0) {
+            return 0;
+        }
+        return borrows.mul(COLLATERAL_RATIO_PRECISION).div(deposits);
+    }
+
     function getBorrowFromDeposit(uint256 deposit, uint256 collatRatio)
         internal
         pure
@@ -989,4 +1247,19 @@ contract Strategy is BaseStrategy, IERC3156FlashBorrower {
     function approveMaxSpend(address token, address spender) internal {
         IERC20(token).safeApprove(spender, type(uint256).max);
     }
+
+    // clones only pay for the approvals of the routes they use
+    function approveMaxSpendIfNeeded(
+        address token,
+        address spender,
+        uint256 amount
+    ) internal {
+        uint256 allowance = IERC20(token).allowance(address(this), spender);
+        if (allowance < amount) {
+            if (allowance > 0) {
+                IERC20(token).safeApprove(spender, 0);
+            }
+            approveMaxSpend(token, spender);
+        }
+    }
 }
@@ -0,0 +1,189 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import {IERC20} from "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "../../interfaces/aave/IAToken.sol";
+import "../../interfaces/aave/ILendingPool.sol";
+
+// aToken without interest: balances are 1:1 with the underlying it holds
+contract MockAToken is IAToken {
+    using SafeMath for uint256;
+
+    ILendingPool public pool;
+    address public override UNDERLYING_ASSET_ADDRESS;
+    IAaveIncentivesController internal incentivesController;
+
+    string public name;
+    string public symbol;
+    uint8 public decimals;
+
+    uint256 public override totalSupply;
+    mapping(address => uint256) public override balanceOf;
+    mapping(address => mapping(address => uint256)) public override allowance;
+
+    modifier onlyLendingPool {
+        require(msg.sender == address(pool), "29");
+        _;
+    }
+
+    function initialize(
+        ILendingPool _pool,
+        address _treasury,
+        address _underlyingAsset,
+        IAaveIncentivesController _incentivesController,
+        uint8 _aTokenDecimals,
+        string calldata _aTokenName,
+        string calldata _aTokenSymbol,
+        bytes calldata _params
+    ) external override {
+        require(address(pool) == address(0));
+        pool = _pool;
+        UNDERLYING_ASSET_ADDRESS = _underlyingAsset;
+        incentivesController = _incentivesController;
+        decimals = _aTokenDecimals;
+        name = _aTokenName;
+        symbol = _aTokenSymbol;
+
+        emit Initialized(
+            _underlyingAsset,
+            address(_pool),
+            _treasury,
+            address(_incentivesController),
+            _aTokenDecimals,
+            _aTokenName,
+            _aTokenSymbol,
+            _params
+        );
+    }
+
+    function mint(
+        address user,
+        uint256 amount,
+        uint256 index
+    ) external override onlyLendingPool returns (bool) {
+        uint256 previousBalance = balanceOf[user];
+        totalSupply = totalSupply.add(amount);
+        balanceOf[user] = previousBalance.add(amount);
+
+        emit Transfer(address(0), user, amount);
+        emit Mint(user, amount, index);
+        return previousBalance == 0;
+    }
+
+    function burn(
+        address user,
+        address receiverOfUnderlying,
+        uint256 amount,
+        uint256 index
+    ) external override onlyLendingPool {
+        balanceOf[user] = balanceOf[user].sub(amount);
+        totalSupply = totalSupply.sub(amount);
+        IERC20(UNDERLYING_ASSET_ADDRESS).transfer(receiverOfUnderlying, amount);
+
+        emit Transfer(user, address(0), amount);
+        emit Burn(user, receiverOfUnderlying, amount, index);
+    }
+
+    function mintToTreasury(uint256 amount, uint256 index)
+        external
+        override
+        onlyLendingPool
+    {}
+
+    function transferOnLiquidation(
+        address from,
+        address to,
+        uint256 value
+    ) external override onlyLendingPool {
+        _transfer(from, to, value);
+        emit BalanceTransfer(from, to, value, 1e27);
+    }
+
+    function transferUnderlyingTo(address target, uint256 amount)
+        external
+        override
+        onlyLendingPool
+        returns (uint256)
+    {
+        IERC20(UNDERLYING_ASSET_ADDRESS).transfer(target, amount);
+        return amount;
+    }
+
+    function handleRepayment(address user, uint256 amount)
+        external
+        override
+        onlyLendingPool
+    {}
+
+    function getIncentivesController()
+        external
+        view
+        override
+        returns (IAaveIncentivesController)
+    {
+        return incentivesController;
+    }
+
+    function scaledBalanceOf(address user)
+        external
+        view
+        override
+        returns (uint256)
+    {
+        return balanceOf[user];
+    }
+
+    function getScaledUserBalanceAndSupply(address user)
+        external
+        view
+        override
+        returns (uint256, uint256)
+    {
+        return (balanceOf[user], totalSupply);
+    }
+
+    function scaledTotalSupply() external view override returns (uint256) {
+        return totalSupply;
+    }
+
+    function transfer(address to, uint256 amount)
+        external
+        override
+        returns (bool)
+    {
+        _transfer(msg.sender, to, amount);
+        return true;
+    }
+
+    function approve(address spender, uint256 amount)
+        external
+        override
+        returns (bool)
+    {
+        allowance[msg.sender][spender] = amount;
+        emit Approval(msg.sender, spender, amount);
+        return true;
+    }
+
+    function transferFrom(
+        address from,
+        address to,
+        uint256 amount
+    ) external override returns (bool) {
+        allowance[from][msg.sender] = allowance[from][msg.sender].sub(amount);
+        _transfer(from, to, amount);
+        return true;
+    }
+
+    function _transfer(
+        address from,
+        address to,
+        uint256 amount
+    ) internal {
+        balanceOf[from] = balanceOf[from].sub(amount);
+        balanceOf[to] = balanceOf[to].add(amount);
+        emit Transfer(from, to, amount);
+    }
+}
@@ -0,0 +1,96 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "../../interfaces/dai/IERC3156FlashLender.sol";
+import "../../interfaces/dai/IERC3156FlashBorrower.sol";
+
+interface IMintableERC20 {
+    function mint(address to, uint256 amount) external;
+
+    function burn(address from, uint256 amount) external;
+
+    function transferFrom(
+        address from,
+        address to,
+        uint256 amount
+    ) external returns (bool);
+}
+
+// ERC-3156 DAI flash mint module following MakerDAO's DssFlash: DAI is
+// minted to the receiver, pulled back with the fee and burnt. No constructor
+// so it can be placed at the DssFlash address and gets set up with `initialize`.
+contract MockDssFlash is IERC3156FlashLender {
+    using SafeMath for uint256;
+
+    bytes32 public constant CALLBACK_SUCCESS =
+        keccak256("ERC3156FlashBorrower.onFlashLoan");
+
+    address public dai;
+    uint256 public max; // maximum DAI per flash mint
+    uint256 public toll; // fee in wad
+    uint256 private locked;
+
+    function file(bytes32 what, uint256 data) external {
+        if (what == "max") {
+            max = data;
+        } else if (what == "toll") {
+            toll = data;
+        } else {
+            revert("DssFlash/file-unrecognized-param");
+        }
+    }
+
+    function initialize(address _dai) external {
+        require(dai == address(0));
+        dai = _dai;
+    }
+
+    function maxFlashLoan(address token)
+        external
+        view
+        override
+        returns (uint256)
+    {
+        if (token == dai && locked == 0) {
+            return max;
+        }
+        return 0;
+    }
+
+    function flashFee(address token, uint256 amount)
+        external
+        view
+        override
+        returns (uint256)
+    {
+        require(token == dai, "DssFlash/token-unsupported");
+        return amount.mul(toll).div(1 ether);
+    }
+
+    function flashLoan(
+        IERC3156FlashBorrower receiver,
+        address token,
+        uint256 amount,
+        bytes calldata data
+    ) external override returns (bool) {
+        require(token == dai, "DssFlash/token-unsupported");
+        require(amount <= max, "DssFlash/ceiling-exceeded");
+        require(locked == 0, "DssFlash/reentrancy-guard");
+        locked = 1;
+
+        uint256 fee = amount.mul(toll).div(1 ether);
+        IMintableERC20(dai).mint(address(receiver), amount);
+        require(
+            receiver.onFlashLoan(msg.sender, dai, amount, fee, data) ==
+                CALLBACK_SUCCESS,
+            "DssFlash/callback-failed"
+        );
+        uint256 total = amount.add(fee);
+        IMintableERC20(dai).transferFrom(address(receiver), address(this), total);
+        IMintableERC20(dai).burn(address(this), total);
+
+        locked = 0;
+        return true;
+    }
+}
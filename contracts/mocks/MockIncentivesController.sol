@@ -0,0 +1,64 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "../../interfaces/aave/IAaveIncentivesController.sol";
+
+// Incentives controller with no emissions: nothing accrues and claims pay out 0
+contract MockIncentivesController is IAaveIncentivesController {
+    function getRewardsBalance(address[] calldata, address)
+        external
+        view
+        override
+        returns (uint256)
+    {
+        return 0;
+    }
+
+    function claimRewards(
+        address[] calldata,
+        uint256,
+        address
+    ) external override returns (uint256) {
+        return 0;
+    }
+
+    function claimRewardsOnBehalf(
+        address[] calldata,
+        uint256,
+        address,
+        address
+    ) external override returns (uint256) {
+        return 0;
+    }
+
+    function getUserUnclaimedRewards(address)
+        external
+        view
+        override
+        returns (uint256)
+    {
+        return 0;
+    }
+
+    function REWARD_TOKEN() external view override returns (address) {
+        return 0x4da27a545c0c5B758a6BA100e3a049001de870f5; // stkAave
+    }
+
+    function getDistributionEnd() external view override returns (uint256) {
+        return 0;
+    }
+
+    function getAssetData(address)
+        external
+        view
+        override
+        returns (
+            uint256,
+            uint256,
+            uint256
+        )
+    {
+        return (0, 0, 0);
+    }
+}
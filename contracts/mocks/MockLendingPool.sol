@@ -0,0 +1,453 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {
+    SafeERC20,
+    SafeMath,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import "../../interfaces/aave/ILendingPool.sol";
+import "../../interfaces/aave/IAToken.sol";
+import "../../interfaces/aave/IVariableDebtToken.sol";
+import "../../interfaces/aave/IPriceOracle.sol";
+
+// Aave v2 LendingPool reduced to what the strategy uses: variable rate
+// deposits, withdrawals, borrows and repays with no interest accrual. Health
+// checks use the oracle and the reserve configuration like the real pool and
+// revert with the same error codes. No constructor so the runtime code can be
+// placed at the mainnet pool address, set it up with `initialize`.
+contract MockLendingPool is ILendingPool {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    uint256 private constant RAY = 1e27;
+    uint256 private constant PERCENTAGE_FACTOR = 1e4;
+    uint256 private constant HEALTH_FACTOR_LIQUIDATION_THRESHOLD = 1 ether;
+    uint256 private constant VARIABLE_RATE_MODE = 2;
+
+    ILendingPoolAddressesProvider internal addressesProvider;
+    mapping(address => DataTypes.ReserveData) internal reserves;
+    address[] internal reservesList;
+    bool internal _paused;
+
+    modifier whenNotPaused {
+        require(!_paused, "64");
+        _;
+    }
+
+    function initialize(ILendingPoolAddressesProvider provider) external {
+        require(address(addressesProvider) == address(0));
+        addressesProvider = provider;
+    }
+
+    function deposit(
+        address asset,
+        uint256 amount,
+        address onBehalfOf,
+        uint16 referralCode
+    ) external override whenNotPaused {
+        DataTypes.ReserveData storage reserve = _activeReserve(asset);
+        require(amount != 0, "1");
+
+        address aToken = reserve.aTokenAddress;
+        IERC20(asset).safeTransferFrom(msg.sender, aToken, amount);
+        IAToken(aToken).mint(onBehalfOf, amount, RAY);
+
+        emit Deposit(asset, msg.sender, onBehalfOf, amount, referralCode);
+    }
+
+    function withdraw(
+        address asset,
+        uint256 amount,
+        address to
+    ) external override whenNotPaused returns (uint256) {
+        DataTypes.ReserveData storage reserve = _activeReserve(asset);
+        address aToken = reserve.aTokenAddress;
+
+        uint256 userBalance = IERC20(aToken).balanceOf(msg.sender);
+        uint256 amountToWithdraw =
+            amount == type(uint256).max ? userBalance : amount;
+        require(amountToWithdraw != 0, "1");
+        require(amountToWithdraw <= userBalance, "32");
+
+        IAToken(aToken).burn(msg.sender, to, amountToWithdraw, RAY);
+        require(
+            _healthFactor(msg.sender) >= HEALTH_FACTOR_LIQUIDATION_THRESHOLD,
+            "6"
+        );
+
+        emit Withdraw(asset, msg.sender, to, amountToWithdraw);
+        return amountToWithdraw;
+    }
+
+    function borrow(
+        address asset,
+        uint256 amount,
+        uint256 interestRateMode,
+        uint16 referralCode,
+        address onBehalfOf
+    ) external override whenNotPaused {
+        DataTypes.ReserveData storage reserve = _activeReserve(asset);
+        require(amount != 0, "1");
+        require((reserve.configuration.data >> 58) & 1 == 1, "7");
+        require(interestRateMode == VARIABLE_RATE_MODE, "8");
+        // credit delegation is not supported
+        require(onBehalfOf == msg.sender, "59");
+
+        IVariableDebtToken(reserve.variableDebtTokenAddress).mint(
+            msg.sender,
+            onBehalfOf,
+            amount,
+            RAY
+        );
+        IAToken(reserve.aTokenAddress).transferUnderlyingTo(msg.sender, amount);
+
+        (
+            uint256 collateralETH,
+            uint256 debtETH,
+            uint256 ltv,
+            uint256 liquidationThreshold
+        ) = _userAccountData(onBehalfOf);
+        require(collateralETH > 0, "9");
+        require(debtETH <= collateralETH.mul(ltv).div(PERCENTAGE_FACTOR), "11");
+        require(
+            _calculateHealthFactor(
+                collateralETH,
+                debtETH,
+                liquidationThreshold
+            ) >= HEALTH_FACTOR_LIQUIDATION_THRESHOLD,
+            "10"
+        );
+
+        emit Borrow(
+            asset,
+            msg.sender,
+            onBehalfOf,
+            amount,
+            interestRateMode,
+            0,
+            referralCode
+        );
+    }
+
+    function repay(
+        address asset,
+        uint256 amount,
+        uint256 rateMode,
+        address onBehalfOf
+    ) external override whenNotPaused returns (uint256) {
+        DataTypes.ReserveData storage reserve = _activeReserve(asset);
+        require(amount != 0, "1");
+        require(rateMode == VARIABLE_RATE_MODE, "8");
+
+        address debtToken = reserve.variableDebtTokenAddress;
+        uint256 variableDebt = IERC20(debtToken).balanceOf(onBehalfOf);
+        require(variableDebt > 0, "39");
+
+        uint256 paybackAmount = amount < variableDebt ? amount : variableDebt;
+        IVariableDebtToken(debtToken).burn(onBehalfOf, paybackAmount, RAY);
+
+        address aToken = reserve.aTokenAddress;
+        IERC20(asset).safeTransferFrom(msg.sender, aToken, paybackAmount);
+        IAToken(aToken).handleRepayment(msg.sender, paybackAmount);
+
+        emit Repay(asset, onBehalfOf, msg.sender, paybackAmount);
+        return paybackAmount;
+    }
+
+    function swapBorrowRateMode(address, uint256) external override {
+        revert("MOCK_NOT_SUPPORTED");
+    }
+
+    function rebalanceStableBorrowRate(address, address) external override {
+        revert("MOCK_NOT_SUPPORTED");
+    }
+
+    function setUserUseReserveAsCollateral(address, bool) external override {
+        revert("MOCK_NOT_SUPPORTED");
+    }
+
+    function liquidationCall(
+        address,
+        address,
+        address,
+        uint256,
+        bool
+    ) external override {
+        revert("MOCK_NOT_SUPPORTED");
+    }
+
+    function flashLoan(
+        address,
+        address[] calldata,
+        uint256[] calldata,
+        uint256[] calldata,
+        address,
+        bytes calldata,
+        uint16
+    ) external override {
+        revert("MOCK_NOT_SUPPORTED");
+    }
+
+    function getUserAccountData(address user)
+        external
+        view
+        override
+        returns (
+            uint256 totalCollateralETH,
+            uint256 totalDebtETH,
+            uint256 availableBorrowsETH,
+            uint256 currentLiquidationThreshold,
+            uint256 ltv,
+            uint256 healthFactor
+        )
+    {
+        (
+            totalCollateralETH,
+            totalDebtETH,
+            ltv,
+            currentLiquidationThreshold
+        ) = _userAccountData(user);
+
+        uint256 maxBorrowsETH =
+            totalCollateralETH.mul(ltv).div(PERCENTAGE_FACTOR);
+        if (maxBorrowsETH > totalDebtETH) {
+            availableBorrowsETH = maxBorrowsETH.sub(totalDebtETH);
+        }
+        healthFactor = _calculateHealthFactor(
+            totalCollateralETH,
+            totalDebtETH,
+            currentLiquidationThreshold
+        );
+    }
+
+    function initReserve(
+        address asset,
+        address aTokenAddress,
+        address stableDebtAddress,
+        address variableDebtAddress,
+        address interestRateStrategyAddress
+    ) external override {
+        DataTypes.ReserveData storage reserve = reserves[asset];
+        require(reserve.aTokenAddress == address(0), "32");
+
+        reserve.liquidityIndex = uint128(RAY);
+        reserve.variableBorrowIndex = uint128(RAY);
+        reserve.lastUpdateTimestamp = uint40(block.timestamp);
+        reserve.aTokenAddress = aTokenAddress;
+        reserve.stableDebtTokenAddress = stableDebtAddress;
+        reserve.variableDebtTokenAddress = variableDebtAddress;
+        reserve.interestRateStrategyAddress = interestRateStrategyAddress;
+        reserve.id = uint8(reservesList.length);
+        reservesList.push(asset);
+    }
+
+    function setReserveInterestRateStrategyAddress(
+        address asset,
+        address rateStrategyAddress
+    ) external override {
+        reserves[asset].interestRateStrategyAddress = rateStrategyAddress;
+    }
+
+    function setConfiguration(address asset, uint256 configuration)
+        external
+        override
+    {
+        reserves[asset].configuration.data = configuration;
+    }
+
+    function getConfiguration(address asset)
+        external
+        view
+        override
+        returns (DataTypes.ReserveConfigurationMap memory)
+    {
+        return reserves[asset].configuration;
+    }
+
+    function getUserConfiguration(address)
+        external
+        view
+        override
+        returns (DataTypes.UserConfigurationMap memory)
+    {}
+
+    function getReserveNormalizedIncome(address)
+        external
+        view
+        override
+        returns (uint256)
+    {
+        return RAY;
+    }
+
+    function getReserveNormalizedVariableDebt(address)
+        external
+        view
+        override
+        returns (uint256)
+    {
+        return RAY;
+    }
+
+    function getReserveData(address asset)
+        external
+        view
+        override
+        returns (DataTypes.ReserveData memory)
+    {
+        return reserves[asset];
+    }
+
+    function finalizeTransfer(
+        address asset,
+        address from,
+        address,
+        uint256,
+        uint256,
+        uint256
+    ) external override {
+        require(msg.sender == reserves[asset].aTokenAddress, "29");
+        require(
+            _healthFactor(from) >= HEALTH_FACTOR_LIQUIDATION_THRESHOLD,
+            "6"
+        );
+    }
+
+    function getReservesList()
+        external
+        view
+        override
+        returns (address[] memory)
+    {
+        return reservesList;
+    }
+
+    function getAddressesProvider()
+        external
+        view
+        override
+        returns (ILendingPoolAddressesProvider)
+    {
+        return addressesProvider;
+    }
+
+    function setPause(bool val) external override {
+        _paused = val;
+        if (val) {
+            emit Paused();
+        } else {
+            emit Unpaused();
+        }
+    }
+
+    function paused() external view override returns (bool) {
+        return _paused;
+    }
+
+    function _activeReserve(address asset)
+        internal
+        view
+        returns (DataTypes.ReserveData storage reserve)
+    {
+        reserve = reserves[asset];
+        require((reserve.configuration.data >> 56) & 1 == 1, "2");
+    }
+
+    function _healthFactor(address user) internal view returns (uint256) {
+        (
+            uint256 collateralETH,
+            uint256 debtETH,
+            ,
+            uint256 liquidationThreshold
+        ) = _userAccountData(user);
+        return
+            _calculateHealthFactor(
+                collateralETH,
+                debtETH,
+                liquidationThreshold
+            );
+    }
+
+    function _userAccountData(address user)
+        internal
+        view
+        returns (
+            uint256 collateralETH,
+            uint256 debtETH,
+            uint256 ltv,
+            uint256 liquidationThreshold
+        )
+    {
+        IPriceOracle oracle =
+            IPriceOracle(addressesProvider.getPriceOracle());
+
+        for (uint256 i = 0; i < reservesList.length; i++) {
+            (
+                uint256 collateralValue,
+                uint256 debtValue,
+                uint256 configuration
+            ) = _userReserveValues(oracle, reservesList[i], user);
+
+            if (collateralValue > 0) {
+                collateralETH = collateralETH.add(collateralValue);
+                ltv = ltv.add(collateralValue.mul(configuration & 0xFFFF));
+                liquidationThreshold = liquidationThreshold.add(
+                    collateralValue.mul((configuration >> 16) & 0xFFFF)
+                );
+            }
+            debtETH = debtETH.add(debtValue);
+        }
+
+        if (collateralETH > 0) {
+            ltv = ltv.div(collateralETH);
+            liquidationThreshold = liquidationThreshold.div(collateralETH);
+        }
+    }
+
+    function _userReserveValues(
+        IPriceOracle oracle,
+        address asset,
+        address user
+    )
+        internal
+        view
+        returns (
+            uint256 collateralValue,
+            uint256 debtValue,
+            uint256 configuration
+        )
+    {
+        DataTypes.ReserveData storage reserve = reserves[asset];
+        configuration = reserve.configuration.data;
+
+        uint256 collateral = IERC20(reserve.aTokenAddress).balanceOf(user);
+        uint256 debt = IERC20(reserve.variableDebtTokenAddress).balanceOf(user);
+        if (collateral == 0 && debt == 0) {
+            return (0, 0, configuration);
+        }
+
+        uint256 unit = 10**((configuration >> 48) & 0xFF);
+        uint256 price = oracle.getAssetPrice(asset);
+        collateralValue = collateral.mul(price).div(unit);
+        debtValue = debt.mul(price).div(unit);
+    }
+
+    function _calculateHealthFactor(
+        uint256 collateralETH,
+        uint256 debtETH,
+        uint256 liquidationThreshold
+    ) internal pure returns (uint256) {
+        if (debtETH == 0) {
+            return type(uint256).max;
+        }
+        return
+            collateralETH
+                .mul(liquidationThreshold)
+                .div(PERCENTAGE_FACTOR)
+                .mul(1 ether)
+                .div(debtETH);
+    }
+}
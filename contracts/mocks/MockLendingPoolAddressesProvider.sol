@@ -0,0 +1,125 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "../../interfaces/aave/ILendingPoolAddressesProvider.sol";
+
+// Plain registry, the proxy setters store the implementation directly
+contract MockLendingPoolAddressesProvider is ILendingPoolAddressesProvider {
+    string internal marketId;
+    mapping(bytes32 => address) internal addresses;
+
+    bytes32 private constant LENDING_POOL = "LENDING_POOL";
+    bytes32 private constant LENDING_POOL_CONFIGURATOR =
+        "LENDING_POOL_CONFIGURATOR";
+    bytes32 private constant POOL_ADMIN = "POOL_ADMIN";
+    bytes32 private constant EMERGENCY_ADMIN = "EMERGENCY_ADMIN";
+    bytes32 private constant LENDING_POOL_COLLATERAL_MANAGER =
+        "COLLATERAL_MANAGER";
+    bytes32 private constant PRICE_ORACLE = "PRICE_ORACLE";
+    bytes32 private constant LENDING_RATE_ORACLE = "LENDING_RATE_ORACLE";
+
+    function getMarketId() external view override returns (string memory) {
+        return marketId;
+    }
+
+    function setMarketId(string calldata _marketId) external override {
+        marketId = _marketId;
+        emit MarketIdSet(_marketId);
+    }
+
+    function setAddress(bytes32 id, address newAddress) public override {
+        addresses[id] = newAddress;
+        emit AddressSet(id, newAddress, false);
+    }
+
+    function setAddressAsProxy(bytes32 id, address impl) external override {
+        addresses[id] = impl;
+        emit AddressSet(id, impl, true);
+    }
+
+    function getAddress(bytes32 id) public view override returns (address) {
+        return addresses[id];
+    }
+
+    function getLendingPool() external view override returns (address) {
+        return getAddress(LENDING_POOL);
+    }
+
+    function setLendingPoolImpl(address pool) external override {
+        setAddress(LENDING_POOL, pool);
+        emit LendingPoolUpdated(pool);
+    }
+
+    function getLendingPoolConfigurator()
+        external
+        view
+        override
+        returns (address)
+    {
+        return getAddress(LENDING_POOL_CONFIGURATOR);
+    }
+
+    function setLendingPoolConfiguratorImpl(address configurator)
+        external
+        override
+    {
+        setAddress(LENDING_POOL_CONFIGURATOR, configurator);
+        emit LendingPoolConfiguratorUpdated(configurator);
+    }
+
+    function getLendingPoolCollateralManager()
+        external
+        view
+        override
+        returns (address)
+    {
+        return getAddress(LENDING_POOL_COLLATERAL_MANAGER);
+    }
+
+    function setLendingPoolCollateralManager(address manager)
+        external
+        override
+    {
+        setAddress(LENDING_POOL_COLLATERAL_MANAGER, manager);
+        emit LendingPoolCollateralManagerUpdated(manager);
+    }
+
+    function getPoolAdmin() external view override returns (address) {
+        return getAddress(POOL_ADMIN);
+    }
+
+    function setPoolAdmin(address admin) external override {
+        setAddress(POOL_ADMIN, admin);
+        emit ConfigurationAdminUpdated(admin);
+    }
+
+    function getEmergencyAdmin() external view override returns (address) {
+        return getAddress(EMERGENCY_ADMIN);
+    }
+
+    function setEmergencyAdmin(address admin) external override {
+        setAddress(EMERGENCY_ADMIN, admin);
+        emit EmergencyAdminUpdated(admin);
+    }
+
+    function getPriceOracle() external view override returns (address) {
+        return getAddress(PRICE_ORACLE);
+    }
+
+    function setPriceOracle(address priceOracle) external override {
+        setAddress(PRICE_ORACLE, priceOracle);
+        emit PriceOracleUpdated(priceOracle);
+    }
+
+    function getLendingRateOracle() external view override returns (address) {
+        return getAddress(LENDING_RATE_ORACLE);
+    }
+
+    function setLendingRateOracle(address lendingRateOracle)
+        external
+        override
+    {
+        setAddress(LENDING_RATE_ORACLE, lendingRateOracle);
+        emit LendingRateOracleUpdated(lendingRateOracle);
+    }
+}
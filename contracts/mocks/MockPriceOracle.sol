@@ -0,0 +1,46 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "../../interfaces/aave/IPriceOracle.sol";
+
+// Aave v2 style oracle, prices are quoted in ETH with 18 decimals
+contract MockPriceOracle is IPriceOracle {
+    mapping(address => uint256) internal prices;
+
+    event AssetPriceUpdated(address asset, uint256 price, uint256 timestamp);
+
+    function setAssetPrice(address _asset, uint256 _price) external {
+        prices[_asset] = _price;
+        emit AssetPriceUpdated(_asset, _price, block.timestamp);
+    }
+
+    function getAssetPrice(address _asset)
+        public
+        view
+        override
+        returns (uint256)
+    {
+        return prices[_asset];
+    }
+
+    function getAssetsPrices(address[] calldata _assets)
+        external
+        view
+        override
+        returns (uint256[] memory)
+    {
+        uint256[] memory _prices = new uint256[](_assets.length);
+        for (uint256 i = 0; i < _assets.length; i++) {
+            _prices[i] = getAssetPrice(_assets[i]);
+        }
+        return _prices;
+    }
+
+    function getSourceOfAsset(address) external view override returns (address) {
+        return address(0);
+    }
+
+    function getFallbackOracle() external view override returns (address) {
+        return address(0);
+    }
+}
@@ -0,0 +1,165 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "../../interfaces/aave/IProtocolDataProvider.sol";
+import "../../interfaces/aave/ILendingPool.sol";
+
+interface IERC20Symbol {
+    function symbol() external view returns (string memory);
+}
+
+// Reads the pool like Aave's AaveProtocolDataProvider. No constructor so the
+// runtime code can be placed at the mainnet address, set it up with `initialize`.
+contract MockProtocolDataProvider is IProtocolDataProvider {
+    ILendingPoolAddressesProvider public override ADDRESSES_PROVIDER;
+
+    function initialize(ILendingPoolAddressesProvider addressesProvider)
+        external
+    {
+        require(address(ADDRESSES_PROVIDER) == address(0));
+        ADDRESSES_PROVIDER = addressesProvider;
+    }
+
+    function getAllReservesTokens()
+        external
+        view
+        override
+        returns (TokenData[] memory reservesTokens)
+    {
+        address[] memory reserves = _pool().getReservesList();
+        reservesTokens = new TokenData[](reserves.length);
+        for (uint256 i = 0; i < reserves.length; i++) {
+            reservesTokens[i] = TokenData(
+                IERC20Symbol(reserves[i]).symbol(),
+                reserves[i]
+            );
+        }
+    }
+
+    function getAllATokens()
+        external
+        view
+        override
+        returns (TokenData[] memory aTokens)
+    {
+        ILendingPool pool = _pool();
+        address[] memory reserves = pool.getReservesList();
+        aTokens = new TokenData[](reserves.length);
+        for (uint256 i = 0; i < reserves.length; i++) {
+            address aToken = pool.getReserveData(reserves[i]).aTokenAddress;
+            aTokens[i] = TokenData(IERC20Symbol(aToken).symbol(), aToken);
+        }
+    }
+
+    function getReserveConfigurationData(address asset)
+        external
+        view
+        override
+        returns (
+            uint256 decimals,
+            uint256 ltv,
+            uint256 liquidationThreshold,
+            uint256 liquidationBonus,
+            uint256 reserveFactor,
+            bool usageAsCollateralEnabled,
+            bool borrowingEnabled,
+            bool stableBorrowRateEnabled,
+            bool isActive,
+            bool isFrozen
+        )
+    {
+        uint256 data = _pool().getConfiguration(asset).data;
+
+        ltv = data & 0xFFFF;
+        liquidationThreshold = (data >> 16) & 0xFFFF;
+        liquidationBonus = (data >> 32) & 0xFFFF;
+        decimals = (data >> 48) & 0xFF;
+        isActive = (data >> 56) & 1 != 0;
+        isFrozen = (data >> 57) & 1 != 0;
+        borrowingEnabled = (data >> 58) & 1 != 0;
+        stableBorrowRateEnabled = (data >> 59) & 1 != 0;
+        reserveFactor = (data >> 64) & 0xFFFF;
+        usageAsCollateralEnabled = liquidationThreshold > 0;
+    }
+
+    function getReserveData(address asset)
+        external
+        view
+        override
+        returns (
+            uint256 availableLiquidity,
+            uint256 totalStableDebt,
+            uint256 totalVariableDebt,
+            uint256 liquidityRate,
+            uint256 variableBorrowRate,
+            uint256 stableBorrowRate,
+            uint256 averageStableBorrowRate,
+            uint256 liquidityIndex,
+            uint256 variableBorrowIndex,
+            uint40 lastUpdateTimestamp
+        )
+    {
+        DataTypes.ReserveData memory reserve = _pool().getReserveData(asset);
+
+        availableLiquidity = IERC20(asset).balanceOf(reserve.aTokenAddress);
+        totalVariableDebt = IERC20(reserve.variableDebtTokenAddress)
+            .totalSupply();
+        liquidityRate = reserve.currentLiquidityRate;
+        variableBorrowRate = reserve.currentVariableBorrowRate;
+        stableBorrowRate = reserve.currentStableBorrowRate;
+        liquidityIndex = reserve.liquidityIndex;
+        variableBorrowIndex = reserve.variableBorrowIndex;
+        lastUpdateTimestamp = reserve.lastUpdateTimestamp;
+    }
+
+    function getUserReserveData(address asset, address user)
+        external
+        view
+        override
+        returns (
+            uint256 currentATokenBalance,
+            uint256 currentStableDebt,
+            uint256 currentVariableDebt,
+            uint256 principalStableDebt,
+            uint256 scaledVariableDebt,
+            uint256 stableBorrowRate,
+            uint256 liquidityRate,
+            uint40 stableRateLastUpdated,
+            bool usageAsCollateralEnabled
+        )
+    {
+        DataTypes.ReserveData memory reserve = _pool().getReserveData(asset);
+
+        currentATokenBalance = IERC20(reserve.aTokenAddress).balanceOf(user);
+        currentVariableDebt = IERC20(reserve.variableDebtTokenAddress)
+            .balanceOf(user);
+        scaledVariableDebt = currentVariableDebt;
+        liquidityRate = reserve.currentLiquidityRate;
+        usageAsCollateralEnabled = currentATokenBalance > 0;
+    }
+
+    function getReserveTokensAddresses(address asset)
+        external
+        view
+        override
+        returns (
+            address aTokenAddress,
+            address stableDebtTokenAddress,
+            address variableDebtTokenAddress
+        )
+    {
+        DataTypes.ReserveData memory reserve = _pool().getReserveData(asset);
+
+        return (
+            reserve.aTokenAddress,
+            reserve.stableDebtTokenAddress,
+            reserve.variableDebtTokenAddress
+        );
+    }
+
+    function _pool() internal view returns (ILendingPool) {
+        return ILendingPool(ADDRESSES_PROVIDER.getLendingPool());
+    }
+}
@@ -0,0 +1,127 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "../../interfaces/aave/IVariableDebtToken.sol";
+
+// Variable debt token without interest, debt can't be transferred
+contract MockVariableDebtToken is IVariableDebtToken {
+    using SafeMath for uint256;
+
+    address public pool;
+    address public UNDERLYING_ASSET_ADDRESS;
+    IAaveIncentivesController internal incentivesController;
+
+    string public name;
+    string public symbol;
+    uint8 public decimals;
+
+    uint256 public override totalSupply;
+    mapping(address => uint256) public override balanceOf;
+
+    modifier onlyLendingPool {
+        require(msg.sender == pool, "29");
+        _;
+    }
+
+    function initialize(
+        address _pool,
+        address _underlyingAsset,
+        IAaveIncentivesController _incentivesController,
+        uint8 _debtTokenDecimals,
+        string calldata _debtTokenName,
+        string calldata _debtTokenSymbol
+    ) external {
+        require(pool == address(0));
+        pool = _pool;
+        UNDERLYING_ASSET_ADDRESS = _underlyingAsset;
+        incentivesController = _incentivesController;
+        decimals = _debtTokenDecimals;
+        name = _debtTokenName;
+        symbol = _debtTokenSymbol;
+    }
+
+    function mint(
+        address user,
+        address onBehalfOf,
+        uint256 amount,
+        uint256 index
+    ) external override onlyLendingPool returns (bool) {
+        uint256 previousBalance = balanceOf[onBehalfOf];
+        totalSupply = totalSupply.add(amount);
+        balanceOf[onBehalfOf] = previousBalance.add(amount);
+
+        emit Transfer(address(0), onBehalfOf, amount);
+        emit Mint(user, onBehalfOf, amount, index);
+        return previousBalance == 0;
+    }
+
+    function burn(
+        address user,
+        uint256 amount,
+        uint256 index
+    ) external override onlyLendingPool {
+        balanceOf[user] = balanceOf[user].sub(amount);
+        totalSupply = totalSupply.sub(amount);
+
+        emit Transfer(user, address(0), amount);
+        emit Burn(user, amount, index);
+    }
+
+    function getIncentivesController()
+        external
+        view
+        override
+        returns (IAaveIncentivesController)
+    {
+        return incentivesController;
+    }
+
+    function scaledBalanceOf(address user)
+        external
+        view
+        override
+        returns (uint256)
+    {
+        return balanceOf[user];
+    }
+
+    function getScaledUserBalanceAndSupply(address user)
+        external
+        view
+        override
+        returns (uint256, uint256)
+    {
+        return (balanceOf[user], totalSupply);
+    }
+
+    function scaledTotalSupply() external view override returns (uint256) {
+        return totalSupply;
+    }
+
+    function allowance(address, address)
+        external
+        view
+        override
+        returns (uint256)
+    {
+        revert("TRANSFER_NOT_SUPPORTED");
+    }
+
+    function transfer(address, uint256) external override returns (bool) {
+        revert("TRANSFER_NOT_SUPPORTED");
+    }
+
+    function approve(address, uint256) external override returns (bool) {
+        revert("APPROVAL_NOT_SUPPORTED");
+    }
+
+    function transferFrom(
+        address,
+        address,
+        uint256
+    ) external override returns (bool) {
+        revert("TRANSFER_NOT_SUPPORTED");
+    }
+}
@@ -0,0 +1,377 @@
+"""
+Historical backtest of the strategy inside a yearn vault.
+
+Reads a time series of Aave rates, reward emissions and prices and replays it
+through the leverage model of `scripts/simulator.py`, one lane per scenario.
+Between harvests, interest and emissions accrue. At every harvest the model
+follows the contract:
+
+- `_claimAndSellRewards` sells the stkAAVE for AAVE and then sells AAVE for want
+- `prepareReturn` reports the profit or loss against the vault debt
+- the vault 0.4.3 `report` charges fees and locks profit
+- `adjustPosition` levers back to the target
+
+Input columns, one row per block or sampling point, sorted by time:
+
+    timestamp        unix seconds, the rates of a row hold until the next row
+    supply_rate      yearly rate of want deposits on Aave, 0.02 is 2%
+    borrow_rate      yearly variable borrow rate of want
+    supply_emission  stkAAVE emitted per whole want deposited per year
+    borrow_emission  stkAAVE emitted per whole want borrowed per year
+    aave_price       want per AAVE
+    stk_aave_price   want per stkAAVE, optional, defaults to aave_price
+
+CSV and Parquet files are read in chunks of `chunksize` rows. Only the
+accumulators since the last harvest are kept in memory, so multi-year series
+stream through. Parquet needs pyarrow.
+
+    brownie run backtest main <series.csv> [harvest_interval]
+"""
+
+import csv
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from scripts.simulator import (
+    COLLATERAL_RATIO_PRECISION,
+    PositionSimulator,
+    Scenarios,
+    _ints,
+    _mask,
+    _min,
+)
+
+SECONDS_PER_YEAR = 31_556_952
+MAX_BPS = 10_000
+WAD = 10 ** 18
+
+# Strategy
+PESSIMISM_FACTOR = 1_000
+MIN_REWARD_TO_SELL = 10 ** 15
+MAX_STK_AAVE_PRICE_IMPACT_BPS = 500
+
+# Vault 0.4.3
+DEGRADATION_COEFFICIENT = 10 ** 18
+LOCKED_PROFIT_DEGRADATION = 46 * 10 ** 12  # fully unlocked after ~6 hours
+
+COLUMNS = (
+    "timestamp",
+    "supply_rate",
+    "borrow_rate",
+    "supply_emission",
+    "borrow_emission",
+    "aave_price",
+)
+
+
+def read_csv(path, chunksize=100_000):
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) == chunksize:
+                yield _columns(rows)
+                rows = []
+        if rows:
+            yield _columns(rows)
+
+
+def _columns(rows):
+    return {
+        name: np.array([float(row[name]) for row in rows])
+        for name in rows[0]
+        if rows[0][name] != ""
+    }
+
+
+def read_parquet(path, chunksize=100_000):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+        yield {
+            name: batch.column(i).to_numpy().astype(float)
+            for i, name in enumerate(batch.schema.names)
+        }
+
+
+def read_series(path, chunksize=100_000):
+    if Path(path).suffix == ".parquet":
+        return read_parquet(path, chunksize)
+    return read_csv(path, chunksize)
+
+
+@dataclass
+class Fees:
+    performance_fee: int = 1_000
+    strategist_fee: int = 1_000
+    management_fee: int = 200
+
+
+@dataclass
+class BacktestResult:
+    want_decimals: int
+    timestamps: list = field(default_factory=list)
+    pps: list = field(default_factory=list)
+    estimated_total_assets: list = field(default_factory=list)
+    collat_ratio: list = field(default_factory=list)
+    profit: list = field(default_factory=list)
+    loss: list = field(default_factory=list)
+    skipped_harvests: int = 0
+
+    def pps_curve(self):
+        # harvests x scenarios, in whole want per share
+        return np.array(self.pps, dtype=float) / 10 ** self.want_decimals
+
+    def apr_curve(self):
+        # annualized share price growth between consecutive harvests
+        pps = self.pps_curve()
+        elapsed = np.diff(np.array(self.timestamps, dtype=float))[:, None]
+        return (pps[1:] / pps[:-1] - 1) * SECONDS_PER_YEAR / elapsed
+
+    def apr(self):
+        # annualized growth over the whole series, one value per scenario
+        pps = self.pps_curve()
+        elapsed = self.timestamps[-1] - self.timestamps[0]
+        return (pps[-1] / pps[0] - 1) * SECONDS_PER_YEAR / elapsed
+
+    def write_csv(self, path):
+        pps = self.pps_curve()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["timestamp"] + [f"pps_{i}" for i in range(pps.shape[1])])
+            for timestamp, row in zip(self.timestamps, pps):
+                writer.writerow([timestamp] + list(row))
+
+
+class Backtest:
+    def __init__(
+        self,
+        scenarios,
+        harvest_interval=24 * 3600,
+        fees=None,
+        swap_fee=0.006,
+        stk_aave_swap_fee=0.003,
+        min_reward_to_sell=MIN_REWARD_TO_SELL,
+    ):
+        # `scenarios.deposit` is what the vault lends to the strategy
+        self.s = scenarios
+        self.sim = PositionSimulator(scenarios)
+        self.harvest_interval = harvest_interval
+        self.fees = fees or Fees()
+        # AAVE => WETH => want on uniswap v2 and stkAAVE => AAVE on v3
+        self.swap_fee = swap_fee
+        self.stk_aave_swap_fee = stk_aave_swap_fee
+
+        n = scenarios.size
+        self.min_reward_to_sell = _ints(min_reward_to_sell, n)
+        self.decimals = int(scenarios.want_decimals[0])
+        assert (scenarios.want_decimals == self.decimals).all()
+        self.total_supply = scenarios.deposit.copy()
+        self.total_debt = scenarios.deposit.copy()
+        self.idle = _ints(0, n)
+        self.locked_profit = _ints(0, n)
+        self.stk_aave = _ints(0, n)
+        self.aave = _ints(0, n)
+        self.pending_rewards = _ints(0, n)
+        # harvests that sold AAVE, each costs the swaps' gas
+        self.reward_sales = _ints(0, n)
+
+        self.result = BacktestResult(self.decimals)
+        self._last = None  # last row, its rates hold until the next one
+        self._since = np.zeros(4)  # accumulators since the last harvest
+        self._last_report = None
+        self._next_harvest = None
+
+    def run(self, chunks):
+        for chunk in chunks:
+            self.feed(chunk)
+        return self.result
+
+    def feed(self, chunk):
+        missing = [name for name in COLUMNS if name not in chunk]
+        if missing:
+            raise ValueError(f"the series has no {', '.join(missing)} column")
+        chunk = dict(chunk)
+        chunk.setdefault("stk_aave_price", chunk["aave_price"])
+        t = chunk["timestamp"]
+        if self._last is None:
+            # the first row only opens the series
+            self._last = {k: v[0] for k, v in chunk.items()}
+            self._last_report = int(t[0])
+            self._next_harvest = t[0] + self.harvest_interval
+            self.sim.adjust_position(0)
+            self._record(int(t[0]))
+            chunk = {k: v[1:] for k, v in chunk.items()}
+            t = chunk["timestamp"]
+            if len(t) == 0:
+                return
+
+        # the rates of the previous row apply to each interval
+        def rates(name):
+            return np.concatenate(([self._last[name]], chunk[name][:-1]))
+
+        dt = np.diff(np.concatenate(([self._last["timestamp"]], t)))
+        dt = dt / SECONDS_PER_YEAR
+        growth = np.cumsum(
+            np.stack(
+                [
+                    np.log1p(rates("supply_rate") * dt),
+                    np.log1p(rates("borrow_rate") * dt),
+                    rates("supply_emission") * dt,
+                    rates("borrow_emission") * dt,
+                ],
+                axis=1,
+            ),
+            axis=0,
+        )
+        growth += self._since
+        base = np.zeros(4)
+        start = 0
+        while True:
+            j = start + np.searchsorted(t[start:], self._next_harvest)
+            if j == len(t):
+                break
+            self._accrue(growth[j] - base)
+            self.harvest(int(t[j]), chunk["aave_price"][j], chunk["stk_aave_price"][j])
+            base = growth[j]
+            start = j + 1
+            self._next_harvest = t[j] + self.harvest_interval
+        self._since = growth[-1] - base
+        self._last = {k: v[-1] for k, v in chunk.items()}
+
+    def _accrue(self, growth):
+        supply_log, borrow_log, supply_emission, borrow_emission = growth
+        sim = self.sim
+        unit = 10 ** self.decimals
+        self.pending_rewards += (
+            sim.deposits * int(supply_emission * WAD)
+            + sim.borrows * int(borrow_emission * WAD)
+        ) // unit
+        sim.deposits = sim.deposits * int(np.exp(supply_log) * WAD) // WAD
+        sim.borrows = sim.borrows * int(np.exp(borrow_log) * WAD) // WAD
+
+    def harvest(self, timestamp, aave_price, stk_aave_price):
+        # stkAAVE => AAVE has to clear maxStkAavePriceImpactBps or harvest reverts
+        stk_rate = stk_aave_price / aave_price * (1 - self.stk_aave_swap_fee)
+        if stk_rate < (MAX_BPS - MAX_STK_AAVE_PRICE_IMPACT_BPS) / MAX_BPS:
+            self.result.skipped_harvests += 1
+            self._record(timestamp, aave_price)
+            return
+
+        # _claimAndSellRewards, keeping 1 wei of stkAAVE
+        self.stk_aave += self.pending_rewards
+        self.pending_rewards = _ints(0, self.s.size)
+        sell = _mask(self.stk_aave >= self.min_reward_to_sell + 1)
+        sold = np.where(sell, self.stk_aave - 1, 0)
+        self.stk_aave -= sold
+        self.aave += sold * int(stk_rate * WAD) // WAD
+        sell = _mask(self.aave >= self.min_reward_to_sell)
+        self.reward_sales += np.where(sell, 1, 0)
+        want_per_aave = int(aave_price * (1 - self.swap_fee) * 10 ** self.decimals)
+        self.sim.want_balance += np.where(sell, self.aave * want_per_aave // WAD, 0)
+        self.aave = np.where(sell, 0, self.aave)
+
+        # prepareReturn, the vault has no debt outstanding at a 100% debt ratio
+        sim = self.sim
+        total_assets = sim.want_balance + sim.get_current_supply()
+        loss = np.where(
+            _mask(self.total_debt > total_assets), self.total_debt - total_assets, 0
+        )
+        profit = np.where(
+            _mask(self.total_debt > total_assets), 0, total_assets - self.total_debt
+        )
+        short = _mask(profit > sim.want_balance)
+        available, _ = sim.liquidate_position(profit, short)
+        profit = np.where(short, _min(profit, available), profit)
+
+        self.result.profit.append(profit)
+        self.result.loss.append(loss)
+        self._report(timestamp, profit, loss)
+        sim.adjust_position(0, ~short)
+        self._record(timestamp, aave_price)
+
+    def _report(self, timestamp, gain, loss):
+        self.total_debt = self.total_debt - loss
+        locked = self._locked_profit(timestamp)
+
+        # _assessFees, before the gain reaches the vault
+        fees = self.fees
+        duration = timestamp - self._last_report
+        total_fee = (
+            self.total_debt
+            * duration
+            * fees.management_fee
+            // (MAX_BPS * SECONDS_PER_YEAR)
+            + gain * (fees.performance_fee + fees.strategist_fee) // MAX_BPS
+        )
+        total_fee = _min(total_fee, gain)
+        free_funds = self.idle + self.total_debt - locked
+        self.total_supply = self.total_supply + np.where(
+            _mask(free_funds > 0), total_fee * self.total_supply // free_funds, 0
+        )
+
+        # the idle want of the last report is lent back, the gain stays idle
+        credit = self.idle
+        self.total_debt = self.total_debt + credit
+        self.sim.want_balance = self.sim.want_balance + credit - gain
+        self.idle = gain.copy()
+
+        # the loss is taken from the profit still locked first
+        locked = locked + gain - total_fee
+        self.locked_profit = np.where(_mask(locked > loss), locked - loss, 0)
+        self._last_report = timestamp
+
+    def _locked_profit(self, timestamp):
+        ratio = (timestamp - self._last_report) * LOCKED_PROFIT_DEGRADATION
+        if ratio >= DEGRADATION_COEFFICIENT:
+            return _ints(0, self.s.size)
+        unlocked = self.locked_profit * ratio // DEGRADATION_COEFFICIENT
+        return self.locked_profit - unlocked
+
+    def price_per_share(self, timestamp):
+        free_funds = self.idle + self.total_debt - self._locked_profit(timestamp)
+        return free_funds * 10 ** self.decimals // self.total_supply
+
+    def estimated_total_assets(self, aave_price=0):
+        # estimatedTotalAssets, rewards are valued at 90% of their swap value
+        sim = self.sim
+        balance = sim.want_balance + sim.get_current_supply()
+        stk = (
+            (self.pending_rewards + self.stk_aave)
+            * (MAX_BPS - MAX_STK_AAVE_PRICE_IMPACT_BPS)
+            // MAX_BPS
+        )
+        want_per_aave = int(aave_price * (1 - self.swap_fee) * 10 ** self.decimals)
+        rewards = (self.aave + stk) * want_per_aave // WAD
+        rewards = rewards * (MAX_BPS - PESSIMISM_FACTOR) // MAX_BPS
+        return np.where(_mask(balance < self.s.min_want), balance, balance + rewards)
+
+    def _record(self, timestamp, aave_price=0):
+        result = self.result
+        result.timestamps.append(timestamp)
+        result.pps.append(self.price_per_share(timestamp))
+        result.estimated_total_assets.append(self.estimated_total_assets(aave_price))
+        result.collat_ratio.append(self.sim.get_current_collat_ratio())
+
+
+def backtest(path, scenarios, chunksize=100_000, **kwargs):
+    return Backtest(scenarios, **kwargs).run(read_series(path, chunksize))
+
+
+def main(path, harvest_interval=24 * 3600):
+    import time
+
+    start = time.perf_counter()
+    scenarios = Scenarios.grid(
+        deposit=10 ** 24,
+        target_collat_ratio=[int(x * 1e16) for x in range(10, 79, 4)],
+        max_borrow_collat_ratio=int(0.795e18),
+    )
+    result = backtest(path, scenarios, harvest_interval=int(harvest_interval))
+    elapsed = time.perf_counter() - start
+    print(f"{len(result.timestamps)} harvests in {elapsed:.2f}s")
+    for target, apr in zip(scenarios.target_collat_ratio, result.apr()):
+        print(f"target {target / COLLATERAL_RATIO_PRECISION:.2f}: {apr:.2%} apr")
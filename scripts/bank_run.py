@@ -0,0 +1,84 @@
+"""
+Bank run load test schedules and reports.
+
+`deposit_sizes` splits a vault's deposits over many depositors, a few whales
+and a long tail of small ones. `withdrawal_schedule` interleaves their
+withdrawals, some in one go and some in parts, with keeper harvests in
+between. `LoadReport` collects the gas of every withdrawal, whether the
+`maxIterations` loop ran out before reaching the target and how far the
+collateral ratio drifted. tests/test_bank_run.py replays a schedule on a fork.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+HARVEST = -1
+PERCENTILES = (50, 95, 99)
+
+
+def deposit_sizes(count, total, sigma=2.0, seed=0):
+    # lognormal weights: most depositors are small, the largest hold a big share
+    weights = np.random.default_rng(seed).lognormal(0, sigma, count)
+    sizes = [int(total * weight) for weight in weights / weights.sum()]
+    sizes[int(np.argmax(weights))] += total - sum(sizes)
+    return sizes
+
+
+def withdrawal_schedule(count, share=0.8, partial=0.3, harvest_every=50, seed=0):
+    """
+    Steps of (depositor, bps of the depositor's remaining shares), with
+    `(HARVEST, 0)` steps for the keeper. `share` of the depositors withdraw,
+    `partial` of them in two parts that land anywhere in the run.
+    """
+    rng = np.random.default_rng(seed)
+    leaving = rng.choice(count, int(count * share), replace=False).tolist()
+    parts = {
+        depositor: int(rng.integers(1_000, 9_000))
+        for depositor in leaving
+        if rng.random() < partial
+    }
+    steps = leaving + list(parts)
+    rng.shuffle(steps)
+
+    schedule = []
+    for i, depositor in enumerate(steps):
+        if harvest_every and i and i % harvest_every == 0:
+            schedule.append((HARVEST, 0))
+        # the first of a depositor's two withdrawals is the partial one
+        schedule.append((depositor, parts.pop(depositor, 10_000)))
+    return schedule
+
+
+@dataclass
+class LoadReport:
+    gas: list = field(default_factory=list)
+    amounts: list = field(default_factory=list)
+    exhausted: list = field(default_factory=list)
+    drift: list = field(default_factory=list)
+
+    def record(self, gas, amount, exhausted, collat_ratio, target_collat_ratio):
+        self.gas.append(gas)
+        self.amounts.append(amount)
+        self.exhausted.append(exhausted)
+        self.drift.append((collat_ratio - target_collat_ratio) / 1e18)
+
+    def percentiles(self):
+        values = np.percentile(np.asarray(self.gas, dtype=float), PERCENTILES)
+        return {f"p{p}": int(value) for p, value in zip(PERCENTILES, values)}
+
+    def summary(self):
+        drift = np.asarray(self.drift, dtype=float)
+        return {
+            "withdrawals": len(self.gas),
+            **self.percentiles(),
+            "max_gas": max(self.gas),
+            "exhausted": int(np.sum(self.exhausted)),
+            "exhausted_rate": float(np.mean(self.exhausted)),
+            "max_drift": float(drift.max()),
+            "mean_abs_drift": float(np.abs(drift).mean()),
+        }
+
+    def print(self):
+        for key, value in self.summary().items():
+            print(f"{key:>16}: {value}")
@@ -0,0 +1,135 @@
+"""
+Gas breakdown of a transaction by internal function.
+
+Every opcode step of the tx trace is charged to the stack of functions it ran
+in: internal jumps come from brownie's source mapping (`fn`, `jumpDepth`),
+external calls and library delegatecalls from the call depth. The gas of a
+CALL step is what the caller lost over the call minus what the callee's own
+steps used, so every unit of gas is charged once.
+
+    brownie run gas_profile main <txid> [out.folded] --network mainnet-fork
+
+The `.folded` output is the collapsed stack format read by flamegraph.pl,
+inferno and speedscope.
+"""
+
+from collections import Counter
+from pathlib import Path
+
+# internal functions and calls worth a line in the summary even when small
+FOCUS = (
+    "Strategy.prepareReturn",
+    "Strategy.adjustPosition",
+    "Strategy.liquidatePosition",
+    "Strategy._claimAndSellRewards",
+    "Strategy._leverMax",
+    "Strategy._leverDownTo",
+    "Strategy._freeFunds",
+    "FlashMintLib.doFlashMint",
+    "FlashMintLib.loanLogic",
+)
+
+
+def step_costs(trace):
+    """Gas used by each step, with calls charged only their own overhead."""
+    costs = [0] * len(trace)
+    calls = []  # [index of the call step, gas used by the callee's steps]
+    for i, step in enumerate(trace):
+        while calls and step["depth"] <= trace[calls[-1][0]]["depth"]:
+            index, inner = calls.pop()
+            total = trace[index]["gas"] - step["gas"]
+            costs[index] = total - inner
+            if calls:
+                calls[-1][1] += total
+
+        nxt = trace[i + 1] if i + 1 < len(trace) else None
+        if nxt is not None and nxt["depth"] > step["depth"]:
+            calls.append([i, 0])
+            continue
+        if nxt is not None and nxt["depth"] == step["depth"]:
+            costs[i] = step["gas"] - nxt["gas"]
+        else:
+            # last step of a frame, the tx or a call that reverted
+            costs[i] = step["gasCost"]
+        if calls:
+            calls[-1][1] += costs[i]
+
+    # calls still open at the end of the trace ran out of gas or reverted
+    for index, inner in calls:
+        costs[index] = trace[index]["gasCost"]
+    return costs
+
+
+def function_stacks(trace):
+    """The stack of `Contract.function` names each step ran in."""
+    frames = {}  # call depth => functions by jump depth
+    for step in trace:
+        depth = step["depth"]
+        for d in [d for d in frames if d > depth]:
+            del frames[d]
+        functions = frames.setdefault(depth, [])
+        jump_depth = step.get("jumpDepth", 0)
+        fn = step.get("fn", "<unknown>")
+        del functions[jump_depth + 1 :]
+        functions.extend([fn] * (jump_depth + 1 - len(functions)))
+        functions[jump_depth] = fn
+        yield tuple(fn for d in sorted(frames) for fn in frames[d])
+
+
+class GasProfile:
+    def __init__(self, tx):
+        self.tx = tx
+        trace = tx.trace
+        self.stacks = Counter()
+        for stack, cost in zip(function_stacks(trace), step_costs(trace)):
+            self.stacks[stack] += cost
+
+    @property
+    def attributed(self):
+        return sum(self.stacks.values())
+
+    def inclusive(self):
+        # gas of every function including what it called, recursion counted once
+        totals = Counter()
+        for stack, gas in self.stacks.items():
+            for fn in set(stack):
+                totals[fn] += gas
+        return totals
+
+    def exclusive(self):
+        totals = Counter()
+        for stack, gas in self.stacks.items():
+            totals[stack[-1]] += gas
+        return totals
+
+    def folded(self):
+        return "\n".join(
+            f"{';'.join(stack)} {gas}"
+            for stack, gas in sorted(self.stacks.items())
+            if gas > 0
+        )
+
+    def write_folded(self, path):
+        Path(path).write_text(self.folded() + "\n")
+
+    def summary(self, top=20):
+        inclusive = self.inclusive()
+        exclusive = self.exclusive()
+        lines = [
+            f"{self.tx.txid} {self.tx.fn_name}: {self.tx.gas_used:,} gas used, "
+            f"{self.attributed:,} in the trace",
+            f"{'function':<60}{'inclusive':>14}{'self':>12}",
+        ]
+        names = [fn for fn, _ in inclusive.most_common(top)]
+        names += [fn for fn in FOCUS if fn in inclusive and fn not in names]
+        for fn in names:
+            lines.append(f"{fn:<60}{inclusive[fn]:>14,}{exclusive[fn]:>12,}")
+        return "\n".join(lines)
+
+
+def main(txid, out=None):
+    from brownie import chain
+
+    gas_profile = GasProfile(chain.get_transaction(txid))
+    print(gas_profile.summary())
+    gas_profile.write_folded(out or f"{txid}.folded")
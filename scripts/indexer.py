@@ -0,0 +1,353 @@
+"""
+Incremental SQLite index of the strategy events.
+
+Follows the `Deployed` and `Cloned` events of every LevAaveFactory added to it,
+and the `Harvested` and `Leverage` events of every strategy they deploy.
+`Leverage` is declared in FlashMintLib, but the library runs in the
+strategy's context, so those logs come from the strategy's address too.
+
+Every contract keeps a cursor, the last block its logs were stored for, and a
+sync only asks for the blocks after it. Logs are fetched with one
+`eth_getLogs` per range of blocks for all the contracts behind it, and a range
+is halved when the node refuses it. Logs, cursors and block hashes are
+committed together, one range at a time, so an interrupted sync resumes where
+it stopped. Every sync first checks the hash of the last stored block. After
+a reorg, everything above the last block still on the chain is dropped and
+indexed again.
+
+Amounts are uint256, which SQLite integers can't hold. They are stored as
+decimal text and `bigsum` adds them up exactly.
+
+    brownie run indexer main <factory> [path] [from_block] --network mainnet
+"""
+
+import sqlite3
+
+# keccak256 of the event signatures
+HARVESTED = "0x4c0f499ffe6befa0ca7c826b0916cf87bea98de658013e76938489368d60d509"
+LEVERAGE = "0x1b861d4c31d2586a4a0ba63fafad6452b1baf4e1dc2f751a97fef380b34032a7"
+CLONED = "0x783540fb4221a3238720dc7038937d0d79982bcf895274aa6ad179f82cf0d53c"
+DEPLOYED = "0xf40fcec21964ffb566044d083b4073f29f7f7929110ea19e1b3ebe375d89055e"
+
+TOPICS = {"factory": [CLONED, DEPLOYED], "strategy": [HARVESTED, LEVERAGE]}
+DAY = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contracts (
+    address TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    factory TEXT,
+    since INTEGER NOT NULL,
+    cursor INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS harvests (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    profit TEXT NOT NULL,
+    loss TEXT NOT NULL,
+    debt_payment TEXT NOT NULL,
+    debt_outstanding TEXT NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE TABLE IF NOT EXISTS flash_mints (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    amount_requested TEXT NOT NULL,
+    amount_used TEXT NOT NULL,
+    required_dai TEXT NOT NULL,
+    amount_to_close_ltv_gap TEXT NOT NULL,
+    deficit INTEGER NOT NULL,
+    lender TEXT NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE TABLE IF NOT EXISTS clones (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    factory TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    original INTEGER NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS harvests_strategy ON harvests (strategy, block);
+CREATE INDEX IF NOT EXISTS flash_mints_strategy ON flash_mints (strategy, block);
+"""
+
+EVENT_TABLES = ("harvests", "flash_mints", "clones")
+
+
+class BigSum:
+    def __init__(self):
+        self.total = 0
+
+    def step(self, value):
+        if value is not None:
+            self.total += int(value)
+
+    def finalize(self):
+        return str(self.total)
+
+
+def _bytes(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+
+def _hex(value):
+    return "0x" + _bytes(value).hex()
+
+
+def _words(data):
+    data = _bytes(data)
+    return [int.from_bytes(data[i : i + 32], "big") for i in range(0, len(data), 32)]
+
+
+def _address(word):
+    if isinstance(word, int):
+        word = word.to_bytes(32, "big")
+    return "0x" + word[-20:].hex()
+
+
+class Indexer:
+    def __init__(self, path="events.db", web3=None, batch=10_000, confirmations=0):
+        if web3 is None:
+            from brownie import web3
+        self.web3 = web3
+        self.batch = batch
+        self.confirmations = confirmations
+        self.db = sqlite3.connect(path)
+        self.db.create_aggregate("bigsum", 1, BigSum)
+        self.db.executescript(SCHEMA)
+
+    def add_factory(self, factory, from_block=0):
+        with self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO contracts VALUES (?, 'factory', NULL, ?, ?)",
+                (str(factory).lower(), from_block, from_block - 1),
+            )
+
+    # SYNC
+    def sync(self):
+        """
+        Index every contract up to the head, less `confirmations`. Returns the
+        number of logs stored.
+        """
+        self._rewind()
+        head = self.web3.eth.block_number - self.confirmations
+        # factories first, the strategies they deploy are followed from there
+        return self._sync_kind("factory", head) + self._sync_kind("strategy", head)
+
+    def _sync_kind(self, kind, head):
+        stored = 0
+        while True:
+            cursors = dict(
+                self.db.execute(
+                    "SELECT address, cursor FROM contracts "
+                    "WHERE kind = ? AND cursor < ?",
+                    (kind, head),
+                ).fetchall()
+            )
+            if not cursors:
+                return stored
+            start = min(cursors.values()) + 1
+            end = min(start + self.batch - 1, head)
+            # every contract behind this range, the stored logs are skipped below
+            addresses = [a for a, cursor in cursors.items() if cursor < end]
+            logs, end = self._get_logs(addresses, start, end, TOPICS[kind])
+            with self.db:
+                for log in logs:
+                    address = log["address"].lower()
+                    if log["blockNumber"] > cursors[address]:
+                        stored += self._store(kind, address, log)
+                self._store_block(end)
+                self.db.executemany(
+                    "UPDATE contracts SET cursor = ? WHERE address = ? AND cursor < ?",
+                    [(end, a, end) for a in addresses],
+                )
+
+    def _get_logs(self, addresses, start, end, topics):
+        # nodes cap the blocks or results of a query, retry with half the range
+        while True:
+            try:
+                logs = self.web3.eth.get_logs(
+                    {
+                        "address": [self._checksum(a) for a in addresses],
+                        "fromBlock": start,
+                        "toBlock": end,
+                        "topics": [topics],
+                    }
+                )
+                return logs, end
+            except ValueError:
+                if end == start:
+                    raise
+                end = start + (end - start) // 2
+
+    def _checksum(self, address):
+        to_checksum = getattr(self.web3, "toChecksumAddress", None)
+        return to_checksum(address) if to_checksum else address
+
+    def _store_block(self, number):
+        block = self.web3.eth.get_block(number)
+        self.db.execute(
+            "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)",
+            (number, _hex(block["hash"]), block["timestamp"]),
+        )
+
+    def _store(self, kind, address, log):
+        topic = _hex(log["topics"][0])
+        key = (log["blockNumber"], log["logIndex"], _hex(log["transactionHash"]))
+        words = _words(log["data"])
+        if topic == HARVESTED:
+            table = "harvests"
+            row = (*key, address, *(str(w) for w in words[:4]))
+        elif topic == LEVERAGE:
+            table = "flash_mints"
+            row = (
+                *key,
+                address,
+                *(str(w) for w in words[:4]),
+                words[4],
+                _address(words[5]),
+            )
+        elif topic in (CLONED, DEPLOYED):
+            table = "clones"
+            strategy = _address(_bytes(log["topics"][1]))
+            row = (*key, address, strategy, int(topic == DEPLOYED))
+            # strategies can't log before the block that deployed them
+            self.db.execute(
+                "INSERT OR IGNORE INTO contracts VALUES (?, 'strategy', ?, ?, ?)",
+                (strategy, address, log["blockNumber"], log["blockNumber"] - 1),
+            )
+        else:
+            return 0
+        if kind == "strategy":
+            self._store_block(log["blockNumber"])
+        cursor = self.db.execute(
+            f"INSERT OR IGNORE INTO {table} VALUES ({', '.join('?' * len(row))})",
+            row,
+        )
+        return cursor.rowcount
+
+    def _rewind(self):
+        # walk back from the last stored block to the last one still on chain
+        fork = None
+        for number, stored_hash in self.db.execute(
+            "SELECT number, hash FROM blocks ORDER BY number DESC"
+        ).fetchall():
+            if _hex(self.web3.eth.get_block(number)["hash"]) == stored_hash:
+                fork = number
+                break
+            fork = -1
+        if fork is None or fork == self._last_block():
+            return
+        with self.db:
+            for table in EVENT_TABLES:
+                self.db.execute(f"DELETE FROM {table} WHERE block > ?", (fork,))
+            self.db.execute("DELETE FROM blocks WHERE number > ?", (fork,))
+            self.db.execute(
+                "DELETE FROM contracts WHERE kind = 'strategy' AND since > ?", (fork,)
+            )
+            self.db.execute(
+                "UPDATE contracts SET cursor = MAX(?, since - 1) WHERE cursor > ?",
+                (fork, fork),
+            )
+
+    def _last_block(self):
+        return self.db.execute("SELECT MAX(number) FROM blocks").fetchone()[0]
+
+    # QUERIES
+    def strategies(self, factory=None):
+        query = "SELECT address FROM contracts WHERE kind = 'strategy'"
+        args = ()
+        if factory is not None:
+            query += " AND factory = ?"
+            args = (str(factory).lower(),)
+        return [row[0] for row in self.db.execute(query + " ORDER BY since", args)]
+
+    def _series(self, table, columns, strategy, interval, since):
+        where = ["b.timestamp >= ?"]
+        args = [interval, interval, since]
+        if strategy is not None:
+            where.append("t.strategy = ?")
+            args.append(str(strategy).lower())
+        rows = self.db.execute(
+            f"""
+            SELECT t.strategy, b.timestamp / ? * ? AS period, COUNT(*),
+                {', '.join(f'bigsum(t.{c})' for c in columns)}
+            FROM {table} t JOIN blocks b ON b.number = t.block
+            WHERE {' AND '.join(where)}
+            GROUP BY t.strategy, period
+            ORDER BY t.strategy, period
+            """,
+            args,
+        )
+        for row in rows:
+            yield row[:3] + tuple(int(value) for value in row[3:])
+
+    def profit_and_loss(self, strategy=None, interval=DAY, since=0):
+        """
+        `(strategy, period start, harvests, profit, loss)` per `interval`
+        seconds, in want.
+        """
+        return list(
+            self._series("harvests", ["profit", "loss"], strategy, interval, since)
+        )
+
+    def flash_mints(self, strategy=None, interval=DAY, since=0):
+        """
+        `(strategy, period start, flash mints, want moved, dai used)` per
+        `interval` seconds. The want is `amountUsed`, the dai `requiredDAI`.
+        """
+        return list(
+            self._series(
+                "flash_mints",
+                ["amount_used", "required_dai"],
+                strategy,
+                interval,
+                since,
+            )
+        )
+
+    def totals(self, strategy):
+        # lifetime profit, loss, flash mints and dai of one strategy
+        strategy = str(strategy).lower()
+        harvests, profit, loss = self.db.execute(
+            "SELECT COUNT(*), bigsum(profit), bigsum(loss) FROM harvests "
+            "WHERE strategy = ?",
+            (strategy,),
+        ).fetchone()
+        flash_mints, dai = self.db.execute(
+            "SELECT COUNT(*), bigsum(required_dai) FROM flash_mints "
+            "WHERE strategy = ?",
+            (strategy,),
+        ).fetchone()
+        return dict(
+            harvests=harvests,
+            profit=int(profit or 0),
+            loss=int(loss or 0),
+            flash_mints=flash_mints,
+            dai=int(dai or 0),
+        )
+
+
+def main(factory, path="events.db", from_block=0):
+    import time
+
+    indexer = Indexer(path)
+    indexer.add_factory(factory, int(from_block))
+    start = time.perf_counter()
+    stored = indexer.sync()
+    print(f"{stored} logs in {time.perf_counter() - start:.2f}s")
+    for strategy in indexer.strategies(factory):
+        print(strategy, indexer.totals(strategy))
@@ -0,0 +1,127 @@
+"""
+Keeper daemon for every strategy deployed by a LevAaveFactory.
+
+The original and all the clones are discovered from the factory's `Deployed`
+and `Cloned` events, new clones are picked up at the start of every cycle.
+The triggers of all strategies are polled concurrently, at most `concurrency`
+at a time, and the resulting harvests and tends are sent one by one from the
+keeper account. brownie is synchronous, so each call runs in a worker thread.
+
+    brownie run keeper main <factory> [interval] [concurrency] --network mainnet
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import click
+from brownie import LevAaveFactory, Strategy, accounts, chain, web3
+
+# gas a harvest or tend of a levered position takes, priced for the triggers
+HARVEST_GAS = 2_500_000
+TEND_GAS = 1_500_000
+
+
+@dataclass
+class CycleReport:
+    started: float
+    duration: float = 0
+    checked: int = 0
+    harvested: List[str] = field(default_factory=list)
+    tended: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def __str__(self):
+        return (
+            f"cycle took {self.duration:.2f}s: checked {self.checked}, "
+            f"harvested {len(self.harvested)}, tended {len(self.tended)}, "
+            f"errors {len(self.errors)}"
+        )
+
+
+class Keeper:
+    def __init__(self, factory, account, concurrency=8, from_block=0):
+        self.factory = factory
+        self.account = account
+        self.concurrency = concurrency
+        self.strategies = {}
+        self._events = web3.eth.contract(factory.address, abi=factory.abi).events
+        self._from_block = from_block
+
+    def discover(self):
+        to_block = chain.height
+        if self._from_block > to_block:
+            return []
+        logs = self._events.Deployed.getLogs(
+            fromBlock=self._from_block, toBlock=to_block
+        ) + self._events.Cloned.getLogs(fromBlock=self._from_block, toBlock=to_block)
+        self._from_block = to_block + 1
+
+        found = []
+        for log in logs:
+            address = log.args.get("clone", log.args.get("original"))
+            if address not in self.strategies:
+                self.strategies[address] = Strategy.at(address)
+                found.append(address)
+        return found
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _triggers(self, semaphore, strategy, gas_price):
+        async with semaphore:
+            return await asyncio.gather(
+                self._call(strategy.harvestTrigger, HARVEST_GAS * gas_price),
+                self._call(strategy.tendTrigger, TEND_GAS * gas_price),
+            )
+
+    async def cycle(self):
+        report = CycleReport(started=time.time())
+        start = time.perf_counter()
+
+        await self._call(self.discover)
+        gas_price = await self._call(lambda: web3.eth.gas_price)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        strategies = list(self.strategies.values())
+        triggers = await asyncio.gather(
+            *(self._triggers(semaphore, s, gas_price) for s in strategies),
+            return_exceptions=True,
+        )
+        report.checked = len(strategies)
+
+        # txs go out one at a time so the keeper nonce stays in order
+        for strategy, result in zip(strategies, triggers):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                (harvest, tend) = result
+                if harvest:
+                    await self._call(strategy.harvest, {"from": self.account})
+                    report.harvested.append(strategy.address)
+                elif tend:
+                    await self._call(strategy.tend, {"from": self.account})
+                    report.tended.append(strategy.address)
+            except Exception as e:
+                report.errors[strategy.address] = repr(e)
+
+        report.duration = time.perf_counter() - start
+        return report
+
+    async def run(self, interval, cycles=None):
+        n = 0
+        while cycles is None or n < cycles:
+            report = await self.cycle()
+            print(report)
+            for address, error in report.errors.items():
+                print(f"  {address}: {error}")
+            n += 1
+            await asyncio.sleep(max(0, interval - report.duration))
+
+
+def main(factory, interval=600, concurrency=8):
+    keeper_account = accounts.load(
+        click.prompt("Keeper account", type=click.Choice(accounts.load()))
+    )
+    keeper = Keeper(LevAaveFactory.at(factory), keeper_account, int(concurrency))
+    asyncio.run(keeper.run(int(interval)))
@@ -0,0 +1,429 @@
+"""
+Search for the strategy parameters that earn the most, net of gas and risk.
+
+Every candidate `targetCollatRatio`, `maxCollatRatio`, `minRatio`, `minWant`,
+`maxIterations` and `minRewardToSell` runs through the backtest of
+`scripts/backtest.py` over a rate series, one lane per candidate. The score is
+its net APR: share price growth less the keeper gas of its harvests,
+rebalances and reward sales. Candidates are infeasible when they revert, or
+when a spike of `stress_borrow_rate` on top of the series' mean rates would
+liquidate a position at `maxCollatRatio` in less than `reaction_days`, see
+`scripts/stress.py`.
+
+`search` sweeps a grid, split in chunks over a process pool. `bayesian_search`
+samples the same space with optuna's TPE sampler, a batch of trials per round
+of the pool, and needs optuna installed. The best candidate comes out as the
+`setCollateralTargets`, `setMinsAndMaxs` and `setRewardBehavior` calls that
+apply it.
+
+    brownie run optimizer main <series.csv> [strategy] [workers] --network mainnet
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from itertools import product, repeat
+
+import numpy as np
+
+from scripts.backtest import SECONDS_PER_YEAR, Backtest, read_series
+from scripts.simulator import (
+    COLLATERAL_RATIO_PRECISION,
+    DEFAULT_COLLAT_MAX_MARGIN,
+    DEFAULT_COLLAT_TARGET_MARGIN,
+    Scenarios,
+    _ints,
+    estimate_gas,
+)
+from scripts.stress import Fleet, Shocks, stress
+
+PARAMETERS = (
+    "target_collat_ratio",
+    "max_collat_ratio",
+    "min_ratio",
+    "min_want",
+    "max_iterations",
+    "min_reward_to_sell",
+)
+
+# gas of a harvest that neither rebalances nor sells, and of a reward sale
+HARVEST_GAS = 400_000
+REWARD_SALE_GAS = 350_000
+
+
+@dataclass
+class Market:
+    deposit: int = 10 ** 24  # want the vault lends to the strategy
+    want_decimals: int = 18
+    want_price: int = 10 ** 18  # aave oracle, eth per whole want
+    max_borrow_collat_ratio: int = int(0.795e18)
+    liquidation_threshold: int = int(0.825e18)
+    dai_borrow_collat_ratio: int = int(0.745e18)
+    is_flash_mint_active: bool = True
+    harvest_interval: int = 24 * 3600
+    gas_price: float = 50  # gwei
+    stress_borrow_rate: float = 0.5
+    reaction_days: float = 1
+
+
+@dataclass
+class Candidates:
+    target_collat_ratio: object
+    max_collat_ratio: object
+    min_ratio: object = int(0.005e18)
+    min_want: object = 100
+    max_iterations: object = 6
+    min_reward_to_sell: object = 10 ** 15
+    size: int = field(init=False)
+
+    def __post_init__(self):
+        self.size = max(np.size(getattr(self, name)) for name in PARAMETERS)
+        for name in PARAMETERS:
+            setattr(self, name, _ints(getattr(self, name), self.size))
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def grid(cls, **axes):
+        # cartesian product, `max_margin` sets maxCollatRatio above the target
+        axes.setdefault(
+            "max_margin", DEFAULT_COLLAT_TARGET_MARGIN - DEFAULT_COLLAT_MAX_MARGIN
+        )
+        keys = list(axes)
+        combos = list(product(*(np.atleast_1d(axes[k]) for k in keys)))
+        columns = {k: [combo[i] for combo in combos] for i, k in enumerate(keys)}
+        margins = columns.pop("max_margin")
+        if "max_collat_ratio" not in columns:
+            columns["max_collat_ratio"] = [
+                int(target) + int(margin)
+                for target, margin in zip(columns["target_collat_ratio"], margins)
+            ]
+        return cls(**columns)
+
+    def take(self, index):
+        return Candidates(**{name: getattr(self, name)[index] for name in PARAMETERS})
+
+    def valid(self, market):
+        # the requires of setCollateralTargets, setMinsAndMaxs and
+        # setRewardBehavior, maxBorrowCollatRatio is the market's
+        checks = [
+            self.target_collat_ratio < market.liquidation_threshold,
+            self.max_collat_ratio < market.liquidation_threshold,
+            self.target_collat_ratio < self.max_collat_ratio,
+            self.min_ratio < market.max_borrow_collat_ratio,
+            self.max_iterations > 0,
+            self.max_iterations < 16,
+            self.min_want <= 2 ** 128 - 1,
+            self.min_reward_to_sell <= 2 ** 96 - 1,
+        ]
+        return np.logical_and.reduce([np.asarray(c, dtype=bool) for c in checks])
+
+    def row(self, i):
+        return {name: int(getattr(self, name)[i]) for name in PARAMETERS}
+
+
+@dataclass
+class Evaluation:
+    apr: np.ndarray  # share price growth
+    gas_apr: np.ndarray  # keeper gas, as a yearly share of the deposit
+    net_apr: np.ndarray
+    days_to_liquidation: np.ndarray  # at maxCollatRatio under the rate spike
+    feasible: np.ndarray
+
+    @property
+    def score(self):
+        return np.where(self.feasible, self.net_apr, -np.inf)
+
+    @classmethod
+    def concat(cls, parts):
+        return cls(
+            *(np.concatenate([getattr(p, f.name) for p in parts]) for f in fields(cls))
+        )
+
+
+def _years(series):
+    return (series["timestamp"][-1] - series["timestamp"][0]) / SECONDS_PER_YEAR
+
+
+def _days_to_liquidation(candidates, series, market):
+    # a position at maxCollatRatio that the keeper hasn't tended yet
+    n = len(candidates)
+    threshold = market.liquidation_threshold / COLLATERAL_RATIO_PRECISION
+    max_ratio = candidates.max_collat_ratio.astype(float) / COLLATERAL_RATIO_PRECISION
+    fleet = Fleet(
+        names=list(range(n)),
+        deposits=np.ones(n),
+        borrows=max_ratio,
+        dai_collateral=np.zeros(n),
+        liquidation_threshold=np.full(n, threshold),
+        dai_liquidation_threshold=np.zeros(n),
+        target_collat_ratio=candidates.target_collat_ratio.astype(float)
+        / COLLATERAL_RATIO_PRECISION,
+        max_collat_ratio=max_ratio,
+        supply_rate=np.full(n, np.mean(series["supply_rate"])),
+        borrow_rate=np.full(n, np.mean(series["borrow_rate"])),
+    )
+    shocks = Shocks.grid(borrow_rate=market.stress_borrow_rate)
+    return stress(fleet, shocks).days_to_liquidation[:, 0]
+
+
+def evaluate(candidates, series, market):
+    scenarios = Scenarios(
+        deposit=market.deposit,
+        target_collat_ratio=candidates.target_collat_ratio,
+        max_borrow_collat_ratio=market.max_borrow_collat_ratio,
+        max_iterations=candidates.max_iterations,
+        is_flash_mint_active=market.is_flash_mint_active,
+        max_collat_ratio=candidates.max_collat_ratio,
+        dai_borrow_collat_ratio=market.dai_borrow_collat_ratio,
+        min_want=candidates.min_want,
+        min_ratio=candidates.min_ratio,
+        want_price=market.want_price,
+        want_decimals=market.want_decimals,
+    )
+    backtest = Backtest(
+        scenarios,
+        harvest_interval=market.harvest_interval,
+        min_reward_to_sell=candidates.min_reward_to_sell,
+    )
+    result = backtest.run([series])
+    sim = backtest.sim
+
+    harvests = len(result.profit)
+    gas = (
+        harvests * HARVEST_GAS
+        + backtest.reward_sales * REWARD_SALE_GAS
+        + estimate_gas(sim.iterations, sim.flash_mints, sim.aave_calls, base=0)
+    )
+    gas_in_want = gas.astype(float) * market.gas_price * 1e9 / market.want_price
+    gas_apr = gas_in_want / (market.deposit / 10 ** market.want_decimals)
+    gas_apr = gas_apr / _years(series)
+    apr = result.apr().astype(float)
+    days = _days_to_liquidation(candidates, series, market)
+    return Evaluation(
+        apr=apr,
+        gas_apr=gas_apr,
+        net_apr=apr - gas_apr,
+        days_to_liquidation=days,
+        feasible=candidates.valid(market)
+        & ~sim.reverted
+        & (days > market.reaction_days),
+    )
+
+
+def _evaluate_valid(candidates, series, market):
+    # invalid lanes would revert in the setters, skip their backtest
+    valid = candidates.valid(market)
+    n = len(candidates)
+    out = Evaluation(
+        apr=np.full(n, np.nan),
+        gas_apr=np.full(n, np.nan),
+        net_apr=np.full(n, np.nan),
+        days_to_liquidation=np.zeros(n),
+        feasible=np.zeros(n, dtype=bool),
+    )
+    if valid.any():
+        part = evaluate(candidates.take(valid), series, market)
+        for f in fields(Evaluation):
+            getattr(out, f.name)[valid] = getattr(part, f.name)
+    return out
+
+
+def _map(candidates, series, market, workers, chunk):
+    chunks = [
+        candidates.take(slice(i, i + chunk)) for i in range(0, len(candidates), chunk)
+    ]
+    if workers == 1:
+        parts = [_evaluate_valid(c, series, market) for c in chunks]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(
+                pool.map(_evaluate_valid, chunks, repeat(series), repeat(market))
+            )
+    return Evaluation.concat(parts)
+
+
+@dataclass
+class SearchResult:
+    candidates: Candidates
+    evaluation: Evaluation
+
+    def ranking(self):
+        return np.argsort(-self.evaluation.score, kind="stable")
+
+    def best(self, count=10):
+        rows = []
+        for i in self.ranking()[:count]:
+            row = self.candidates.row(i)
+            for f in fields(Evaluation):
+                row[f.name] = getattr(self.evaluation, f.name)[i].item()
+            rows.append(row)
+        return rows
+
+    def recommendation(self):
+        best = self.ranking()[0]
+        if not self.evaluation.feasible[best]:
+            raise ValueError("no feasible candidate")
+        return Recommendation(**self.candidates.row(best))
+
+
+def search(candidates, series, market=None, workers=None, chunk=256):
+    """
+    Scores every candidate. `workers` processes of `chunk` candidates, None is
+    one per cpu and 1 runs in this process.
+    """
+    market = market or Market()
+    return SearchResult(candidates, _map(candidates, series, market, workers, chunk))
+
+
+def bayesian_search(space, series, market=None, trials=256, batch=32, workers=None):
+    """
+    TPE search of `space`, `{parameter: (low, high)}` with the parameters of
+    `Candidates`. Those left out keep their defaults.
+    """
+    import optuna
+
+    market = market or Market()
+    study = optuna.create_study(direction="maximize")
+    tried = []
+    scores = []
+    for _ in range(0, trials, batch):
+        asked = [study.ask() for _ in range(batch)]
+        columns = {
+            name: [trial.suggest_int(name, int(low), int(high)) for trial in asked]
+            for name, (low, high) in space.items()
+        }
+        candidates = Candidates(**columns)
+        evaluation = _map(candidates, series, market, workers, max(batch // 4, 1))
+        for trial, score in zip(asked, evaluation.score):
+            if np.isfinite(score):
+                study.tell(trial, float(score))
+            else:
+                study.tell(trial, state=optuna.trial.TrialState.FAIL)
+        tried.append(candidates)
+        scores.append(evaluation)
+
+    candidates = Candidates(
+        **{
+            name: np.concatenate([getattr(c, name) for c in tried])
+            for name in PARAMETERS
+        }
+    )
+    return SearchResult(candidates, Evaluation.concat(scores))
+
+
+@dataclass
+class Recommendation:
+    target_collat_ratio: int
+    max_collat_ratio: int
+    min_ratio: int
+    min_want: int
+    max_iterations: int
+    min_reward_to_sell: int
+
+    def calls(self, strategy):
+        # the arguments this search doesn't cover keep the strategy's values
+        return [
+            (
+                "setCollateralTargets",
+                (
+                    self.target_collat_ratio,
+                    self.max_collat_ratio,
+                    strategy.maxBorrowCollatRatio(),
+                    strategy.daiBorrowCollatRatio(),
+                ),
+            ),
+            ("setMinsAndMaxs", (self.min_want, self.min_ratio, self.max_iterations)),
+            (
+                "setRewardBehavior",
+                (
+                    strategy.swapRouter(),
+                    strategy.sellStkAave(),
+                    strategy.cooldownStkAave(),
+                    self.min_reward_to_sell,
+                    strategy.maxStkAavePriceImpactBps(),
+                    strategy.stkAaveToAaveSwapFee(),
+                    strategy.aaveToWethSwapFee(),
+                    strategy.wethToWantSwapFee(),
+                ),
+            ),
+        ]
+
+    def format(self, strategy, name="strategy", sender="gov"):
+        return [
+            f"{name}.{fn}({', '.join(str(arg) for arg in args)}, "
+            f'{{"from": {sender}}})'
+            for fn, args in self.calls(strategy)
+        ]
+
+    def send(self, strategy, account):
+        return [
+            getattr(strategy, fn)(*args, {"from": account})
+            for fn, args in self.calls(strategy)
+        ]
+
+
+def default_grid(market):
+    threshold = market.liquidation_threshold
+    unit = 10 ** market.want_decimals
+    return Candidates.grid(
+        target_collat_ratio=[threshold - int(m * 1e16) for m in range(1, 11)],
+        max_margin=[int(0.005e18), int(0.01e18), int(0.015e18)],
+        min_ratio=[int(0.001e18), int(0.005e18), int(0.01e18)],
+        min_want=[100, unit // 100],
+        max_iterations=[2, 6, 10],
+        min_reward_to_sell=[10 ** 15, 10 ** 17, 10 ** 18],
+    )
+
+
+def read_market(strategy, **kwargs):
+    from brownie import Contract, interface
+
+    from scripts.stress import PROTOCOL_DATA_PROVIDER
+
+    snapshot = strategy.getPositionSnapshot().dict()
+    want = Contract(strategy.want())
+    oracle = interface.IPriceOracle(
+        interface.ILendingPoolAddressesProvider(
+            interface.IProtocolDataProvider(PROTOCOL_DATA_PROVIDER).ADDRESSES_PROVIDER()
+        ).getPriceOracle()
+    )
+    return Market(
+        deposit=strategy.estimatedTotalAssets(),
+        want_decimals=want.decimals(),
+        want_price=oracle.getAssetPrice(want),
+        max_borrow_collat_ratio=snapshot["maxBorrowCollatRatio"],
+        liquidation_threshold=snapshot["liquidationThreshold"],
+        dai_borrow_collat_ratio=strategy.daiBorrowCollatRatio(),
+        is_flash_mint_active=strategy.isFlashMintActive(),
+        **kwargs,
+    )
+
+
+def read_whole_series(path):
+    chunks = list(read_series(path))
+    return {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+
+
+def main(path, strategy=None, workers=None):
+    import time
+
+    if strategy is not None:
+        from brownie import Strategy
+
+        strategy = Strategy.at(strategy)
+        market = read_market(strategy)
+    else:
+        market = Market()
+    workers = int(workers) if workers else None
+
+    series = read_whole_series(path)
+    candidates = default_grid(market)
+    start = time.perf_counter()
+    result = search(candidates, series, market, workers)
+    elapsed = time.perf_counter() - start
+    print(f"{len(candidates)} candidates in {elapsed:.2f}s")
+    for row in result.best(5):
+        print(row)
+    if strategy is not None:
+        print("\n".join(result.recommendation().format(strategy)))
@@ -0,0 +1,483 @@
+"""
+Offline model of the Strategy leverage math.
+
+Every scenario is one lane of a set of numpy object arrays, so all the amounts
+keep Python's arbitrary precision integers and every division floors exactly
+like SafeMath's `div`. Aave is modelled as a plain ledger (no interest, no
+index rounding) and the DAI collateral of a flash mint nets out inside the
+callback, the same way it does in `FlashMintLib.loanLogic`.
+"""
+
+from dataclasses import dataclass, field
+from itertools import product
+
+import numpy as np
+
+COLLATERAL_RATIO_PRECISION = 10 ** 18
+DAI_DECIMALS = 10 ** 18
+MAX_UINT256 = 2 ** 256 - 1
+
+DEFAULT_COLLAT_TARGET_MARGIN = int(0.02e18)
+DEFAULT_COLLAT_MAX_MARGIN = int(0.005e18)
+
+# Rough gas of each part of a withdrawal or rebalance. Refresh them from
+# tests/test_gas.py and scripts/gas_profile.py after a gas change.
+BASE_GAS = 300_000  # vault.withdraw, liquidatePosition and the want transfer
+GAS_PER_ITERATION = 15_000  # loop overhead, without the aave calls
+GAS_PER_FLASH_MINT = 150_000  # DssFlash mint and burn, oracle reads, approvals
+GAS_PER_AAVE_CALL = 220_000  # deposit, withdraw or repay with reward accounting
+
+
+def _ints(values, size):
+    values = np.broadcast_to(np.asarray(values, dtype=object), (size,))
+    return np.array([int(v) for v in values], dtype=object)
+
+
+def _bools(values, size):
+    return np.broadcast_to(np.asarray(values, dtype=bool), (size,)).copy()
+
+
+def _mask(values):
+    return np.asarray(values, dtype=bool)
+
+
+def _min(a, b):
+    return np.where(_mask(a < b), a, b)
+
+
+def _div(a, b):
+    # SafeMath reverts on a zero divisor, lanes hitting it are flagged by the caller
+    zero = _mask(b == 0)
+    return np.where(zero, 0, a // np.where(zero, 1, b)), zero
+
+
+def estimate_gas(iterations, flash_mints, aave_calls, base=BASE_GAS):
+    return (
+        base
+        + iterations * GAS_PER_ITERATION
+        + flash_mints * GAS_PER_FLASH_MINT
+        + aave_calls * GAS_PER_AAVE_CALL
+    )
+
+
+def get_borrow_from_deposit(deposit, collat_ratio):
+    return deposit * collat_ratio // COLLATERAL_RATIO_PRECISION
+
+
+def get_deposit_from_borrow(borrow, collat_ratio):
+    return _div(borrow * COLLATERAL_RATIO_PRECISION, collat_ratio)[0]
+
+
+def get_borrow_from_supply(supply, collat_ratio):
+    return _div(supply * collat_ratio, COLLATERAL_RATIO_PRECISION - collat_ratio)[0]
+
+
+@dataclass
+class Scenarios:
+    deposit: object
+    target_collat_ratio: object
+    max_borrow_collat_ratio: object
+    max_iterations: object = 6
+    is_flash_mint_active: object = True
+    max_collat_ratio: object = None
+    dai_borrow_collat_ratio: object = int(0.745e18)
+    min_want: object = 100
+    min_ratio: object = int(0.005e18)
+    # prices are the Aave oracle ones (ETH per whole token, 18 decimals)
+    want_price: object = 10 ** 18
+    dai_price: object = int(2.5e14)
+    want_decimals: object = 18
+    want_is_dai: object = False
+    max_liquidity: object = 500_000_000 * 10 ** 18
+    size: int = field(init=False)
+
+    def __post_init__(self):
+        self.size = max(
+            np.size(v)
+            for v in (
+                self.deposit,
+                self.target_collat_ratio,
+                self.max_borrow_collat_ratio,
+                self.max_iterations,
+                self.is_flash_mint_active,
+            )
+        )
+        n = self.size
+        self.deposit = _ints(self.deposit, n)
+        self.target_collat_ratio = _ints(self.target_collat_ratio, n)
+        self.max_borrow_collat_ratio = _ints(self.max_borrow_collat_ratio, n)
+        self.max_iterations = _ints(self.max_iterations, n)
+        self.is_flash_mint_active = _bools(self.is_flash_mint_active, n)
+        if self.max_collat_ratio is None:
+            self.max_collat_ratio = self.target_collat_ratio + (
+                DEFAULT_COLLAT_TARGET_MARGIN - DEFAULT_COLLAT_MAX_MARGIN
+            )
+        self.max_collat_ratio = _ints(self.max_collat_ratio, n)
+        self.dai_borrow_collat_ratio = _ints(self.dai_borrow_collat_ratio, n)
+        self.min_want = _ints(self.min_want, n)
+        self.min_ratio = _ints(self.min_ratio, n)
+        self.want_price = _ints(self.want_price, n)
+        self.dai_price = _ints(self.dai_price, n)
+        self.want_decimals = _ints(self.want_decimals, n)
+        self.want_is_dai = _bools(self.want_is_dai, n)
+        self.max_liquidity = _ints(self.max_liquidity, n)
+
+    @classmethod
+    def grid(cls, **axes):
+        # cartesian product of every list passed in, scalars are broadcast
+        keys = [k for k, v in axes.items() if np.ndim(v) > 0]
+        columns = {k: [] for k in keys}
+        for combo in product(*(axes[k] for k in keys)):
+            for k, v in zip(keys, combo):
+                columns[k].append(v)
+        params = {k: v for k, v in axes.items() if k not in keys}
+        params.update(columns)
+        return cls(**params)
+
+
+class PositionSimulator:
+    def __init__(self, scenarios, deposits=0, borrows=0, want_balance=None):
+        self.s = scenarios
+        n = scenarios.size
+        self.deposits = _ints(deposits, n)
+        self.borrows = _ints(borrows, n)
+        self.want_balance = _ints(
+            scenarios.deposit if want_balance is None else want_balance, n
+        )
+        self.iterations = _ints(0, n)
+        self.flash_mints = _ints(0, n)
+        self.aave_calls = _ints(0, n)
+        self.reverted = _bools(False, n)
+
+    def _all(self):
+        return _bools(True, self.s.size)
+
+    # VIEWS
+    def get_current_position(self):
+        return self.deposits.copy(), self.borrows.copy()
+
+    def get_current_collat_ratio(self):
+        ratio, _ = _div(self.borrows * COLLATERAL_RATIO_PRECISION, self.deposits)
+        return ratio
+
+    def get_current_supply(self):
+        return self.deposits - self.borrows
+
+    def _to_dai(self, amount):
+        s = self.s
+        eth = amount * s.want_price // 10 ** s.want_decimals
+        value, bad = _div(eth * DAI_DECIMALS, s.dai_price)
+        return np.where(s.want_is_dai, amount, value), bad & ~s.want_is_dai
+
+    def _from_dai(self, amount):
+        s = self.s
+        eth = amount * s.dai_price // DAI_DECIMALS
+        value, bad = _div(eth * 10 ** s.want_decimals, s.want_price)
+        return np.where(s.want_is_dai, amount, value), bad & ~s.want_is_dai
+
+    # AAVE LEDGER
+    def _deposit_collateral(self, amount, mask):
+        m = mask & _mask(amount != 0)
+        self.deposits = np.where(m, self.deposits + amount, self.deposits)
+        self.want_balance = np.where(m, self.want_balance - amount, self.want_balance)
+        self.aave_calls += m
+        return np.where(m, amount, 0)
+
+    def _withdraw_collateral(self, amount, mask):
+        m = mask & _mask(amount != 0)
+        self.reverted |= m & _mask(amount > self.deposits)
+        amount = _min(amount, self.deposits)
+        self.deposits = np.where(m, self.deposits - amount, self.deposits)
+        self.want_balance = np.where(m, self.want_balance + amount, self.want_balance)
+        self.aave_calls += m
+        return np.where(m, amount, 0)
+
+    def _repay_want(self, amount, mask):
+        m = mask & _mask(amount != 0)
+        # aave caps the repayment to the outstanding debt
+        repaid = np.where(m, _min(amount, self.borrows), 0)
+        self.borrows = self.borrows - repaid
+        self.want_balance = self.want_balance - repaid
+        self.aave_calls += m
+        return repaid
+
+    def _borrow_want(self, amount, mask):
+        m = mask & _mask(amount != 0)
+        self.borrows = np.where(m, self.borrows + amount, self.borrows)
+        self.want_balance = np.where(m, self.want_balance + amount, self.want_balance)
+        self.aave_calls += m
+        return np.where(m, amount, 0)
+
+    # FLASHMINT
+    def do_flash_mint(
+        self, deficit, amount_desired, collat_ratio_dai, gap, mask, headroom=0
+    ):
+        m = mask & _mask(amount_desired != 0)
+        amount = amount_desired
+        # the minted DAI is the collateral of a DAI want, it backs all of amount
+        headroom = np.where(self.s.want_is_dai, 0, headroom)
+        self.reverted |= m & _mask(headroom > amount)
+        to_dai, bad = self._to_dai(np.where(m, amount - headroom, 0))
+        required, bad_ratio = _div(
+            to_dai * COLLATERAL_RATIO_PRECISION, collat_ratio_dai
+        )
+        gap_dai, bad_gap = self._to_dai(gap)
+        gap_dai = np.where(_mask(gap > 0), gap_dai, 0)
+        required = required + gap_dai
+        self.reverted |= m & (bad | bad_ratio | bad_gap)
+
+        capped = m & _mask(required > self.s.max_liquidity)
+        self.reverted |= capped & _mask(gap_dai > self.s.max_liquidity)
+        capped_amount, bad = self._from_dai(
+            np.where(capped, self.s.max_liquidity - gap_dai, 0)
+        )
+        self.reverted |= capped & bad
+        amount = np.where(
+            capped,
+            capped_amount * collat_ratio_dai // COLLATERAL_RATIO_PRECISION + headroom,
+            amount,
+        )
+        required = np.where(capped, self.s.max_liquidity, required)
+
+        self._loan_logic(deficit, amount, required, m)
+        self.flash_mints += m
+        return np.where(m, amount, 0), np.where(m, required, 0)
+
+    def _loan_logic(self, deficit, amount, amount_flashmint, mask):
+        # the DAI leg is deposited and withdrawn in the same callback so only
+        # the want leg changes the position
+        self.aave_calls += mask * np.where(self.s.want_is_dai, 3, 4)
+        # amountFlashmint.sub(amount) of the DAI want branches
+        self.reverted |= mask & self.s.want_is_dai & _mask(amount_flashmint < amount)
+        if deficit:
+            self.reverted |= mask & _mask(amount > self.deposits)
+            self.deposits = np.where(mask, self.deposits - amount, self.deposits)
+            balance = self.want_balance + amount
+            repaid = _min(balance, self.borrows)
+            self.borrows = np.where(mask, self.borrows - repaid, self.borrows)
+            self.want_balance = np.where(mask, balance - repaid, self.want_balance)
+        else:
+            self.borrows = np.where(mask, self.borrows + amount, self.borrows)
+            self.deposits = np.where(
+                mask, self.deposits + self.want_balance + amount, self.deposits
+            )
+            self.want_balance = np.where(mask, 0, self.want_balance)
+
+    # STRATEGY
+    def adjust_position(self, debt_outstanding=0, mask=None):
+        s = self.s
+        mask = self._all() if mask is None else mask
+        debt_outstanding = _ints(debt_outstanding, s.size)
+
+        want_balance = self.want_balance
+        m = (
+            mask
+            & _mask(want_balance > debt_outstanding)
+            & _mask(want_balance - debt_outstanding > s.min_want)
+        )
+        self._deposit_collateral(want_balance - debt_outstanding, m)
+        want_balance = self.want_balance
+        ratio = self.get_current_collat_ratio()
+        target = s.target_collat_ratio
+
+        free = mask & _mask(debt_outstanding > want_balance)
+        self._free_funds(np.where(free, debt_outstanding - want_balance, 0), free)
+
+        up = mask & ~free & _mask(ratio < target)
+        up &= _mask(np.where(up, target - ratio, 0) > s.min_ratio)
+        self._lever_max(up)
+
+        down = mask & ~free & _mask(ratio > target)
+        down &= _mask(np.where(down, ratio - target, 0) > s.min_ratio)
+        deposits, borrows = self.get_current_position()
+        new_borrow = get_borrow_from_supply(deposits - borrows, target)
+        self._lever_down_to(new_borrow, borrows, down)
+
+    def liquidate_position(self, amount_needed, mask=None):
+        mask = self._all() if mask is None else mask
+        amount_needed = _ints(amount_needed, self.s.size)
+        enough = mask & _mask(self.want_balance > amount_needed)
+        m = mask & ~enough
+        self._free_funds(np.where(m, amount_needed - self.want_balance, 0), m)
+
+        free_assets = self.want_balance
+        short = m & _mask(amount_needed > free_assets)
+        liquidated = np.where(short, free_assets, amount_needed)
+        diff = np.where(short, amount_needed - free_assets, 0)
+        loss = np.where(short & _mask(diff <= self.s.min_want), diff, 0)
+        return np.where(mask, liquidated, 0), loss
+
+    def _free_funds(self, amount_to_free, mask):
+        m = mask & _mask(amount_to_free != 0)
+        deposits, borrows = self.get_current_position()
+        real_assets = deposits - borrows
+        amount_required = _min(amount_to_free, real_assets)
+        new_supply = real_assets - amount_required
+        new_borrow = get_borrow_from_supply(new_supply, self.s.target_collat_ratio)
+        self._lever_down_to(new_borrow, borrows, m)
+        return self.want_balance
+
+    def _lever_max(self, mask):
+        s = self.s
+        deposits, borrows = self.get_current_position()
+        real_supply = deposits - borrows
+        new_borrow = get_borrow_from_supply(real_supply, s.target_collat_ratio)
+        self.reverted |= mask & _mask(new_borrow < borrows)
+        total = np.where(mask, new_borrow - borrows, 0)
+
+        flash = mask & s.is_flash_mint_active
+        total = total - self._lever_up_flash_loan(total, deposits, borrows, flash)
+
+        loop = mask & ~s.is_flash_mint_active
+        for i in range(int(s.max_iterations.max(initial=0))):
+            m = loop & _mask(i < s.max_iterations) & _mask(total > s.min_want)
+            if not m.any():
+                break
+            total = total - self._lever_up_step(total, m)
+            self.iterations += m
+        return total
+
+    def _lever_up_flash_loan(self, amount, deposits, borrows, mask):
+        s = self.s
+        m = mask & _mask(amount > s.min_want)
+        can_borrow = get_borrow_from_deposit(deposits, s.max_borrow_collat_ratio)
+
+        # own collateral is enough: one borrow and one deposit, no flash mint
+        own = m & _mask(can_borrow >= borrows + amount)
+        self._borrow_want(amount, own)
+        self._deposit_collateral(self.want_balance, own)
+
+        flash = m & ~own
+        headroom = np.where(
+            flash & _mask(can_borrow > borrows), can_borrow - borrows, 0
+        )
+        deposits_to_meet_ltv = get_deposit_from_borrow(
+            borrows, s.max_borrow_collat_ratio
+        )
+        deficit = np.where(
+            flash
+            & _mask(can_borrow <= borrows)
+            & _mask(deposits_to_meet_ltv > deposits),
+            deposits_to_meet_ltv - deposits,
+            0,
+        )
+        flashed, _ = self.do_flash_mint(
+            False, amount, s.dai_borrow_collat_ratio, deficit, flash, headroom
+        )
+        return np.where(own, amount, flashed)
+
+    def _lever_up_step(self, amount, mask):
+        m = mask & _mask(amount != 0)
+        want_balance = self.want_balance
+        deposits, borrows = self.get_current_position()
+        can_borrow = get_borrow_from_deposit(
+            deposits + want_balance, self.s.max_borrow_collat_ratio
+        )
+        m &= _mask(can_borrow > borrows)
+        can_borrow = np.where(m, can_borrow - borrows, 0)
+        amount = _min(can_borrow, amount)
+
+        self._deposit_collateral(want_balance, m)
+        self._borrow_want(amount, m)
+        return np.where(m, amount, 0)
+
+    def _lever_down_to(self, new_amount_borrowed, current_borrowed, mask):
+        s = self.s
+        m = mask & _mask(current_borrowed > new_amount_borrowed)
+        total = np.where(m, current_borrowed - new_amount_borrowed, 0)
+
+        flash = m & s.is_flash_mint_active
+        total = total - self._lever_down_flash_loan(total, flash)
+
+        for i in range(int(s.max_iterations.max(initial=0))):
+            mi = m & _mask(i < s.max_iterations) & _mask(total > s.min_want)
+            if not mi.any():
+                break
+            self._withdraw_excess_collateral(s.max_collat_ratio, mi)
+            to_repay = _min(total, self.want_balance)
+            total = total - self._repay_want(to_repay, mi)
+            self.iterations += mi
+
+        # deposit back to get targetCollatRatio
+        deposits, borrows = self.get_current_position()
+        target_deposit, bad = _div(
+            borrows * COLLATERAL_RATIO_PRECISION, s.target_collat_ratio
+        )
+        self.reverted |= mask & bad
+        under = mask & _mask(target_deposit > deposits)
+        to_deposit = np.where(under, target_deposit - deposits, 0)
+        self._deposit_collateral(
+            _min(to_deposit, self.want_balance), under & _mask(to_deposit > s.min_want)
+        )
+        self._withdraw_excess_collateral(s.target_collat_ratio, mask & ~under)
+
+    def _lever_down_flash_loan(self, amount, mask):
+        # capped flash mints repeat until amount is covered, gas is not modelled
+        repaid = _ints(0, self.s.size)
+        m = mask & _mask(amount > self.s.min_want)
+        while m.any():
+            flashed, _ = self.do_flash_mint(
+                True,
+                _min(amount, self.borrows),
+                self.s.dai_borrow_collat_ratio,
+                _ints(0, self.s.size),
+                m,
+            )
+            repaid = repaid + flashed
+            amount = amount - flashed
+            m &= _mask(flashed != 0) & _mask(amount > self.s.min_want)
+        return repaid
+
+    def _withdraw_excess_collateral(self, collat_ratio, mask):
+        deposits, borrows = self.get_current_position()
+        theo_deposits, bad = _div(borrows * COLLATERAL_RATIO_PRECISION, collat_ratio)
+        self.reverted |= mask & bad
+        m = mask & ~bad & _mask(deposits > theo_deposits)
+        return self._withdraw_collateral(np.where(m, deposits - theo_deposits, 0), m)
+
+    def summary(self):
+        return {
+            "deposits": self.deposits,
+            "borrows": self.borrows,
+            "want_balance": self.want_balance,
+            "collat_ratio": self.get_current_collat_ratio(),
+            "iterations": self.iterations,
+            "flash_mints": self.flash_mints,
+            "aave_calls": self.aave_calls,
+            "reverted": self.reverted,
+        }
+
+
+def simulate_deposit(scenarios):
+    sim = PositionSimulator(scenarios)
+    sim.adjust_position(0)
+    return sim
+
+
+def simulate_withdrawal(scenarios, amount):
+    sim = simulate_deposit(scenarios)
+    sim.iterations[:] = 0
+    sim.flash_mints[:] = 0
+    sim.aave_calls[:] = 0
+    sim.liquidate_position(amount)
+    return sim
+
+
+def main():
+    import time
+
+    start = time.perf_counter()
+    scenarios = Scenarios.grid(
+        deposit=[10 ** 18 * n for n in (1, 100, 10_000, 250_000)],
+        target_collat_ratio=[int(x * 1e16) for x in range(50, 81, 2)],
+        max_borrow_collat_ratio=int(0.795e18),
+        max_iterations=list(range(1, 16)),
+        is_flash_mint_active=[True, False],
+    )
+    sim = simulate_deposit(scenarios)
+    elapsed = time.perf_counter() - start
+    out = sim.summary()
+    print(f"{scenarios.size} scenarios in {elapsed:.2f}s")
+    print(f"max loop iterations: {out['iterations'].max()}")
+    print(f"max flash mints: {out['flash_mints'].max()}")
+    print(f"reverted: {out['reverted'].sum()}")
@@ -0,0 +1,98 @@
+"""
+Batched snapshots of the strategy state.
+
+Every view the status printers need is read inside brownie's `multicall`, so a
+snapshot of any number of strategies is a single Multicall2 `aggregate`
+eth_call. The position, ratios and balances come from one
+`Strategy.getPositionSnapshot` call per strategy.
+"""
+
+from typing import Iterable, List, Tuple, TypedDict
+
+from brownie import multicall
+
+
+class StrategySnapshot(TypedDict):
+    strategy: str
+    vault: str
+    want: str
+    name: str
+    decimals: int
+    performance_fee: int
+    debt_ratio: int
+    total_debt: int
+    total_gain: int
+    total_loss: int
+    estimated_total_assets: int
+    estimated_rewards: int
+    loose_want: int
+    deposits: int
+    borrows: int
+    collat_ratio: int
+    target_collat_ratio: int
+    max_collat_ratio: int
+    max_borrow_collat_ratio: int
+    liquidation_threshold: int
+    pending_stk_aave: int
+    cooldown_status: int
+
+
+def snapshot_strategies(
+    positions: Iterable[Tuple], block_identifier=None
+) -> List[StrategySnapshot]:
+    """
+    Snapshot `(vault, strategy)` pairs with one eth_call.
+
+    `block_identifier` pins every read to the same block, the latest by default.
+    """
+    positions = list(positions)
+    calls = []
+    with multicall(block_identifier=block_identifier):
+        for vault, strategy in positions:
+            calls.append(
+                dict(
+                    want=vault.token(),
+                    name=strategy.name(),
+                    decimals=vault.decimals(),
+                    params=vault.strategies(strategy),
+                    estimated_total_assets=strategy.estimatedTotalAssets(),
+                    estimated_rewards=strategy.estimatedRewardsInWant(),
+                    position=strategy.getPositionSnapshot(),
+                )
+            )
+
+    snapshots = []
+    for (vault, strategy), call in zip(positions, calls):
+        params = call["params"].dict()
+        position = call["position"].dict()
+        snapshots.append(
+            StrategySnapshot(
+                strategy=strategy.address,
+                vault=vault.address,
+                want=str(call["want"]),
+                name=str(call["name"]),
+                decimals=int(call["decimals"]),
+                performance_fee=int(params["performanceFee"]),
+                debt_ratio=int(params["debtRatio"]),
+                total_debt=int(params["totalDebt"]),
+                total_gain=int(params["totalGain"]),
+                total_loss=int(params["totalLoss"]),
+                estimated_total_assets=int(call["estimated_total_assets"]),
+                estimated_rewards=int(call["estimated_rewards"]),
+                loose_want=int(position["wantBalance"]),
+                deposits=int(position["deposits"]),
+                borrows=int(position["borrows"]),
+                collat_ratio=int(position["collatRatio"]),
+                target_collat_ratio=int(position["targetCollatRatio"]),
+                max_collat_ratio=int(position["maxCollatRatio"]),
+                max_borrow_collat_ratio=int(position["maxBorrowCollatRatio"]),
+                liquidation_threshold=int(position["liquidationThreshold"]),
+                pending_stk_aave=int(position["pendingStkAave"]),
+                cooldown_status=int(position["cooldownStatus"]),
+            )
+        )
+    return snapshots
+
+
+def snapshot_strategy(vault, strategy, block_identifier=None) -> StrategySnapshot:
+    return snapshot_strategies([(vault, strategy)], block_identifier)[0]
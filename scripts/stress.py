@@ -0,0 +1,366 @@
+"""
+Fleet wide liquidation stress test.
+
+Reads the position of every strategy, then computes for a grid of shocks
+which of them cross the `tendTrigger` warning (`LIQUIDATION_WARNING_THRESHOLD`
+under Aave's liquidation threshold) or get liquidated, and after how long.
+Every strategy and shock is one cell of a numpy array, so tens of thousands
+of scenarios take well under a second.
+
+The shocks are:
+
+    want_eth               multiplier of the oracle price of want in eth
+    want_dai               multiplier of the price of want in dai
+    borrow_rate            yearly rate added to the variable borrow rate of want
+    liquidation_threshold  cut to the liquidation threshold of want
+
+Collateral and debt are both want, so price shocks alone move a position
+only through the aDAI a strategy holds, e.g. after a flash mint that didn't
+unwind. Borrow rate spikes and liquidation threshold cuts move all of them.
+Interest compounds continuously at the shocked rates, and aDAI earns nothing.
+
+    brownie run stress main <factory> [horizon_days] [from_block] --network mainnet
+"""
+
+import csv
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+
+# Strategy.LIQUIDATION_WARNING_THRESHOLD, tendTrigger fires this close to it
+LIQUIDATION_WARNING_THRESHOLD = 0.01
+DAI = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+PROTOCOL_DATA_PROVIDER = "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+RAY = 10 ** 27
+WAD = 10 ** 18
+
+SHOCKS = ("want_eth", "want_dai", "borrow_rate", "liquidation_threshold")
+NEVER = np.inf
+# bisection steps of the crossing time, 2**-40 of the horizon
+BISECTIONS = 40
+
+
+@dataclass
+class Fleet:
+    names: list
+    deposits: np.ndarray  # want deposited on aave, in eth
+    borrows: np.ndarray  # want borrowed, in eth
+    dai_collateral: np.ndarray  # aDAI of the strategy, in eth
+    liquidation_threshold: np.ndarray
+    dai_liquidation_threshold: np.ndarray
+    target_collat_ratio: np.ndarray
+    max_collat_ratio: np.ndarray
+    supply_rate: np.ndarray  # yearly rates of want
+    borrow_rate: np.ndarray
+
+    def __len__(self):
+        return len(self.names)
+
+    def take(self, mask):
+        return Fleet(
+            names=[name for name, keep in zip(self.names, mask) if keep],
+            **{
+                name: getattr(self, name)[mask]
+                for name in self.__dataclass_fields__
+                if name != "names"
+            },
+        )
+
+
+@dataclass
+class Shocks:
+    want_eth: np.ndarray
+    want_dai: np.ndarray
+    borrow_rate: np.ndarray
+    liquidation_threshold: np.ndarray
+
+    def __post_init__(self):
+        columns = np.broadcast_arrays(
+            *(np.asarray(getattr(self, name), dtype=float) for name in SHOCKS)
+        )
+        for name, column in zip(SHOCKS, columns):
+            setattr(self, name, np.ravel(column))
+
+    def __len__(self):
+        return len(self.want_eth)
+
+    @classmethod
+    def grid(cls, want_eth=1, want_dai=1, borrow_rate=0, liquidation_threshold=0):
+        axes = (want_eth, want_dai, borrow_rate, liquidation_threshold)
+        grid = itertools.product(*(np.atleast_1d(axis) for axis in axes))
+        return cls(*np.array(list(grid), dtype=float).T)
+
+
+@dataclass
+class StressResult:
+    names: list
+    shocks: Shocks
+    horizon_days: float
+    collat_ratio: np.ndarray  # (strategies, shocks) right after the shock
+    liquidation_threshold: np.ndarray
+    days_to_warning: np.ndarray  # 0 when the shock alone crosses, NEVER if never
+    days_to_liquidation: np.ndarray
+
+    @property
+    def warned(self):
+        return self.days_to_warning == 0
+
+    @property
+    def liquidated(self):
+        return self.days_to_liquidation == 0
+
+    def table(self):
+        # one row per strategy, over every shock
+        rows = []
+        for i, name in enumerate(self.names):
+            worst = int(np.argmin(self.days_to_liquidation[i]))
+            rows.append(
+                dict(
+                    strategy=name,
+                    warned=float(self.warned[i].mean()),
+                    liquidated=float(self.liquidated[i].mean()),
+                    liquidated_in_horizon=float(
+                        np.isfinite(self.days_to_liquidation[i]).mean()
+                    ),
+                    min_days_to_warning=float(self.days_to_warning[i].min()),
+                    min_days_to_liquidation=float(self.days_to_liquidation[i, worst]),
+                    **{
+                        f"worst_{shock}": float(getattr(self.shocks, shock)[worst])
+                        for shock in SHOCKS
+                    },
+                )
+            )
+        return rows
+
+    def rows(self):
+        # one row per strategy and shock
+        for i, name in enumerate(self.names):
+            for j in range(len(self.shocks)):
+                yield dict(
+                    strategy=name,
+                    **{shock: getattr(self.shocks, shock)[j] for shock in SHOCKS},
+                    collat_ratio=self.collat_ratio[i, j],
+                    threshold=self.liquidation_threshold[i, j],
+                    days_to_warning=self.days_to_warning[i, j],
+                    days_to_liquidation=self.days_to_liquidation[i, j],
+                )
+
+    def write_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(
+                f,
+                [
+                    "strategy",
+                    *SHOCKS,
+                    "collat_ratio",
+                    "threshold",
+                    "days_to_warning",
+                    "days_to_liquidation",
+                ],
+            )
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def share_liquidated(self, x, y):
+        """
+        Share of the strategies liquidated within the horizon, for every pair
+        of `x` and `y` shocks, the worst case over the other shocks.
+        """
+        xs, x_index = np.unique(getattr(self.shocks, x), return_inverse=True)
+        ys, y_index = np.unique(getattr(self.shocks, y), return_inverse=True)
+        share = np.isfinite(self.days_to_liquidation).mean(axis=0)
+        grid = np.zeros((len(ys), len(xs)))
+        np.maximum.at(grid, (y_index, x_index), share)
+        return xs, ys, grid
+
+    def heatmap(self, x="want_eth", y="borrow_rate", path=None):
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        xs, ys, grid = self.share_liquidated(x, y)
+        fig, ax = plt.subplots(figsize=(8, 6))
+        image = ax.imshow(
+            grid, origin="lower", aspect="auto", vmin=0, vmax=1, cmap="Reds"
+        )
+        ax.set_xticks(range(len(xs)), [f"{v:g}" for v in xs], rotation=90)
+        ax.set_yticks(range(len(ys)), [f"{v:g}" for v in ys])
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+        ax.set_title(f"strategies liquidated within {self.horizon_days:g} days")
+        fig.colorbar(image, ax=ax)
+        if path is not None:
+            fig.savefig(path, bbox_inches="tight")
+        return fig
+
+
+def _margin(fleet, shocks, years):
+    # collat ratio and liquidation threshold, per strategy and shock
+    want_price = shocks.want_eth
+    dai_price = shocks.want_eth / shocks.want_dai
+    borrow_rate = fleet.borrow_rate[:, None] + shocks.borrow_rate
+    deposits = fleet.deposits[:, None] * np.exp(fleet.supply_rate[:, None] * years)
+    deposits = deposits * want_price
+    borrows = fleet.borrows[:, None] * np.exp(borrow_rate * years) * want_price
+    dai = fleet.dai_collateral[:, None] * dai_price
+    threshold = np.clip(
+        fleet.liquidation_threshold[:, None] - shocks.liquidation_threshold, 0, None
+    )
+
+    collateral = deposits + dai
+    with np.errstate(divide="ignore", invalid="ignore"):
+        collat_ratio = np.where(collateral > 0, borrows / collateral, 0)
+        threshold = np.where(
+            collateral > 0,
+            (deposits * threshold + dai * fleet.dai_liquidation_threshold[:, None])
+            / collateral,
+            threshold,
+        )
+    return collat_ratio, threshold
+
+
+def _crossed(fleet, shocks, level, years):
+    collat_ratio, threshold = _margin(fleet, shocks, years)
+    return (collat_ratio > 0) & (threshold - collat_ratio <= level)
+
+
+def _bisect_years(fleet, shocks, level, horizon):
+    low = np.zeros((len(fleet), len(shocks)))
+    high = np.full(low.shape, horizon)
+    for _ in range(BISECTIONS):
+        mid = (low + high) / 2
+        done = _crossed(fleet, shocks, level, mid)
+        high = np.where(done, mid, high)
+        low = np.where(done, low, mid)
+    return high
+
+
+def _days_to_cross(fleet, shocks, level, horizon):
+    # earliest time the threshold less the collat ratio falls to `level`
+    collat_ratio, threshold = _margin(fleet, shocks, 0)
+    growth = (
+        fleet.borrow_rate[:, None] + shocks.borrow_rate - fleet.supply_rate[:, None]
+    )
+    # without aDAI the threshold is fixed and the ratio grows by exp(growth * t)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        years = np.log((threshold - level) / collat_ratio) / growth
+    years = np.where((collat_ratio > 0) & (growth > 0), years, NEVER)
+
+    # with aDAI both move, so those strategies are bisected instead
+    rows = fleet.dai_collateral > 0
+    if rows.any():
+        sub = fleet.take(rows)
+        years[rows] = np.where(
+            _crossed(sub, shocks, level, horizon),
+            _bisect_years(sub, shocks, level, horizon),
+            NEVER,
+        )
+
+    days = np.where(years <= horizon, years * 365, NEVER)
+    return np.where(_crossed(fleet, shocks, level, 0), 0, days)
+
+
+def stress(fleet, shocks, horizon_days=365):
+    horizon = horizon_days / 365
+    collat_ratio, threshold = _margin(fleet, shocks, np.zeros((1, 1)))
+    return StressResult(
+        names=list(fleet.names),
+        shocks=shocks,
+        horizon_days=horizon_days,
+        collat_ratio=collat_ratio,
+        liquidation_threshold=threshold,
+        days_to_warning=_days_to_cross(
+            fleet, shocks, LIQUIDATION_WARNING_THRESHOLD, horizon
+        ),
+        days_to_liquidation=_days_to_cross(fleet, shocks, 0, horizon),
+    )
+
+
+def read_fleet(positions, block_identifier=None):
+    """
+    Fleet of `(vault, strategy)` pairs, read with two multicalls at one block.
+    """
+    from brownie import interface, multicall
+
+    from scripts.status import snapshot_strategies
+
+    snapshots = snapshot_strategies(positions, block_identifier)
+    data_provider = interface.IProtocolDataProvider(PROTOCOL_DATA_PROVIDER)
+    oracle = interface.IPriceOracle(
+        interface.ILendingPoolAddressesProvider(
+            data_provider.ADDRESSES_PROVIDER()
+        ).getPriceOracle()
+    )
+    calls = []
+    with multicall(block_identifier=block_identifier):
+        dai_price = oracle.getAssetPrice(DAI)
+        dai_config = data_provider.getReserveConfigurationData(DAI)
+        for snapshot in snapshots:
+            calls.append(
+                dict(
+                    price=oracle.getAssetPrice(snapshot["want"]),
+                    reserve=data_provider.getReserveData(snapshot["want"]),
+                    dai=data_provider.getUserReserveData(DAI, snapshot["strategy"]),
+                )
+            )
+
+    def eth(amount, price, decimals):
+        return int(amount) * int(price) / 10 ** decimals / WAD
+
+    columns = {name: [] for name in Fleet.__dataclass_fields__}
+    for snapshot, call in zip(snapshots, calls):
+        decimals = snapshot["decimals"]
+        is_dai = snapshot["want"].lower() == DAI.lower()
+        columns["names"].append(f"{snapshot['name']} {snapshot['strategy']}")
+        columns["deposits"].append(eth(snapshot["deposits"], call["price"], decimals))
+        columns["borrows"].append(eth(snapshot["borrows"], call["price"], decimals))
+        # a DAI strategy's aDAI is its want deposits
+        columns["dai_collateral"].append(
+            0 if is_dai else eth(call["dai"][0], dai_price, 18)
+        )
+        columns["liquidation_threshold"].append(snapshot["liquidation_threshold"] / WAD)
+        columns["dai_liquidation_threshold"].append(int(dai_config[2]) / 10_000)
+        columns["target_collat_ratio"].append(snapshot["target_collat_ratio"] / WAD)
+        columns["max_collat_ratio"].append(snapshot["max_collat_ratio"] / WAD)
+        columns["supply_rate"].append(int(call["reserve"][3]) / RAY)
+        columns["borrow_rate"].append(int(call["reserve"][4]) / RAY)
+
+    return Fleet(
+        names=columns.pop("names"),
+        **{name: np.array(values, dtype=float) for name, values in columns.items()},
+    )
+
+
+def main(factory, horizon_days=365, from_block=0):
+    import time
+
+    from brownie import LevAaveFactory, interface
+
+    from scripts.keeper import Keeper
+
+    # strategies are found from the factory events, starting at its deployment
+    keeper = Keeper(LevAaveFactory.at(factory), None, from_block=int(from_block))
+    keeper.discover()
+    positions = [
+        (interface.VaultAPI(strategy.vault()), strategy)
+        for strategy in keeper.strategies.values()
+    ]
+    fleet = read_fleet(positions)
+    shocks = Shocks.grid(
+        want_eth=np.linspace(0.5, 1.5, 11),
+        want_dai=np.linspace(0.5, 1.5, 11),
+        borrow_rate=np.linspace(0, 1, 21),
+        liquidation_threshold=[0, 0.01, 0.02, 0.05],
+    )
+
+    start = time.perf_counter()
+    result = stress(fleet, shocks, float(horizon_days))
+    elapsed = time.perf_counter() - start
+    print(f"{len(fleet)} strategies x {len(shocks)} shocks in {elapsed:.3f}s")
+    for row in result.table():
+        print(row)
+    result.write_csv("stress.csv")
+    result.heatmap("want_eth", "borrow_rate", "stress_want_eth.png")
+    result.heatmap("liquidation_threshold", "borrow_rate", "stress_threshold.png")
@@ -0,0 +1,103 @@
+"""
+Cost of a withdrawal before sending it.
+
+`Strategy.quoteFreeFunds(amount)` dry runs `liquidatePosition`: the want it
+frees, its `_leverDownTo` loop iterations, flash mints and Aave calls. This
+module turns those counts into a gas estimate and checks it against the block
+gas limit. It also finds the largest withdrawal that fits in one tx.
+`quote_scenarios` gives the same estimates offline, from the simulator.
+
+    brownie run withdrawal_quote main <vault> <strategy> <amount> --network mainnet
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from brownie import Contract, chain
+
+from scripts.simulator import estimate_gas, simulate_withdrawal
+
+# keep this share of the block free for the rest of the block
+BLOCK_GAS_MARGIN = 0.9
+
+
+@dataclass
+class WithdrawalQuote:
+    amount: int  # want the vault asks from the strategy
+    amount_freed: int
+    iterations: int
+    flash_mints: int
+    aave_calls: int
+    deposits: int
+    borrows: int
+    gas: int
+    gas_limit: int
+
+    @property
+    def fits(self):
+        return self.gas <= self.gas_limit * BLOCK_GAS_MARGIN
+
+    @property
+    def loss(self):
+        return self.amount - self.amount_freed
+
+
+def _gas_limit():
+    return chain[-1].gasLimit
+
+
+def quote_free_funds(strategy, amount, gas_limit=None):
+    quote = strategy.quoteFreeFunds(amount).dict()
+    return WithdrawalQuote(
+        amount=amount,
+        amount_freed=quote["amountFreed"],
+        iterations=quote["iterations"],
+        flash_mints=quote["flashMints"],
+        aave_calls=quote["aaveCalls"],
+        deposits=quote["deposits"],
+        borrows=quote["borrows"],
+        gas=estimate_gas(quote["iterations"], quote["flashMints"], quote["aaveCalls"]),
+        gas_limit=gas_limit or _gas_limit(),
+    )
+
+
+def quote_withdrawal(vault, strategy, amount, gas_limit=None):
+    # the vault pays from its idle want before asking the strategy
+    idle = Contract(vault.token()).balanceOf(vault)
+    return quote_free_funds(strategy, max(amount - idle, 0), gas_limit)
+
+
+def max_withdrawal(vault, strategy, gas_limit=None, precision=10 ** -4):
+    # bisects the largest amount, of the strategy's assets, that fits in a block
+    gas_limit = gas_limit or _gas_limit()
+    idle = Contract(vault.token()).balanceOf(vault)
+    high = strategy.estimatedTotalAssets()
+    if quote_free_funds(strategy, high, gas_limit).fits:
+        return idle + high
+    low = 0
+    while high - low > max(high * precision, 1):
+        mid = (low + high) // 2
+        if quote_free_funds(strategy, mid, gas_limit).fits:
+            low = mid
+        else:
+            high = mid
+    return idle + low
+
+
+def quote_scenarios(scenarios, amount, gas_limit=30_000_000):
+    # offline quotes of a withdrawal right after the deposit of each scenario
+    sim = simulate_withdrawal(scenarios, amount)
+    out = sim.summary()
+    gas = estimate_gas(out["iterations"], out["flash_mints"], out["aave_calls"])
+    out["gas"] = gas
+    out["fits"] = np.asarray(gas <= gas_limit * BLOCK_GAS_MARGIN, dtype=bool)
+    return out
+
+
+def main(vault, strategy, amount):
+    vault = Contract(vault)
+    strategy = Contract(strategy)
+    quote = quote_withdrawal(vault, strategy, int(amount))
+    print(quote)
+    if not quote.fits:
+        print(f"max withdrawal in one tx: {max_withdrawal(vault, strategy)}")
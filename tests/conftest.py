@@ -1,5 +1,129 @@
 import pytest
 from brownie import config, Contract, network
+from utils import actions
+from utils.gas import DEFAULT_BASELINE, GasBaseline, merge_parts
+from utils.matrix import TokenScheduling
+from utils.mocks import LocalAave
+from utils.rpc_cache import DEFAULT_CASSETTE, RPCCache, fork_upstream
+from utils.tokens import leverage_tokens, token_addresses, whale_addresses
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--gas-baseline",
+        default=str(DEFAULT_BASELINE),
+        help="json file with the gas baseline of the benchmarks",
+    )
+    parser.addoption(
+        "--gas-threshold",
+        type=float,
+        default=0.05,
+        help="relative gas increase over the baseline that fails a benchmark",
+    )
+    parser.addoption(
+        "--update-gas-baseline",
+        action="store_true",
+        help="write the measured gas back to the baseline file",
+    )
+    parser.addoption(
+        "--tokens",
+        default="WETH",
+        help="comma separated want tokens to run against, or 'all'",
+    )
+    parser.addoption(
+        "--rpc-cache",
+        choices=("record", "replay"),
+        help="record the forked node's responses, or replay them offline",
+    )
+    parser.addoption(
+        "--rpc-cache-file",
+        default=str(DEFAULT_CASSETTE),
+        help="file the rpc cache is recorded to and replayed from",
+    )
+    parser.addoption(
+        "--fork-block",
+        type=int,
+        help="block to fork from when recording the rpc cache",
+    )
+    parser.addoption(
+        "--stateful-examples",
+        type=int,
+        default=50,
+        help="random action sequences tests/test_stateful.py runs",
+    )
+    parser.addoption(
+        "--bank-run-depositors",
+        type=int,
+        default=200,
+        help="depositors of the vault tests/test_bank_run.py runs on",
+    )
+
+
+def pytest_configure(config):
+    # ganache is launched later, when brownie connects, so its fork can still
+    # be pointed at the cache
+    mode = config.getoption("--rpc-cache")
+    if mode is None:
+        return
+    from brownie._config import CONFIG
+    from brownie.network import contract
+
+    network_id = config.getoption("--network", None)
+    network_id = network_id or CONFIG.settings["networks"]["default"]
+    if "fork" not in CONFIG.networks[network_id].get("cmd_settings", {}):
+        return
+    cache = RPCCache(
+        config.getoption("--rpc-cache-file"),
+        mode,
+        upstream=fork_upstream(CONFIG.networks, network_id),
+        block=config.getoption("--fork-block"),
+    ).start()
+    CONFIG.networks[network_id]["cmd_settings"]["fork"] = cache.fork
+    contract._fetch_from_explorer = cache.wrap_explorer(contract._fetch_from_explorer)
+    config.rpc_cache = cache
+
+
+def pytest_collection_modifyitems(config, items):
+    tokens = config.getoption("--tokens")
+    tokens = leverage_tokens if tokens == "all" else tokens.split(",")
+    selected, deselected = [], []
+    for item in items:
+        callspec = getattr(item, "callspec", None)
+        token = callspec.params.get("token") if callspec else None
+        if token is None or token in tokens:
+            selected.append(item)
+        else:
+            deselected.append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+# with `-n`, brownie's file level scheduling, split by want token
+def pytest_xdist_make_scheduler(config, log):
+    return TokenScheduling(config, log)
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    cache = getattr(config, "rpc_cache", None)
+    if cache is not None and cache.misses:
+        # the failures they caused may not say where they came from
+        print(f"\n{len(cache.misses)} requests missing from {cache.path}:")
+        print("\n".join(cache.misses[:20]))
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+    # the xdist workers each wrote their part of the gas baseline
+    if hasattr(config, "workerinput"):
+        return
+    merge_parts(config.getoption("--gas-baseline"))
+
+
+def pytest_unconfigure(config):
+    cache = getattr(config, "rpc_cache", None)
+    if cache is not None:
+        cache.stop()
+
 
 # Function scoped isolation fixture to enable xdist.
 # Snapshots the chain before each test and reverts after test completion.
@@ -53,84 +177,42 @@ def FlashMaintLibrary(FlashMintLib, gov):
     yield gov.deploy(FlashMintLib)
 
 
-token_addresses = {
-    "WBTC": "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599",  # WBTC
-    "YFI": "0x0bc529c00C6401aEF6D220BE8C6Ea1667F6Ad93e",  # YFI
-    "WETH": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",  # WETH
-    "LINK": "0x514910771AF9Ca656af840dff83E8264EcF986CA",  # LINK
-    "USDT": "0xdAC17F958D2ee523a2206206994597C13D831ec7",  # USDT
-    "DAI": "0x6B175474E89094C44Da98b954EedeAC495271d0F",  # DAI
-    "USDC": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",  # USDC
-}
-
-# TODO: uncomment those tokens you want to test as want
-@pytest.fixture(
-    params=[
-        #"WBTC",  # WBTC
-        #"YFI",  # YFI
-        "WETH",  # WETH
-        # 'LINK', # LINK
-        # 'USDT', # USDT
-        #"DAI",  # DAI
-        # "USDC",  # USDC
-    ],
-    scope="session",
-    autouse=True,
-)
-def token(request):
-    yield Contract(token_addresses[request.param])
+# Without a fork (e.g. `--network hardhat`) the strategy runs against the
+# Aave and DssFlash stand-ins of contracts/mocks placed at the mainnet addresses.
+# module_isolation resets the chain at the start of every module, so they are
+# placed again after it, and so are the fixtures built on them
+@pytest.fixture(scope="module")
+def local_aave(module_isolation, accounts):
+    if "fork" in network.show_active():
+        yield None
+    else:
+        yield LocalAave(accounts[-1])
 
 
-whale_addresses = {
-    "WBTC": "0x28c6c06298d514db089934071355e5743bf21d60",
-    "WETH": "0x28c6c06298d514db089934071355e5743bf21d60",
-    "LINK": "0x28c6c06298d514db089934071355e5743bf21d60",
-    "YFI": "0x28c6c06298d514db089934071355e5743bf21d60",
-    "USDT": "0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503",
-    "USDC": "0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503",
-    "DAI": "0x47ac0Fb4F2D84898e4D9E7b4DaB3C24507a6D503",
-}
+# every want token, `--tokens` selects those the tests run against
+@pytest.fixture(params=list(token_addresses), scope="module", autouse=True)
+def token(request, local_aave):
+    if local_aave:
+        yield local_aave.tokens[request.param]
+    else:
+        yield Contract(token_addresses[request.param])
 
 
-@pytest.fixture(scope="session", autouse=True)
+@pytest.fixture(scope="module", autouse=True)
 def token_whale(token):
     yield whale_addresses[token.symbol()]
 
 
-token_prices = {
-    "WBTC": 60_000,
-    "WETH": 4_000,
-    "LINK": 20,
-    "YFI": 35_000,
-    "USDT": 1,
-    "USDC": 1,
-    "DAI": 1,
-}
-
-
 @pytest.fixture(autouse=True, scope="function")
 def amount(token, token_whale, user):
     # this will get the number of tokens (around $1m worth of token)
-    base_amount = round(1_000_000 / token_prices[token.symbol()])
-    amount = base_amount * 10 ** token.decimals()
-    # In order to get some funds for the token you are about to use,
-    # it impersonate a whale address
-    if amount > token.balanceOf(token_whale):
-        amount = token.balanceOf(token_whale)
-    token.transfer(user, amount, {"from": token_whale})
-    yield amount
+    yield actions.fund_from_whale(token, token_whale, user, 1_000_000)
 
 
 @pytest.fixture(scope="function")
 def big_amount(token, token_whale, user):
     # this will get the number of tokens (around $49m worth of token)
-    fifty_minus_one_million = round(49_000_000 / token_prices[token.symbol()])
-    amount = fifty_minus_one_million * 10 ** token.decimals()
-    # In order to get some funds for the token you are about to use,
-    # it impersonate a whale address
-    if amount > token.balanceOf(token_whale):
-        amount = token.balanceOf(token_whale)
-    token.transfer(user, amount, {"from": token_whale})
+    actions.fund_from_whale(token, token_whale, user, 49_000_000)
     yield token.balanceOf(user)
 
 
@@ -147,15 +229,23 @@ def weth_amount(user, weth):
     yield weth_amount
 
 
-@pytest.fixture(scope="function", autouse=True)
-def vault(pm, gov, rewards, guardian, management, token):
-    Vault = pm(config["dependencies"][0]).Vault
-    vault = guardian.deploy(Vault)
-    vault.initialize(token, gov, rewards, "", "", guardian, management)
-    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
-    vault.setManagement(management, {"from": gov})
-    vault.setManagementFee(0, {"from": gov})
-    yield vault
+@pytest.fixture(scope="session")
+def deploy_vault(pm, gov, rewards, guardian, management):
+    def deploy(token):
+        Vault = pm(config["dependencies"][0]).Vault
+        vault = guardian.deploy(Vault)
+        vault.initialize(token, gov, rewards, "", "", guardian, management)
+        vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+        vault.setManagement(management, {"from": gov})
+        vault.setManagementFee(0, {"from": gov})
+        return vault
+
+    yield deploy
+
+
+@pytest.fixture(scope="function")
+def vault(deploy_vault, token):
+    yield deploy_vault(token)
 
 
 @pytest.fixture(scope="session")
@@ -163,7 +253,7 @@ def registry():
     yield Contract("0x50c1a2eA0a861A967D9d0FFE2AE4012c2E053804")
 
 
-@pytest.fixture(scope="session")
+@pytest.fixture(scope="module")
 def live_vault(registry, token):
     yield registry.latestVault(token)
 
@@ -173,14 +263,22 @@ def factory(strategist, vault, LevAaveFactory):
     yield strategist.deploy(LevAaveFactory, vault)
 
 
+@pytest.fixture(scope="session")
+def deploy_strategy(chain, keeper, gov, strategist, Strategy):
+    def deploy(vault, factory):
+        strategy = Strategy.at(factory.original())
+        strategy.setKeeper(keeper, {"from": strategist})
+        vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+        chain.sleep(1)
+        chain.mine()
+        return strategy
+
+    yield deploy
+
+
 @pytest.fixture(scope="function")
-def strategy(chain, keeper, vault, factory, gov, strategist, Strategy):
-    strategy = Strategy.at(factory.original())
-    strategy.setKeeper(keeper, {"from": strategist})
-    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
-    chain.sleep(1)
-    chain.mine()
-    yield strategy
+def strategy(deploy_strategy, vault, factory):
+    yield deploy_strategy(vault, factory)
 
 
 @pytest.fixture()
@@ -203,6 +301,70 @@ def flashloans_active(request, strategy, gov):
     yield is_active
 
 
+# Deposited and harvested positions, built once per module, token and flash mint
+# mode. module_isolation resets the chain at the start of every module, so they
+# are module scoped and come after it, and higher scoped fixtures are set up
+# before fn_isolation takes its snapshot: every test reverts back to the freshly
+# levered state. Flash mint is on unless a test uses
+# @pytest.mark.parametrize("flash_mint", [...], indirect=True)
+@pytest.fixture(scope="session")
+def flash_mint(request):
+    yield getattr(request, "param", True)
+
+
+@pytest.fixture(scope="module")
+def deploy_levered(
+    module_isolation,
+    chain,
+    token,
+    token_whale,
+    user,
+    gov,
+    strategist,
+    flash_mint,
+    deploy_vault,
+    deploy_strategy,
+    FlashMintLib,
+    LevAaveFactory,
+):
+    def deploy(usd):
+        gov.deploy(FlashMintLib)
+        vault = deploy_vault(token)
+        factory = strategist.deploy(LevAaveFactory, vault)
+        strategy = deploy_strategy(vault, factory)
+        strategy.setIsFlashMintActive(flash_mint, {"from": gov})
+
+        amount = actions.fund_from_whale(token, token_whale, user, usd)
+        actions.user_deposit(user, vault, token, amount)
+        chain.sleep(1)
+        strategy.harvest({"from": strategist})
+        return actions.LeveredState(vault, strategy, amount)
+
+    yield deploy
+
+
+@pytest.fixture(scope="module")
+def levered(deploy_levered):
+    yield deploy_levered(1_000_000)
+
+
+@pytest.fixture(scope="module")
+def big_levered(deploy_levered):
+    yield deploy_levered(49_000_000)
+
+
 @pytest.fixture(scope="session", autouse=True)
 def RELATIVE_APPROX():
     yield 1e-5
+
+
+@pytest.fixture(scope="session")
+def gas_baseline(request):
+    baseline = GasBaseline(
+        request.config.getoption("--gas-baseline"),
+        request.config.getoption("--gas-threshold"),
+        request.config.getoption("--update-gas-baseline"),
+        getattr(request.config, "workerinput", {}).get("workerid"),
+    )
+    yield baseline
+    baseline.save()
@@ -0,0 +1,32 @@
+import pytest
+
+# The simulator is pure python, these override the chain bound autouse
+# fixtures of the parent conftest so no vault or strategy gets deployed.
+@pytest.fixture(scope="function", autouse=True)
+def shared_setup():
+    pass
+
+
+@pytest.fixture(autouse=True)
+def FlashMaintLibrary():
+    yield None
+
+
+@pytest.fixture(scope="session", autouse=True)
+def token():
+    yield None
+
+
+@pytest.fixture(scope="session", autouse=True)
+def token_whale():
+    yield None
+
+
+@pytest.fixture(autouse=True)
+def amount():
+    yield None
+
+
+@pytest.fixture(autouse=True)
+def vault():
+    yield None
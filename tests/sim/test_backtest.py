@@ -0,0 +1,158 @@
+import csv
+
+import numpy as np
+import pytest
+from scripts.backtest import (
+    COLUMNS,
+    Backtest,
+    Fees,
+    backtest,
+    read_csv,
+)
+from scripts.simulator import Scenarios
+
+START = 1_600_000_000
+NO_FEES = Fees(0, 0, 0)
+
+
+def series(rows, step=3600, **columns):
+    values = dict(
+        supply_rate=0.02,
+        borrow_rate=0.03,
+        supply_emission=0.05,
+        borrow_emission=0.08,
+        aave_price=0.1,
+    )
+    values.update(columns)
+    chunk = {"timestamp": START + step * np.arange(rows, dtype=float)}
+    for name, value in values.items():
+        chunk[name] = np.broadcast_to(np.asarray(value, dtype=float), (rows,))
+    return chunk
+
+
+def scenarios(**kwargs):
+    params = dict(
+        deposit=10 ** 24,
+        target_collat_ratio=[int(0.3e18), int(0.6e18), int(0.78e18)],
+        max_borrow_collat_ratio=int(0.795e18),
+    )
+    params.update(kwargs)
+    return Scenarios.grid(**params)
+
+
+def write_csv(path, chunk):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(chunk)
+        writer.writerows(zip(*chunk.values()))
+
+
+def test_streaming_matches_a_single_chunk(tmp_path):
+    path = tmp_path / "series.csv"
+    write_csv(path, series(24 * 30))
+
+    streamed = backtest(path, scenarios(), chunksize=97)
+    whole = backtest(path, scenarios(), chunksize=10 ** 6)
+    assert len(streamed.timestamps) == len(whole.timestamps) == 30
+    assert streamed.pps_curve() == pytest.approx(whole.pps_curve(), rel=1e-12)
+
+
+def test_apr_is_the_rate_spread():
+    targets = [int(0.01e18), int(0.6e18)]
+    sim = Backtest(scenarios(target_collat_ratio=targets), fees=NO_FEES)
+    result = sim.run([series(24 * 60, supply_emission=0, borrow_emission=0)])
+
+    # the profit of every harvest sits idle in the vault until the next one
+    for target, apr in zip(targets, result.apr()):
+        leverage = 10 ** 18 / (10 ** 18 - target)
+        spread = 0.02 * leverage - 0.03 * (leverage - 1)
+        assert apr == pytest.approx(spread, rel=3e-2)
+    assert result.apr_curve().shape == (59, 2)
+
+
+def test_leverage_pays_while_rewards_cover_the_borrow_rate():
+    result = Backtest(scenarios(), fees=NO_FEES).run([series(24 * 60)])
+    apr = result.apr()
+    assert apr[0] < apr[1] < apr[2]
+
+    # without rewards every turn of leverage loses the rate spread
+    result = Backtest(scenarios(), fees=NO_FEES).run(
+        [series(24 * 60, supply_emission=0, borrow_emission=0)]
+    )
+    apr = result.apr()
+    assert apr[0] > apr[1] > apr[2]
+
+
+def test_estimated_total_assets_discounts_rewards():
+    sim = Backtest(scenarios(), fees=NO_FEES)
+    # a day passes without a harvest
+    sim.feed(series(24, supply_rate=0, borrow_rate=0))
+    assert len(sim.result.timestamps) == 1
+    sim._accrue(sim._since)
+
+    supply = sim.sim.get_current_supply()
+    pending = sim.pending_rewards
+    assert (pending > 0).all()
+    # stkAAVE loses 5% to the price impact and 10% to PESSIMISM_FACTOR
+    expected = supply + pending * 95 // 100 * int(0.1 * 0.994 * 1e18) // 10 ** 18
+    estimated = sim.estimated_total_assets(0.1)
+    assert list(estimated) == pytest.approx(
+        list(supply + (expected - supply) * 9 // 10), rel=1e-12
+    )
+
+
+def test_harvest_reverts_when_stk_aave_is_below_max_price_impact():
+    chunk = series(24 * 3, stk_aave_price=0.09)
+    result = Backtest(scenarios(), fees=NO_FEES).run([chunk])
+    assert result.skipped_harvests == 2
+    assert result.profit == []
+
+
+def test_loss_is_taken_from_locked_profit_first():
+    sim = Backtest(scenarios(), fees=NO_FEES)
+    sim.feed(series(1))
+    n = sim.s.size
+    gain = np.full(n, 10 ** 21, dtype=object)
+    sim.sim.want_balance = sim.sim.want_balance + gain
+    sim._report(START, gain, np.zeros(n, dtype=object))
+    pps = sim.price_per_share(START)
+
+    # the locked profit covers the loss, the share price doesn't move
+    loss = np.full(n, 4 * 10 ** 20, dtype=object)
+    sim._report(START, np.zeros(n, dtype=object), loss)
+    assert list(sim.locked_profit) == [6 * 10 ** 20] * n
+    assert list(sim.price_per_share(START)) == list(pps)
+
+    # beyond it the loss reaches the share price
+    sim._report(START, np.zeros(n, dtype=object), 2 * loss)
+    assert list(sim.locked_profit) == [0] * n
+    assert (sim.price_per_share(START) < pps).all()
+
+
+def test_missing_columns():
+    chunk = series(2)
+    del chunk["borrow_rate"]
+    with pytest.raises(ValueError, match="borrow_rate"):
+        Backtest(scenarios()).feed(chunk)
+
+
+def test_read_csv_in_chunks(tmp_path):
+    path = tmp_path / "series.csv"
+    write_csv(path, series(10))
+    chunks = list(read_csv(path, chunksize=4))
+    assert [len(c["timestamp"]) for c in chunks] == [4, 4, 2]
+    assert set(chunks[0]) == set(COLUMNS)
+
+
+def test_parquet(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "series.parquet"
+    chunk = series(24 * 10)
+    pq.write_table(pa.table(chunk), path)
+    csv_path = tmp_path / "series.csv"
+    write_csv(csv_path, chunk)
+
+    from_parquet = backtest(path, scenarios(), chunksize=50)
+    from_csv = backtest(csv_path, scenarios(), chunksize=50)
+    assert from_parquet.pps_curve() == pytest.approx(from_csv.pps_curve())
@@ -0,0 +1,49 @@
+from collections import Counter
+
+import pytest
+from scripts.bank_run import HARVEST, LoadReport, deposit_sizes, withdrawal_schedule
+
+
+def test_deposit_sizes_add_up():
+    sizes = deposit_sizes(1_000, 20_000_000 * 10 ** 18)
+    assert len(sizes) == 1_000
+    assert sum(sizes) == 20_000_000 * 10 ** 18
+    # a few whales and a long tail
+    ordered = sorted(sizes, reverse=True)
+    assert sum(ordered[:10]) > sum(ordered[500:])
+
+
+def test_withdrawal_schedule():
+    schedule = withdrawal_schedule(1_000, share=0.8, partial=0.3, harvest_every=50)
+    withdrawals = [step for step in schedule if step[0] != HARVEST]
+    leaving = Counter(depositor for depositor, _ in withdrawals)
+    assert len(leaving) == 800
+    assert set(leaving.values()) == {1, 2}
+    assert 150 < sum(1 for n in leaving.values() if n == 2) < 330
+
+    # everyone leaving ends with a full withdrawal, after their partial one
+    last = {}
+    for depositor, bps in withdrawals:
+        assert last.get(depositor) != 10_000
+        last[depositor] = bps
+    assert set(last.values()) == {10_000}
+
+    harvests = [i for i, step in enumerate(schedule) if step[0] == HARVEST]
+    assert len(harvests) == (len(withdrawals) - 1) // 50
+    assert schedule == withdrawal_schedule(
+        1_000, share=0.8, partial=0.3, harvest_every=50
+    )
+
+
+def test_load_report():
+    report = LoadReport()
+    for gas in range(1, 101):
+        report.record(gas * 10_000, 10 ** 18, gas > 90, 0.7e18 + gas * 1e14, 0.7e18)
+    summary = report.summary()
+    assert summary["withdrawals"] == 100
+    assert summary["p50"] == pytest.approx(505_000)
+    assert summary["p99"] == pytest.approx(990_100)
+    assert summary["max_gas"] == 1_000_000
+    assert summary["exhausted"] == 10
+    assert summary["exhausted_rate"] == pytest.approx(0.1)
+    assert summary["max_drift"] == pytest.approx(0.01)
@@ -0,0 +1,24 @@
+from scripts.gas_profile import function_stacks, step_costs
+
+
+def test_call_gas_is_charged_once():
+    trace = [
+        dict(depth=1, gas=100, gasCost=3, fn="Strategy.harvest", jumpDepth=0),
+        dict(depth=1, gas=97, gasCost=60, fn="Strategy._leverMax", jumpDepth=1),
+        dict(depth=2, gas=50, gasCost=5, fn="FlashMintLib.doFlashMint", jumpDepth=0),
+        dict(depth=2, gas=45, gasCost=2, fn="FlashMintLib.doFlashMint", jumpDepth=0),
+        dict(depth=1, gas=80, gasCost=0, fn="Strategy.harvest", jumpDepth=0),
+    ]
+    costs = step_costs(trace)
+    # the call step keeps only what the caller lost beyond the callee's steps
+    assert costs == [3, 10, 5, 2, 0]
+    assert sum(costs) == trace[0]["gas"] - trace[-1]["gas"]
+
+    stacks = list(function_stacks(trace))
+    assert stacks[1] == ("Strategy.harvest", "Strategy._leverMax")
+    assert stacks[2] == (
+        "Strategy.harvest",
+        "Strategy._leverMax",
+        "FlashMintLib.doFlashMint",
+    )
+    assert stacks[4] == ("Strategy.harvest",)
@@ -0,0 +1,188 @@
+import pytest
+from scripts.indexer import CLONED, DEPLOYED, HARVESTED, LEVERAGE, Indexer
+
+FACTORY = "0x" + "fa" * 20
+ORIGINAL = "0x" + "01" * 20
+CLONE = "0x" + "02" * 20
+LENDER = "0x" + "1e" * 20
+
+
+def word(value):
+    return value.to_bytes(32, "big")
+
+
+def address_topic(address):
+    return "0x" + bytes(12).hex() + address[2:]
+
+
+class FakeEth:
+    # a chain of empty blocks 12 seconds apart, with logs added by the tests
+    def __init__(self, head, max_range=None):
+        self.block_number = head
+        self.max_range = max_range
+        self.fork = 0
+        self.logs = []
+        self.queries = []
+
+    def get_block(self, number):
+        fork = self.fork if number >= self.fork_block else 0
+        return dict(hash=word(number * 1000 + fork), timestamp=number * 12)
+
+    fork_block = 0
+
+    def reorg(self, block):
+        # replace every block from `block` and drop their logs
+        self.fork += 1
+        self.fork_block = block
+        self.logs = [log for log in self.logs if log["blockNumber"] < block]
+
+    def add(self, address, block, topics, data=b""):
+        self.logs.append(
+            dict(
+                address=address,
+                blockNumber=block,
+                logIndex=len(self.logs),
+                transactionHash=word(len(self.logs)),
+                topics=topics,
+                data=data,
+            )
+        )
+
+    def get_logs(self, params):
+        start, end = params["fromBlock"], params["toBlock"]
+        if self.max_range and end - start + 1 > self.max_range:
+            raise ValueError("query returned more than 10000 results")
+        self.queries.append((start, end))
+        addresses = [a.lower() for a in params["address"]]
+        return [
+            log
+            for log in self.logs
+            if start <= log["blockNumber"] <= end
+            and log["address"] in addresses
+            and log["topics"][0] in params["topics"][0]
+        ]
+
+
+class FakeWeb3:
+    def __init__(self, head, max_range=None):
+        self.eth = FakeEth(head, max_range)
+
+
+def harvest(eth, strategy, block, profit, loss=0):
+    data = word(profit) + word(loss) + word(0) + word(0)
+    eth.add(strategy, block, [HARVESTED], data)
+
+
+def flash_mint(eth, strategy, block, used, dai):
+    data = word(used) + word(used) + word(dai) + word(0) + word(0)
+    eth.add(strategy, block, [LEVERAGE], data + bytes(12) + bytes.fromhex(LENDER[2:]))
+
+
+@pytest.fixture
+def web3():
+    web3 = FakeWeb3(head=1_000)
+    web3.eth.add(FACTORY, 100, [DEPLOYED, address_topic(ORIGINAL)])
+    web3.eth.add(FACTORY, 400, [CLONED, address_topic(CLONE)])
+    return web3
+
+
+def indexer(web3, batch=250):
+    indexer = Indexer(":memory:", web3=web3, batch=batch)
+    indexer.add_factory(FACTORY, from_block=100)
+    return indexer
+
+
+def test_follows_the_strategies_of_the_factory(web3):
+    harvest(web3.eth, ORIGINAL, 200, 10 ** 24)
+    flash_mint(web3.eth, ORIGINAL, 200, 5 * 10 ** 24, 7 * 10 ** 24)
+    harvest(web3.eth, CLONE, 500, 3, loss=2)
+    # before the clone was deployed, can't be from it
+    harvest(web3.eth, CLONE, 300, 1)
+
+    index = indexer(web3)
+    assert index.sync() == 5
+    assert index.strategies(FACTORY) == [ORIGINAL, CLONE]
+
+    assert index.totals(ORIGINAL) == dict(
+        harvests=1, profit=10 ** 24, loss=0, flash_mints=1, dai=7 * 10 ** 24
+    )
+    assert index.totals(CLONE) == dict(
+        harvests=1, profit=3, loss=2, flash_mints=0, dai=0
+    )
+    lender = index.db.execute("SELECT lender FROM flash_mints").fetchone()[0]
+    assert lender == LENDER
+
+
+def test_fetches_ranges_for_every_contract_behind(web3):
+    index = indexer(web3)
+    index.sync()
+    eth = web3.eth
+    factory_queries = eth.queries[:4]
+    assert factory_queries == [(100, 349), (350, 599), (600, 849), (850, 1000)]
+    # the original from block 100 and the clone from block 400, in bulk
+    assert eth.queries[4:] == factory_queries
+
+
+def test_halves_ranges_the_node_refuses():
+    web3 = FakeWeb3(head=1_000, max_range=100)
+    web3.eth.add(FACTORY, 100, [DEPLOYED, address_topic(ORIGINAL)])
+    harvest(web3.eth, ORIGINAL, 900, 1)
+
+    index = indexer(web3, batch=1_000)
+    assert index.sync() == 2
+    assert all(end - start < 100 for start, end in web3.eth.queries)
+
+
+def test_resumes_from_the_cursors(web3):
+    harvest(web3.eth, ORIGINAL, 200, 1)
+    index = indexer(web3)
+    index.sync()
+
+    web3.eth.block_number = 1_100
+    harvest(web3.eth, ORIGINAL, 1_050, 2)
+    web3.eth.queries.clear()
+    assert index.sync() == 1
+    assert web3.eth.queries == [(1_001, 1_100), (1_001, 1_100)]
+    assert index.totals(ORIGINAL)["profit"] == 3
+
+    # nothing new, nothing asked
+    web3.eth.queries.clear()
+    assert index.sync() == 0
+    assert web3.eth.queries == []
+
+
+def test_rewinds_a_reorg(web3):
+    harvest(web3.eth, ORIGINAL, 200, 1)
+    harvest(web3.eth, ORIGINAL, 990, 2)
+    web3.eth.add(FACTORY, 995, [CLONED, address_topic("0x" + "03" * 20)])
+    index = indexer(web3)
+    index.sync()
+    assert len(index.strategies()) == 3
+
+    web3.eth.reorg(980)
+    harvest(web3.eth, ORIGINAL, 985, 5)
+    web3.eth.block_number = 1_010
+    index.sync()
+
+    assert index.strategies() == [ORIGINAL, CLONE]
+    assert index.totals(ORIGINAL)["profit"] == 6
+    assert index.totals(ORIGINAL)["harvests"] == 2
+
+
+def test_series_by_period(web3):
+    # blocks are 12 seconds apart, 7200 a day
+    web3.eth.block_number = 20_000
+    harvest(web3.eth, ORIGINAL, 200, 1)
+    harvest(web3.eth, ORIGINAL, 300, 2)
+    harvest(web3.eth, ORIGINAL, 7_300, 4, loss=1)
+    flash_mint(web3.eth, ORIGINAL, 7_300, 10, 20)
+    flash_mint(web3.eth, ORIGINAL, 7_400, 30, 40)
+    index = indexer(web3, batch=10_000)
+    index.sync()
+
+    assert index.profit_and_loss(ORIGINAL) == [
+        (ORIGINAL, 0, 2, 3, 0),
+        (ORIGINAL, 86_400, 1, 4, 1),
+    ]
+    assert index.flash_mints(interval=3600) == [(ORIGINAL, 86_400, 2, 40, 60)]
+    assert index.profit_and_loss(since=86_400) == [(ORIGINAL, 86_400, 1, 4, 1)]
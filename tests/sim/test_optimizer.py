@@ -0,0 +1,159 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from scripts.optimizer import (
+    Candidates,
+    Market,
+    Recommendation,
+    default_grid,
+    evaluate,
+    search,
+)
+
+START = 1_600_000_000
+
+
+def series(days=60, **columns):
+    values = dict(
+        supply_rate=0.02,
+        borrow_rate=0.03,
+        supply_emission=0.05,
+        borrow_emission=0.08,
+        aave_price=0.1,
+    )
+    values.update(columns)
+    rows = days * 24
+    chunk = {"timestamp": START + 3600 * np.arange(rows, dtype=float)}
+    for name, value in values.items():
+        chunk[name] = np.full(rows, float(value))
+    return chunk
+
+
+def test_grid():
+    candidates = Candidates.grid(
+        target_collat_ratio=[int(0.6e18), int(0.7e18)],
+        max_margin=[int(0.01e18), int(0.2e18)],
+        max_iterations=[2, 6, 10],
+    )
+    assert len(candidates) == 12
+    assert candidates.row(0) == dict(
+        target_collat_ratio=int(0.6e18),
+        max_collat_ratio=int(0.61e18),
+        min_ratio=int(0.005e18),
+        min_want=100,
+        max_iterations=2,
+        min_reward_to_sell=10 ** 15,
+    )
+    # 0.7 + 0.2 is over the liquidation threshold
+    assert candidates.valid(Market()).tolist() == [True] * 9 + [False] * 3
+
+
+def test_valid_mirrors_the_setters():
+    candidates = Candidates(
+        target_collat_ratio=int(0.6e18),
+        max_collat_ratio=int(0.61e18),
+        min_ratio=[int(0.005e18), int(0.795e18), int(0.005e18), int(0.005e18)],
+        max_iterations=[15, 6, 16, 0],
+    )
+    # minRatio has to be under maxBorrowCollatRatio, 0 < maxIterations < 16
+    assert candidates.valid(Market()).tolist() == [True, False, False, False]
+
+
+def test_more_leverage_earns_more_when_emissions_pay():
+    candidates = Candidates.grid(
+        target_collat_ratio=[int(0.3e18), int(0.6e18), int(0.78e18)]
+    )
+    out = evaluate(candidates, series(), Market(gas_price=0))
+    assert out.feasible.all()
+    assert (np.diff(out.net_apr) > 0).all()
+    assert (out.gas_apr == 0).all()
+
+    # borrowing costs more than deposits and emissions earn
+    out = evaluate(
+        candidates, series(borrow_rate=0.3, borrow_emission=0), Market(gas_price=0)
+    )
+    assert (np.diff(out.net_apr) < 0).all()
+
+
+def test_gas_scales_with_the_gas_price():
+    candidates = Candidates.grid(
+        target_collat_ratio=int(0.7e18), max_iterations=[2, 10]
+    )
+    cheap = evaluate(candidates, series(), Market(gas_price=10))
+    dear = evaluate(candidates, series(), Market(gas_price=100))
+    assert dear.gas_apr == pytest.approx(cheap.gas_apr * 10)
+    assert (dear.net_apr < cheap.net_apr).all()
+    # a small deposit pays the same gas from less yield
+    small = evaluate(candidates, series(), Market(gas_price=10, deposit=10 ** 20))
+    assert (small.gas_apr > cheap.gas_apr * 5_000).all()
+
+
+def test_rate_spike_makes_thin_margins_infeasible():
+    candidates = Candidates.grid(
+        target_collat_ratio=[int(0.7e18), int(0.8e18)], max_margin=int(0.015e18)
+    )
+    market = Market(stress_borrow_rate=1.0, reaction_days=7)
+    out = evaluate(candidates, series(), market)
+    # 0.815 under a 0.825 threshold crosses in about 4.4 days at a 101% spread
+    assert out.days_to_liquidation[1] == pytest.approx(
+        np.log(0.825 / 0.815) / 1.01 * 365, rel=1e-6
+    )
+    assert out.feasible.tolist() == [True, False]
+    result = search(candidates, series(), market, workers=1)
+    assert result.recommendation().target_collat_ratio == int(0.7e18)
+
+
+def test_search_pool_matches_one_process():
+    market = Market()
+    candidates = default_grid(market).take(slice(0, 200))
+    one = search(candidates, series(days=10), market, workers=1, chunk=50)
+    pool = search(candidates, series(days=10), market, workers=2, chunk=50)
+    assert np.array_equal(one.evaluation.score, pool.evaluation.score)
+    best = one.best(3)
+    assert best[0]["net_apr"] >= best[1]["net_apr"] >= best[2]["net_apr"]
+    assert all(row["feasible"] for row in best)
+
+
+def test_recommendation_calls():
+    strategy = SimpleNamespace(
+        maxBorrowCollatRatio=lambda: int(0.795e18),
+        daiBorrowCollatRatio=lambda: int(0.745e18),
+        swapRouter=lambda: 0,
+        sellStkAave=lambda: True,
+        cooldownStkAave=lambda: False,
+        maxStkAavePriceImpactBps=lambda: 500,
+        stkAaveToAaveSwapFee=lambda: 3000,
+        aaveToWethSwapFee=lambda: 3000,
+        wethToWantSwapFee=lambda: 500,
+    )
+    recommendation = Recommendation(
+        target_collat_ratio=int(0.78e18),
+        max_collat_ratio=int(0.8e18),
+        min_ratio=int(0.005e18),
+        min_want=100,
+        max_iterations=6,
+        min_reward_to_sell=10 ** 17,
+    )
+    assert recommendation.format(strategy) == [
+        f"strategy.setCollateralTargets({int(0.78e18)}, {int(0.8e18)}, "
+        f'{int(0.795e18)}, {int(0.745e18)}, {{"from": gov}})',
+        f'strategy.setMinsAndMaxs(100, {int(0.005e18)}, 6, {{"from": gov}})',
+        f"strategy.setRewardBehavior(0, True, False, {10 ** 17}, 500, 3000, 3000, "
+        f'500, {{"from": gov}})',
+    ]
+
+
+def test_bayesian_search():
+    pytest.importorskip("optuna")
+    from scripts.optimizer import bayesian_search
+
+    space = dict(
+        target_collat_ratio=(int(0.3e18), int(0.8e18)),
+        max_collat_ratio=(int(0.31e18), int(0.82e18)),
+        max_iterations=(1, 10),
+    )
+    result = bayesian_search(space, series(days=10), trials=32, batch=8, workers=1)
+    assert len(result.candidates) == 32
+    best = result.recommendation()
+    assert best.target_collat_ratio < best.max_collat_ratio < int(0.825e18)
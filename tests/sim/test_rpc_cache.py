@@ -0,0 +1,108 @@
+import json
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from utils.rpc_cache import RPCCache, RPCCacheMiss
+
+
+@pytest.fixture
+def upstream():
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests.append(request)
+            result = {"jsonrpc": "2.0", "id": request["id"], "result": "0x2a"}
+            body = json.dumps(result).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    yield f"http://{host}:{port}", requests
+    server.shutdown()
+
+
+def rpc(url, method, *params):
+    request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": list(params)}
+    request = urllib.request.Request(
+        url, json.dumps(request).encode(), {"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_record_and_replay(tmp_path, upstream):
+    url, requests = upstream
+    path = tmp_path / "rpc_cache.json.gz"
+    slot = ("0x6B175474E89094C44Da98b954EedeAC495271d0F", "0x0", "0xc5d2a0")
+
+    cache = RPCCache(path, "record", upstream=url, block=12_964_000).start()
+    assert cache.fork.endswith("@12964000")
+    assert rpc(cache.url, "eth_getStorageAt", *slot)["result"] == "0x2a"
+    rpc(cache.url, "eth_blockNumber")
+    cache.stop()
+    assert len(requests) == 2
+
+    cache = RPCCache(path, "replay").start()
+    assert cache.block == 12_964_000
+    assert rpc(cache.url, "eth_getStorageAt", *slot)["result"] == "0x2a"
+    assert len(requests) == 2
+
+    # the head of the chain is never recorded and a miss is an error
+    response = rpc(cache.url, "eth_blockNumber")
+    assert "eth_blockNumber" in response["error"]["message"]
+    assert len(requests) == 2
+    assert len(cache.misses) == 1
+    cache.stop()
+
+
+def test_replay_explorer(tmp_path, upstream):
+    url, _ = upstream
+    path = tmp_path / "rpc_cache.json.gz"
+    fetched = []
+
+    def fetch(address, action, silent):
+        fetched.append(address)
+        return {"result": [{"ContractName": "Dai"}]}
+
+    cache = RPCCache(path, "record", upstream=url, block=12_964_000).start()
+    cache.wrap_explorer(fetch)("0xABC", "getsourcecode", True)
+    cache.stop()
+
+    replay = RPCCache(path, "replay").wrap_explorer(fetch)
+    assert replay("0xabc", "getsourcecode", True)["result"][0]["ContractName"] == "Dai"
+    assert fetched == ["0xABC"]
+    with pytest.raises(RPCCacheMiss):
+        replay("0xdef", "getsourcecode", True)
+
+
+def test_replay_needs_a_recording(tmp_path):
+    with pytest.raises(RPCCacheMiss):
+        RPCCache(tmp_path / "rpc_cache.json.gz", "replay")
+
+
+def test_parallel_recordings_merge(tmp_path, upstream):
+    url, _ = upstream
+    path = tmp_path / "rpc_cache.json.gz"
+    # as xdist workers do, every recorder starts before any of them saves
+    caches = [RPCCache(path, "record", upstream=url, block=1) for _ in range(8)]
+    for i, cache in enumerate(caches):
+        cache.responses[f"key {i}"] = {"result": hex(i)}
+    threads = [threading.Thread(target=cache.save) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    replay = RPCCache(path, "replay")
+    assert replay.responses == {f"key {i}": {"result": hex(i)} for i in range(8)}
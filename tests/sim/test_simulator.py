@@ -0,0 +1,170 @@
+import numpy as np
+import pytest
+from scripts.simulator import (
+    COLLATERAL_RATIO_PRECISION,
+    PositionSimulator,
+    Scenarios,
+    get_borrow_from_supply,
+    get_deposit_from_borrow,
+    simulate_deposit,
+    simulate_withdrawal,
+)
+
+WETH_TARGET = int(0.805e18) - int(0.02e18)
+WETH_MAX = int(0.805e18) - int(0.005e18)
+WETH_MAX_BORROW = int(0.8e18) - int(0.005e18)
+
+
+def scenarios(**kwargs):
+    params = dict(
+        deposit=1_000 * 10 ** 18,
+        target_collat_ratio=WETH_TARGET,
+        max_borrow_collat_ratio=WETH_MAX_BORROW,
+        max_collat_ratio=WETH_MAX,
+    )
+    params.update(kwargs)
+    return Scenarios(**params)
+
+
+def test_helpers_floor_like_solidity():
+    supply = np.array([10 ** 30 + 7, 3], dtype=object)
+    ratio = np.array([WETH_TARGET, WETH_TARGET], dtype=object)
+    expected = [
+        int(s) * WETH_TARGET // (COLLATERAL_RATIO_PRECISION - WETH_TARGET)
+        for s in supply
+    ]
+    assert list(get_borrow_from_supply(supply, ratio)) == expected
+    assert list(get_deposit_from_borrow(supply, ratio)) == [
+        int(s) * COLLATERAL_RATIO_PRECISION // WETH_TARGET for s in supply
+    ]
+
+
+def test_flash_mint_lever_up_hits_target():
+    sim = simulate_deposit(scenarios(is_flash_mint_active=True))
+    out = sim.summary()
+    assert out["flash_mints"][0] == 1
+    assert out["iterations"][0] == 0
+    assert not out["reverted"][0]
+    assert out["collat_ratio"][0] == pytest.approx(WETH_TARGET, rel=1e-9)
+    assert out["deposits"][0] - out["borrows"][0] == 1_000 * 10 ** 18
+
+
+def test_flash_mint_lever_up_is_single_pass():
+    sim = simulate_deposit(
+        scenarios(target_collat_ratio=[int(0.3e18), WETH_TARGET], want_is_dai=False)
+    )
+    out = sim.summary()
+    # own collateral covers the borrow: deposit, borrow, deposit
+    assert out["flash_mints"][0] == 0
+    assert out["aave_calls"][0] == 3
+    # deposit, then deposit DAI, borrow, deposit, withdraw DAI in the callback
+    assert out["flash_mints"][1] == 1
+    assert out["aave_calls"][1] == 5
+    assert not out["reverted"].any()
+    assert out["collat_ratio"][0] == pytest.approx(int(0.3e18), rel=1e-9)
+    assert out["collat_ratio"][1] == pytest.approx(WETH_TARGET, rel=1e-9)
+
+
+def test_dai_flash_mint_lever_up_ignores_headroom():
+    # the headroom would leave less DAI minted than borrowed
+    sim = simulate_deposit(
+        scenarios(
+            target_collat_ratio=[int(0.5e18), int(0.7e18)],
+            max_borrow_collat_ratio=int(0.745e18),
+            max_collat_ratio=int(0.795e18),
+            want_is_dai=True,
+        )
+    )
+    out = sim.summary()
+    assert (out["flash_mints"] == 1).all()
+    assert not out["reverted"].any()
+    assert out["collat_ratio"][0] == pytest.approx(int(0.5e18), rel=1e-9)
+    assert out["collat_ratio"][1] == pytest.approx(int(0.7e18), rel=1e-9)
+
+
+def test_loop_lever_up_is_bounded_by_max_iterations():
+    sim = simulate_deposit(
+        scenarios(is_flash_mint_active=False, max_iterations=[1, 3, 6, 15])
+    )
+    out = sim.summary()
+    assert list(out["iterations"][:3]) == [1, 3, 6]
+    # the loop stops early once the remaining borrow is below minWant
+    assert out["iterations"][3] <= 15
+    assert out["flash_mints"].sum() == 0
+    # more iterations always means more borrowed
+    assert list(out["borrows"]) == sorted(out["borrows"])
+
+
+def test_vectorized_matches_single_scenarios():
+    grid = Scenarios.grid(
+        deposit=[10 ** 18, 10 ** 24],
+        target_collat_ratio=[int(0.5e18), WETH_TARGET],
+        max_borrow_collat_ratio=WETH_MAX_BORROW,
+        max_iterations=[1, 6],
+        is_flash_mint_active=[True, False],
+    )
+    batch = simulate_deposit(grid).summary()
+    for i in range(grid.size):
+        single = simulate_deposit(
+            Scenarios(
+                deposit=grid.deposit[i],
+                target_collat_ratio=grid.target_collat_ratio[i],
+                max_borrow_collat_ratio=grid.max_borrow_collat_ratio[i],
+                max_iterations=grid.max_iterations[i],
+                is_flash_mint_active=grid.is_flash_mint_active[i],
+                max_collat_ratio=grid.max_collat_ratio[i],
+            )
+        ).summary()
+        for key, values in batch.items():
+            assert values[i] == single[key][0]
+
+
+def test_capped_flash_mint_scales_amount_down():
+    uncapped = simulate_deposit(scenarios()).summary()
+    capped = simulate_deposit(scenarios(max_liquidity=10 ** 18)).summary()
+    assert capped["flash_mints"][0] == 1
+    assert capped["borrows"][0] < uncapped["borrows"][0]
+
+
+def test_withdrawal_frees_requested_amount():
+    amount = 100 * 10 ** 18
+    sim = simulate_withdrawal(
+        scenarios(is_flash_mint_active=[True, False], max_iterations=15), amount
+    )
+    out = sim.summary()
+    assert out["flash_mints"][0] == 1
+    assert out["flash_mints"][1] == 0
+    assert out["iterations"][1] > 0
+    assert all(balance >= amount for balance in out["want_balance"])
+    assert not out["reverted"].any()
+
+
+def test_liquidate_position_invariant():
+    sc = scenarios(deposit=[10 ** 18, 10 ** 21, 10 ** 24], is_flash_mint_active=False)
+    sim = simulate_deposit(sc)
+    needed = sc.deposit // 2
+    liquidated, loss = sim.liquidate_position(needed)
+    assert all(l + x <= n for l, x, n in zip(liquidated, loss, needed))
+
+
+def test_capped_deleverage_repeats_flash_mints():
+    sc = scenarios(is_flash_mint_active=True, max_iterations=1)
+    deposited = simulate_deposit(sc)
+    # DssFlash lends 500k DAI at most during the withdrawal
+    sim = PositionSimulator(
+        scenarios(
+            deposit=[sc.deposit[0]] * 2,
+            max_liquidity=[10 ** 36, 500_000 * 10 ** 18],
+        ),
+        deposits=deposited.deposits[0],
+        borrows=deposited.borrows[0],
+        want_balance=0,
+    )
+    amount = sc.deposit[0] // 2
+    sim.liquidate_position(amount)
+    out = sim.summary()
+    assert out["flash_mints"][0] == 1
+    assert out["flash_mints"][1] > 1
+    assert out["iterations"][1] == 0
+    assert all(balance >= amount for balance in out["want_balance"])
+    assert not out["reverted"].any()
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import pytest
+from scripts.stress import NEVER, Fleet, Shocks, stress
+
+
+def fleet(size=1, **columns):
+    values = dict(
+        deposits=100.0,
+        borrows=75.0,
+        dai_collateral=0.0,
+        liquidation_threshold=0.825,
+        dai_liquidation_threshold=0.8,
+        target_collat_ratio=0.805,
+        max_collat_ratio=0.82,
+        supply_rate=0.02,
+        borrow_rate=0.03,
+    )
+    values.update(columns)
+    return Fleet(
+        names=[f"strategy {i}" for i in range(size)],
+        **{
+            name: np.broadcast_to(np.asarray(value, dtype=float), (size,)).copy()
+            for name, value in values.items()
+        },
+    )
+
+
+def test_price_shocks_cancel_without_dai_collateral():
+    shocks = Shocks.grid(want_eth=[0.5, 1, 2], want_dai=[0.5, 2])
+    result = stress(fleet(), shocks, horizon_days=10 * 365)
+    assert np.allclose(result.collat_ratio, 0.75)
+    assert not result.warned.any()
+    # borrows grow 1% a year faster than deposits
+    expected = np.log(0.815 / 0.75) / 0.01 * 365
+    assert result.days_to_warning == pytest.approx(expected, rel=1e-9)
+
+
+def test_dai_collateral_moves_with_the_price():
+    result = stress(
+        fleet(deposits=80, borrows=75, dai_collateral=20),
+        Shocks.grid(want_eth=[1, 2], want_dai=[1, 0.5]),
+        horizon_days=30,
+    )
+    # dai gains against want when want loses against dai
+    assert result.collat_ratio[0] == pytest.approx([0.75, 0.625, 0.75, 0.625])
+    # want doubles in dai: the dai collateral is worth half as much
+    shocked = Shocks.grid(want_eth=1, want_dai=2)
+    worse = stress(fleet(deposits=80, borrows=75, dai_collateral=20), shocked)
+    assert worse.collat_ratio[0, 0] == pytest.approx(75 / 90)
+    assert worse.liquidated[0, 0]
+
+
+def test_borrow_rate_spike_and_threshold_cut():
+    shocks = Shocks.grid(borrow_rate=[0, 0.5], liquidation_threshold=[0, 0.02, 0.1])
+    result = stress(fleet(borrows=80), shocks, horizon_days=365)
+    days = result.days_to_liquidation[0]
+    # no spike: 1% a year takes longer than the horizon to cross 0.8 -> 0.825
+    assert days[0] == NEVER
+    # a 50% spike crosses in weeks
+    expected = np.log(0.825 / 0.8) / 0.51 * 365
+    assert days[3] == pytest.approx(expected, rel=1e-9)
+    # the threshold cut to 0.805 warns right away, to 0.725 liquidates
+    assert result.warned[0, 1] and not result.liquidated[0, 1]
+    assert result.liquidated[0, 2] and result.liquidated[0, 5]
+
+    row = result.table()[0]
+    assert row["liquidated"] == pytest.approx(2 / 6)
+    assert row["min_days_to_liquidation"] == 0
+
+
+def test_bisection_matches_the_closed_form():
+    shocks = Shocks.grid(borrow_rate=np.linspace(0, 0.5, 11))
+    closed = stress(fleet(borrows=78), shocks)
+    # a speck of aDAI takes the bisection path
+    bisected = stress(fleet(borrows=78, dai_collateral=1e-12), shocks)
+    finite = np.isfinite(closed.days_to_liquidation)
+    assert finite.sum() > 5
+    assert np.array_equal(finite, np.isfinite(bisected.days_to_liquidation))
+    assert bisected.days_to_liquidation[finite] == pytest.approx(
+        closed.days_to_liquidation[finite], rel=1e-6
+    )
+
+
+def test_share_liquidated_and_csv(tmp_path):
+    shocks = Shocks.grid(want_eth=[1, 2], borrow_rate=[0, 1])
+    result = stress(fleet(2, borrows=[70, 82]), shocks, horizon_days=30)
+    xs, ys, grid = result.share_liquidated("want_eth", "borrow_rate")
+    assert list(xs) == [1, 2] and list(ys) == [0, 1]
+    assert grid.tolist() == [[0, 0], [0.5, 0.5]]
+
+    result.write_csv(tmp_path / "stress.csv")
+    lines = (tmp_path / "stress.csv").read_text().splitlines()
+    assert len(lines) == 1 + 2 * 4
+
+
+def test_heatmap(tmp_path):
+    pytest.importorskip("matplotlib")
+    shocks = Shocks.grid(want_eth=[1, 2], borrow_rate=[0, 0.5, 1])
+    result = stress(fleet(2, borrows=[70, 82]), shocks, horizon_days=30)
+    fig = result.heatmap("want_eth", "borrow_rate", tmp_path / "stress.png")
+    ax = fig.axes[0]
+    assert [label.get_text() for label in ax.get_xticklabels()] == ["1", "2"]
+    assert ax.get_ylabel() == "borrow_rate"
+    assert (tmp_path / "stress.png").stat().st_size > 0
+
+
+def test_fleet_sweep_is_fast():
+    rng = np.random.default_rng(0)
+    deposits = rng.uniform(1, 1_000, 50)
+    strategies = fleet(
+        50,
+        deposits=deposits,
+        borrows=deposits * rng.uniform(0.5, 0.82, 50),
+        dai_collateral=np.where(np.arange(50) < 5, 1.0, 0.0),
+    )
+    shocks = Shocks.grid(
+        want_eth=np.linspace(0.5, 1.5, 11),
+        want_dai=np.linspace(0.5, 1.5, 11),
+        borrow_rate=np.linspace(0, 1, 21),
+        liquidation_threshold=[0, 0.01, 0.02, 0.05],
+    )
+    assert len(shocks) > 10_000
+    start = time.perf_counter()
+    stress(strategies, shocks)
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,63 @@
+import pytest
+from brownie import accounts, chain
+from scripts.bank_run import HARVEST, LoadReport, deposit_sizes, withdrawal_schedule
+from scripts.withdrawal_quote import quote_withdrawal
+from utils import actions
+
+
+@pytest.fixture
+def depositors(request, token, token_whale, vault):
+    count = request.config.getoption("--bank-run-depositors")
+    funder = accounts[7]
+    total = actions.fund_from_whale(token, token_whale, funder, 20_000_000)
+    depositors = []
+    for size in deposit_sizes(count, total):
+        depositor = accounts.add()
+        funder.transfer(depositor, "0.01 ether")
+        depositors.append(depositor)
+        if size == 0:
+            continue
+        token.transfer(depositor, size, {"from": funder})
+        token.approve(vault, size, {"from": depositor})
+        vault.deposit(size, {"from": depositor})
+    yield depositors
+
+
+def test_bank_run(token, vault, strategy, strategist, depositors, flashloans_active):
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+    liquidation_threshold = strategy.getPositionSnapshot().dict()[
+        "liquidationThreshold"
+    ]
+
+    report = LoadReport()
+    max_iterations = strategy.maxIterations()
+    for depositor, bps in withdrawal_schedule(len(depositors)):
+        if depositor == HARVEST:
+            chain.sleep(3600)
+            strategy.harvest({"from": strategist})
+            continue
+        depositor = depositors[depositor]
+        shares = vault.balanceOf(depositor) * bps // 10_000
+        if shares == 0:
+            continue
+        amount = shares * vault.pricePerShare() // 10 ** vault.decimals()
+        quote = quote_withdrawal(vault, strategy, amount)
+        assert quote.fits
+
+        before = token.balanceOf(depositor)
+        # the default max loss of 1 bps reverts withdrawals that lose more
+        tx = vault.withdraw(shares, {"from": depositor})
+        assert token.balanceOf(depositor) - before > 0
+        assert tx.gas_used <= quote.gas_limit
+        report.record(
+            tx.gas_used,
+            amount,
+            quote.iterations >= max_iterations,
+            strategy.getCurrentCollatRatio(),
+            strategy.targetCollatRatio(),
+        )
+        assert strategy.getCurrentCollatRatio() < liquidation_threshold
+
+    report.print()
+    assert strategy.getCurrentCollatRatio() <= strategy.maxCollatRatio()
@@ -1,4 +1,6 @@
+import brownie
 import pytest
+from brownie import Contract
 from utils import actions, utils
 
 
@@ -43,3 +45,57 @@ def test_clone(
         pytest.approx(cloned_strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
         == amount
     )
+
+
+def test_clone_batch(deploy_vault, token, factory, strategist, Strategy):
+    vaults = [deploy_vault(token) for _ in range(3)]
+    tx = factory.cloneLevAaveBatch(vaults, {"from": strategist})
+    clones = tx.return_value
+    assert [e["clone"] for e in tx.events["Cloned"]] == list(clones)
+    for vault, clone in zip(vaults, clones):
+        clone = Strategy.at(clone)
+        assert clone.vault() == vault
+        assert clone.strategist() == strategist
+        assert clone.maxIterations() == 6
+
+
+def test_clone_deterministic(vault, factory, strategist, user, Strategy):
+    salt = b"lev-aave-weth".ljust(32, b"\0")
+    predicted = factory.predictCloneAddress(strategist, salt)
+    # the same salt gives another deployer another address
+    assert factory.predictCloneAddress(user, salt) != predicted
+
+    tx = factory.cloneLevAaveDeterministic(vault, salt, {"from": strategist})
+    assert tx.return_value == predicted
+    assert Strategy.at(predicted).vault() == vault
+
+    with brownie.reverts("dev: clone failed"):
+        factory.cloneLevAaveDeterministic(vault, salt, {"from": strategist})
+
+
+def test_clone_approves_routes_on_first_use(
+    chain, vault, factory, strategist, gov, token, token_whale, user, Strategy
+):
+    clone = Strategy.at(factory.cloneLevAave(vault, {"from": strategist}).return_value)
+    dai = Contract("0x6B175474E89094C44Da98b954EedeAC495271d0F")
+    aave = Contract("0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9")
+    uni_v2 = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+    sushi = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+    lender = "0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853"
+    lending_pool = "0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9"
+    assert token.allowance(clone, lending_pool) == 2 ** 256 - 1
+    assert dai.allowance(clone, lender) == 0
+    assert aave.allowance(clone, uni_v2) == aave.allowance(clone, sushi) == 0
+
+    vault.addStrategy(clone, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    amount = actions.fund_from_whale(token, token_whale, user, 1_000_000)
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+    clone.harvest({"from": strategist})
+    assert dai.allowance(clone, lender) > 0
+
+    # uniswap v2 is the default route, sushi stays unapproved
+    utils.sleep(7 * 24 * 3600)
+    clone.harvest({"from": strategist})
+    assert aave.allowance(clone, uni_v2) > 0
+    assert aave.allowance(clone, sushi) == 0
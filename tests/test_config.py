@@ -0,0 +1,48 @@
+import brownie
+
+
+def test_setters_round_trip_packed_config(strategy, gov):
+    strategy.setMinsAndMaxs(2 ** 128 - 1, 0.01 * 1e18, 15, {"from": gov})
+    assert strategy.minWant() == 2 ** 128 - 1
+    assert strategy.minRatio() == 0.01 * 1e18
+    assert strategy.maxIterations() == 15
+    assert strategy.isFlashMintActive()
+
+    strategy.setRewardBehavior(
+        2, False, True, 2 ** 96 - 1, 10_000, 500, 3_000, 10_000, {"from": gov}
+    )
+    assert strategy.swapRouter() == 2
+    assert strategy.minRewardToSell() == 2 ** 96 - 1
+    assert strategy.maxStkAavePriceImpactBps() == 10_000
+    assert strategy.wethToWantSwapFee() == 10_000
+
+    target = strategy.targetCollatRatio() - 0.1 * 1e18
+    strategy.setCollateralTargets(
+        target,
+        strategy.maxCollatRatio(),
+        strategy.maxBorrowCollatRatio(),
+        strategy.daiBorrowCollatRatio(),
+        {"from": gov},
+    )
+    assert strategy.targetCollatRatio() == target
+    assert strategy.getPositionSnapshot().dict()["targetCollatRatio"] == target
+
+
+def test_setters_reject_values_the_slots_cannot_hold(strategy, gov):
+    with brownie.reverts():
+        strategy.setMinsAndMaxs(2 ** 128, 0.01 * 1e18, 6, {"from": gov})
+    with brownie.reverts():
+        strategy.setRewardBehavior(
+            0, True, False, 2 ** 96, 500, 3_000, 3_000, 3_000, {"from": gov}
+        )
+    with brownie.reverts():
+        strategy.setRewardClaimGas(2 ** 32, {"from": gov})
+    # ratios stay below aave's liquidation threshold, so below 1 ether
+    with brownie.reverts():
+        strategy.setCollateralTargets(
+            2 ** 64,
+            strategy.maxCollatRatio(),
+            strategy.maxBorrowCollatRatio(),
+            strategy.daiBorrowCollatRatio(),
+            {"from": gov},
+        )
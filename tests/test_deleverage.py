@@ -2,15 +2,14 @@ import brownie
 from brownie import Contract
 import pytest
 from utils import actions, checks, utils
+from utils.tokens import token_prices
 
 
 def test_large_deleverage_to_zero(
-    chain, gov, token, vault, strategy, user, strategist, big_amount, RELATIVE_APPROX
+    chain, gov, token, big_levered, user, strategist, RELATIVE_APPROX
 ):
-    # Deposit to the vault and harvest
-    actions.user_deposit(user, vault, token, big_amount)
-    utils.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Deposited and harvested
+    vault, strategy, big_amount = big_levered
 
     assert (
         pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
@@ -44,12 +43,10 @@ def test_large_deleverage_to_zero(
 
 
 def test_large_deleverage_to_zero(
-    chain, gov, token, vault, strategy, user, strategist, big_amount, RELATIVE_APPROX
+    chain, gov, token, big_levered, user, strategist, RELATIVE_APPROX
 ):
-    # Deposit to the vault and harvest
-    actions.user_deposit(user, vault, token, big_amount)
-    utils.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Deposited and harvested
+    vault, strategy, big_amount = big_levered
 
     assert (
         pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
@@ -83,12 +80,10 @@ def test_large_deleverage_to_zero(
 
 
 def test_large_deleverage_parameter_change(
-    chain, gov, token, vault, strategy, user, strategist, big_amount, RELATIVE_APPROX
+    chain, gov, token, big_levered, user, strategist, RELATIVE_APPROX
 ):
-    # Deposit to the vault and harvest
-    actions.user_deposit(user, vault, token, big_amount)
-    utils.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Deposited and harvested
+    vault, strategy, big_amount = big_levered
 
     assert (
         pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
@@ -132,12 +127,10 @@ def test_large_deleverage_parameter_change(
 
 
 def test_large_manual_deleverage_to_zero(
-    chain, gov, token, vault, strategy, user, strategist, big_amount, RELATIVE_APPROX
+    chain, gov, token, big_levered, user, strategist, RELATIVE_APPROX
 ):
-    # Deposit to the vault and harvest
-    actions.user_deposit(user, vault, token, big_amount)
-    utils.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Deposited and harvested
+    vault, strategy, big_amount = big_levered
 
     assert (
         pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
@@ -195,3 +188,25 @@ def test_large_manual_deleverage_to_zero(
         )
         == 0
     )
+
+
+def test_capped_flash_mint_deleverage_in_one_tx(token, levered, user, RELATIVE_APPROX):
+    vault, strategy, amount = levered
+    # DssFlash lends a tenth of what the position is worth at most
+    usd = amount * token_prices[token.symbol()] // 10 ** token.decimals()
+    actions.set_flash_mint_cap(int(usd // 10) * 10 ** 18)
+    quote = strategy.quoteFreeFunds(amount // 2).dict()
+    assert quote["flashMints"] > 1
+
+    before = token.balanceOf(user)
+    tx = vault.withdraw(vault.balanceOf(user) // 2, user, 10_000, {"from": user})
+    assert len(tx.events["Leverage"]) == quote["flashMints"]
+    assert len(tx.events["Leverage"]) > 1
+    assert (
+        pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-3)
+        == strategy.targetCollatRatio()
+    )
+    assert (
+        pytest.approx(token.balanceOf(user) - before, rel=RELATIVE_APPROX)
+        == amount // 2
+    )
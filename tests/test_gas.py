@@ -0,0 +1,190 @@
+import pytest
+from utils import actions, gas, utils
+from utils.tokens import token_prices
+
+# Gas benchmarks: run with `--update-gas-baseline` to refresh tests/gas_baseline.json
+# and `--gas-threshold 0.02` to tighten how much a path may regress
+@pytest.fixture(params=[1, 6, 15])
+def max_iterations(request, strategy, gov):
+    strategy.setMinsAndMaxs(
+        strategy.minWant(), strategy.minRatio(), request.param, {"from": gov}
+    )
+    yield request.param
+
+
+@pytest.fixture(params=[0.01, 1])
+def deposit_amount(request, amount):
+    yield int(amount * request.param)
+
+
+def bench_key(op, token, flashloans_active, max_iterations, deposit_amount, amount):
+    return gas.key(
+        op,
+        token.symbol(),
+        "flash" if flashloans_active else "loop",
+        f"iter{max_iterations}",
+        f"size{deposit_amount * 100 // amount}",
+    )
+
+
+def test_gas_harvest_and_tend(
+    chain,
+    gov,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    flashloans_active,
+    max_iterations,
+    deposit_amount,
+    gas_baseline,
+):
+    params = (token, flashloans_active, max_iterations, deposit_amount, amount)
+    actions.user_deposit(user, vault, token, deposit_amount)
+
+    chain.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    gas_baseline.check(bench_key("harvest", *params), tx)
+
+    # tend has to move the position to be meaningful, lower the target a bit
+    strategy.setCollateralTargets(
+        strategy.targetCollatRatio() - 0.02 * 1e18,
+        strategy.maxCollatRatio(),
+        strategy.maxBorrowCollatRatio(),
+        strategy.daiBorrowCollatRatio(),
+        {"from": gov},
+    )
+    tx = strategy.tend({"from": strategist})
+    gas_baseline.check(bench_key("tend", *params), tx)
+
+    utils.sleep(3 * 24 * 3600)
+    tx = strategy.harvest({"from": strategist})
+    gas_baseline.check(bench_key("harvest-rewards", *params), tx)
+
+
+def test_gas_withdraw(
+    chain,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    flashloans_active,
+    max_iterations,
+    deposit_amount,
+    gas_baseline,
+):
+    params = (token, flashloans_active, max_iterations, deposit_amount, amount)
+    actions.user_deposit(user, vault, token, deposit_amount)
+
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+    utils.sleep(1)
+
+    tx = vault.withdraw(vault.balanceOf(user) // 2, user, 10_000, {"from": user})
+    gas_baseline.check(bench_key("withdraw", *params), tx)
+
+
+def test_gas_manual_claim_and_sell_rewards(
+    chain,
+    gov,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    flashloans_active,
+    gas_baseline,
+):
+    actions.user_deposit(user, vault, token, amount)
+
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+    utils.sleep(7 * 24 * 3600)
+
+    tx = strategy.manualClaimAndSellRewards({"from": gov})
+    gas_baseline.check(
+        gas.key(
+            "manualClaimAndSellRewards",
+            token.symbol(),
+            "flash" if flashloans_active else "loop",
+        ),
+        tx,
+    )
+
+
+@pytest.mark.parametrize("capped", [False, True])
+def test_gas_flash_mint(
+    chain, token, vault, strategy, user, strategist, amount, capped, gas_baseline
+):
+    mode = "capped" if capped else "uncapped"
+    if capped:
+        # a quarter of the deposit in DAI, far below what ~4x leverage needs
+        usd = amount * token_prices[token.symbol()] // 10 ** token.decimals()
+        actions.set_flash_mint_cap(int(usd // 4) * 10 ** 18)
+    actions.user_deposit(user, vault, token, amount)
+
+    chain.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    gas_baseline.check(gas.key("flash-mint-up", token.symbol(), mode), tx)
+
+    utils.sleep(1)
+    tx = vault.withdraw(vault.balanceOf(user) // 2, user, 10_000, {"from": user})
+    gas_baseline.check(gas.key("flash-mint-down", token.symbol(), mode), tx)
+
+
+@pytest.mark.parametrize("reward_claim_gas", [0, 500_000])
+def test_gas_harvest_dust_rewards(
+    chain,
+    gov,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    reward_claim_gas,
+    gas_baseline,
+):
+    # a small clone: an hour of rewards on $1k is worth less than the claim
+    strategy.setRewardClaimGas(reward_claim_gas, {"from": gov})
+    actions.user_deposit(user, vault, token, amount // 1_000)
+    chain.sleep(1)
+    strategy.harvest({"from": strategist})
+    utils.sleep(3600)
+
+    tx = strategy.harvest({"from": strategist, "gas_price": "50 gwei"})
+    claimed = strategy.getPositionSnapshot().dict()["pendingStkAave"] == 0
+    assert claimed == (reward_claim_gas == 0)
+    gas_baseline.check(
+        gas.key(
+            "harvest-dust-rewards",
+            token.symbol(),
+            "claim" if reward_claim_gas == 0 else "skip",
+        ),
+        tx,
+    )
+
+
+def test_gas_clone(deploy_vault, token, factory, strategist, gas_baseline):
+    vaults = [deploy_vault(token) for _ in range(5)]
+    symbol = token.symbol()
+    single = gas_baseline.check(
+        gas.key("clone-single", symbol),
+        factory.cloneLevAave(vaults[0], {"from": strategist}),
+    )
+    deterministic = gas_baseline.check(
+        gas.key("clone-create2", symbol),
+        factory.cloneLevAaveDeterministic(vaults[0], 0, {"from": strategist}),
+    )
+    batch = gas_baseline.check(
+        gas.key("clone-batch-5", symbol),
+        factory.cloneLevAaveBatch(vaults, {"from": strategist}),
+    )
+    print(f"per clone: {single:,} single, {deterministic:,} create2, {batch // 5:,}")
+    # the batch only saves the base cost of the txs it replaces
+    assert batch // 5 < single
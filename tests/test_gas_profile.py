@@ -0,0 +1,23 @@
+from scripts.gas_profile import GasProfile
+from utils import utils
+
+
+def test_harvest_profile(chain, levered, strategist, tmp_path):
+    vault, strategy, amount = levered
+    utils.sleep(3 * 24 * 3600)
+    tx = strategy.harvest({"from": strategist})
+
+    gas_profile = GasProfile(tx)
+    inclusive = gas_profile.inclusive()
+    roots = {stack[0] for stack in gas_profile.stacks}
+    # harvest is inherited, its name depends on where brownie maps it to
+    assert len(roots) == 1 and roots.pop().endswith(".harvest")
+    assert gas_profile.attributed <= tx.gas_used
+    assert inclusive["Strategy.prepareReturn"] > 0
+    assert inclusive["Strategy._claimAndSellRewards"] > 0
+
+    path = tmp_path / "harvest.folded"
+    gas_profile.write_folded(path)
+    lines = path.read_text().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == gas_profile.attributed
+    print(gas_profile.summary())
@@ -7,19 +7,13 @@ def test_profitable_harvest(
     accounts,
     token,
     token_whale,
-    vault,
-    strategy,
+    levered,
     user,
     strategist,
-    amount,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Harvest 1 already sent the deposit through the strategy
+    vault, strategy, amount = levered
     total_assets = strategy.estimatedTotalAssets()
     assert pytest.approx(total_assets, rel=RELATIVE_APPROX) == amount
 
@@ -48,14 +42,11 @@ def test_profitable_harvest(
 
 # tests harvesting a strategy that reports losses
 def test_lossy_harvest(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
+    chain, accounts, token, levered, user, strategist, RELATIVE_APPROX
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Harvest 1 already sent the deposit through the strategy
+    vault, strategy, amount = levered
+    user_balance_before = token.balanceOf(user)
     total_assets = strategy.estimatedTotalAssets()
     assert pytest.approx(total_assets, rel=RELATIVE_APPROX) == amount
 
@@ -77,7 +68,10 @@ def test_lossy_harvest(
     # User will withdraw accepting losses
     vault.withdraw(vault.balanceOf(user), user, 10_000, {"from": user})
     assert (
-        pytest.approx(token.balanceOf(user) + loss_amount, rel=RELATIVE_APPROX)
+        pytest.approx(
+            token.balanceOf(user) - user_balance_before + loss_amount,
+            rel=RELATIVE_APPROX,
+        )
         == amount
     )
 
@@ -89,19 +83,13 @@ def test_choppy_harvest(
     accounts,
     token,
     token_whale,
-    vault,
-    strategy,
+    levered,
     user,
     strategist,
-    amount,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Harvest 1 already sent the deposit through the strategy
+    vault, strategy, amount = levered
 
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
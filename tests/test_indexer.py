@@ -0,0 +1,36 @@
+from brownie import Strategy
+from scripts.indexer import Indexer
+from utils import actions
+
+
+def test_indexer_sync(
+    chain, gov, token, vault, factory, deploy_vault, strategy, user, amount, strategist
+):
+    other_vault = deploy_vault(token)
+    tx = factory.cloneLevAave(other_vault, {"from": strategist})
+    clone = Strategy.at(tx.events["Cloned"]["clone"])
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+    harvest = strategy.harvest({"from": strategist})
+
+    indexer = Indexer(":memory:", batch=50)
+    indexer.add_factory(factory, factory.tx.block_number)
+    assert indexer.sync() == 2 + len(harvest.events["Leverage"]) + 1
+    assert indexer.strategies(factory) == [
+        strategy.address.lower(),
+        clone.address.lower(),
+    ]
+    totals = indexer.totals(strategy)
+    assert totals["harvests"] == 1
+    assert totals["flash_mints"] == len(harvest.events["Leverage"])
+    assert totals["dai"] == sum(
+        event["requiredDAI"] for event in harvest.events["Leverage"]
+    )
+
+    # profits of the next harvest only
+    chain.sleep(24 * 3600)
+    chain.mine(10)
+    harvest = strategy.harvest({"from": strategist})
+    assert indexer.sync() == 1 + len(harvest.events["Leverage"])
+    profit = harvest.events["Harvested"]["profit"]
+    assert sum(row[3] for row in indexer.profit_and_loss(strategy)) == profit
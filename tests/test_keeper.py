@@ -0,0 +1,34 @@
+import asyncio
+
+from brownie import Strategy
+from scripts.keeper import Keeper
+from utils import actions
+
+
+def test_keeper_cycle(
+    chain, gov, token, vault, factory, deploy_vault, strategy, user, amount, strategist
+):
+    # a funded original and an empty clone in its own vault
+    other_vault = deploy_vault(token)
+    tx = factory.cloneLevAave(other_vault, {"from": strategist})
+    clone = Strategy.at(tx.events["Cloned"]["clone"])
+    other_vault.addStrategy(clone, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    actions.user_deposit(user, vault, token, amount)
+    chain.sleep(1)
+    chain.mine()
+
+    keeper = Keeper(factory, strategist, concurrency=2)
+    report = asyncio.run(keeper.cycle())
+
+    assert set(keeper.strategies) == {strategy.address, clone.address}
+    assert report.checked == 2
+    assert report.harvested == [strategy.address]
+    assert report.errors == {}
+    assert report.duration > 0
+    assert strategy.estimatedTotalAssets() > 0
+    assert clone.estimatedTotalAssets() == 0
+
+    # nothing new to discover, nothing left to do
+    report = asyncio.run(keeper.cycle())
+    assert report.checked == 2
+    assert report.harvested == [] and report.tended == []
@@ -0,0 +1,129 @@
+import brownie
+import pytest
+from utils import actions, utils
+from utils.mocks import reserve_configs, reserve_configuration
+from utils.tokens import token_prices
+
+
+@pytest.fixture(autouse=True)
+def only_local(local_aave):
+    if local_aave is None:
+        pytest.skip("the mocks only replace aave on a local chain")
+
+
+def test_flash_mint_lever_up_and_down(
+    chain, token, vault, strategy, user, strategist, amount, local_aave, RELATIVE_APPROX
+):
+    actions.user_deposit(user, vault, token, amount)
+
+    chain.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    assert "Leverage" in tx.events
+    assert (
+        pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-3)
+        == strategy.targetCollatRatio()
+    )
+    # the flash minted dai is back with the lender and burnt
+    dai = local_aave.tokens["DAI"]
+    assert dai.balanceOf(local_aave.lender) == 0
+    assert dai.balanceOf(strategy) == 0 or token == dai
+
+    utils.sleep(1)
+    vault.withdraw({"from": user})
+    assert pytest.approx(token.balanceOf(user), rel=RELATIVE_APPROX) == amount
+
+
+def test_lever_up_within_own_collateral_skips_flash_mint(
+    chain, gov, token, vault, strategy, user, strategist, amount
+):
+    strategy.setCollateralTargets(
+        0.3 * 1e18,
+        strategy.maxCollatRatio(),
+        strategy.maxBorrowCollatRatio(),
+        strategy.daiBorrowCollatRatio(),
+        {"from": gov},
+    )
+    actions.user_deposit(user, vault, token, amount)
+
+    chain.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    assert "Leverage" not in tx.events
+    assert pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-3) == 0.3 * 1e18
+    assert token.balanceOf(strategy) == 0
+
+
+def test_dai_flash_mint_below_max_borrow(
+    chain, gov, token, vault, strategy, user, strategist, amount, local_aave
+):
+    if token != local_aave.tokens["DAI"]:
+        pytest.skip("the minted DAI is only the collateral of a DAI want")
+    # own collateral covers part of the borrow, the minted DAI still backs all of it
+    strategy.setCollateralTargets(
+        0.5 * 1e18,
+        strategy.maxCollatRatio(),
+        strategy.maxBorrowCollatRatio(),
+        strategy.daiBorrowCollatRatio(),
+        {"from": gov},
+    )
+    actions.user_deposit(user, vault, token, amount)
+
+    chain.sleep(1)
+    tx = strategy.harvest({"from": strategist})
+    leverage = tx.events["Leverage"]
+    assert leverage["requiredDAI"] >= leverage["amountUsed"]
+    assert pytest.approx(strategy.getCurrentCollatRatio(), rel=1e-3) == 0.5 * 1e18
+
+    utils.sleep(1)
+    vault.withdraw({"from": user})
+    assert pytest.approx(token.balanceOf(user), rel=1e-5) == amount
+
+
+def test_pool_health_checks(token, user, amount, local_aave):
+    pool = local_aave.pool
+    token.approve(pool, amount, {"from": user})
+    pool.deposit(token, amount, user, 0, {"from": user})
+
+    (collateral, _, available, _, ltv, _) = pool.getUserAccountData(user)
+    assert available == collateral * ltv // 10_000
+
+    with brownie.reverts("11"):
+        pool.borrow(token, amount, 2, 0, user, {"from": user})
+
+    pool.borrow(token, amount * ltv // 10_000 * 99 // 100, 2, 0, user, {"from": user})
+    with brownie.reverts("6"):
+        pool.withdraw(token, amount // 2, user, {"from": user})
+
+
+def test_price_shock_moves_health_factor(token, user, amount, local_aave):
+    if token == local_aave.tokens["DAI"]:
+        pytest.skip("want and debt are the same asset")
+    pool = local_aave.pool
+    dai = local_aave.tokens["DAI"]
+    token.approve(pool, amount, {"from": user})
+    pool.deposit(token, amount, user, 0, {"from": user})
+    available = pool.getUserAccountData(user)[2]
+    # borrow dai against want, then halve the price of want
+    dai_price = local_aave.oracle.getAssetPrice(dai)
+    pool.borrow(dai, available * 10 ** 18 // dai_price, 2, 0, user, {"from": user})
+
+    symbol = token.symbol()
+    local_aave.set_price(symbol, token_prices[symbol] / 2)
+    assert pool.getUserAccountData(user)[5] < 10 ** 18
+
+
+def test_collat_ratios_are_read_from_aave(token, levered, strategist, local_aave):
+    vault, strategy, amount = levered
+    strategy.setDebtThreshold(amount, {"from": strategist})  # prevent harvestTrigger
+    assert not strategy.tendTrigger(0)
+
+    # the liquidation threshold drops right under the position
+    (ltv, _, bonus, decimals) = reserve_configs[token.symbol()]
+    threshold = strategy.getCurrentCollatRatio() // 10 ** 14
+    local_aave.pool.setConfiguration(
+        token,
+        reserve_configuration(min(ltv, threshold), threshold, bonus, decimals),
+        local_aave.tx,
+    )
+    assert strategy.tendTrigger(0)
+    snapshot = strategy.getPositionSnapshot().dict()
+    assert snapshot["liquidationThreshold"] == threshold * 10 ** 14
@@ -1,19 +1,13 @@
 import brownie
-from brownie import Contract, test
+from brownie import Contract, interface, test
 import pytest
 from utils import actions, checks, utils
 
 
-def test_operation(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
-):
-    # Deposit to the vault
-    user_balance_before = token.balanceOf(user)
-    actions.user_deposit(user, vault, token, amount)
-
-    # harvest
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+def test_operation(chain, accounts, token, levered, user, strategist, RELATIVE_APPROX):
+    # Deposited and harvested
+    vault, strategy, amount = levered
+    user_balance_before = token.balanceOf(user) + amount
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     utils.strategy_status(vault, strategy)
@@ -33,25 +27,20 @@ def test_operation(
     )
 
 
+@pytest.mark.parametrize("flash_mint", [True, False], indirect=True)
 def test_withdraw(
     chain,
     token,
-    vault,
-    strategy,
-    flashloans_active,
+    levered,
+    flash_mint,
     user,
     strategist,
-    amount,
     gov,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault
+    # Deposited and harvested
+    vault, strategy, amount = levered
     user_balance_before = token.balanceOf(user)
-    actions.user_deposit(user, vault, token, amount)
-
-    # harvest
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     utils.sleep(1 * 24 * 3600)
@@ -61,7 +50,7 @@ def test_withdraw(
     utils.sleep()
 
     # remove this statement
-    if not flashloans_active:
+    if not flash_mint:
         strategy.setCollateralTargets(
             strategy.maxBorrowCollatRatio() - (0.02 * 1e18),
             strategy.maxCollatRatio(),
@@ -75,13 +64,13 @@ def test_withdraw(
         print(i)
         utils.strategy_status(vault, strategy)
         vault.withdraw(int(amount / 10), user, 10_000, {"from": user})
-        assert token.balanceOf(user) >= user_balance_before * i / 10
+        assert token.balanceOf(user) - user_balance_before >= amount * i / 10
 
     utils.sleep(1)
     strategy.harvest({"from": strategist})
     utils.sleep()
     vault.withdraw(int(amount / 10), {"from": user})
-    assert token.balanceOf(user) > user_balance_before
+    assert token.balanceOf(user) - user_balance_before > amount
     utils.strategy_status(vault, strategy)
 
 
@@ -91,14 +80,16 @@ def test_apr(
     accounts,
     gov,
     token,
-    vault,
-    strategy,
+    levered,
     user,
     strategist,
-    amount,
     swap_router,
     RELATIVE_APPROX,
 ):
+    # Deposited and harvested
+    vault, strategy, amount = levered
+    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+
     strategy.setRewardBehavior(
         swap_router,
         strategy.sellStkAave(),
@@ -111,14 +102,6 @@ def test_apr(
         {"from": gov},
     )
 
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-
-    # harvest
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     utils.sleep(7 * 24 * 3600)
 
     vault.revokeStrategy(strategy.address, {"from": gov})
@@ -133,15 +116,14 @@ def test_apr_with_cooldown(
     accounts,
     gov,
     token,
-    vault,
-    strategy,
+    levered,
     user,
     strategist,
-    amount,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
+    # Deposited and harvested, nothing to claim yet
+    vault, strategy, amount = levered
+    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # Don't sell stkAave, cool it down
     strategy.setRewardBehavior(
@@ -156,11 +138,6 @@ def test_apr_with_cooldown(
         {"from": gov},
     )
 
-    # harvest
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
     utils.sleep(7 * 24 * 3600)
     vault.revokeStrategy(strategy.address, {"from": gov})
     strategy.harvest({"from": strategist})
@@ -174,14 +151,10 @@ def test_apr_with_cooldown(
 
 
 def test_harvest_after_long_idle_period(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
+    chain, accounts, token, levered, user, strategist, RELATIVE_APPROX
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-
-    # harvest
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Deposited and harvested
+    vault, strategy, amount = levered
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     utils.strategy_status(vault, strategy)
@@ -195,12 +168,10 @@ def test_harvest_after_long_idle_period(
 
 
 def test_emergency_exit(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
+    chain, accounts, token, levered, user, strategist, RELATIVE_APPROX
 ):
-    # Deposit to the vault
-    actions.user_deposit(user, vault, token, amount)
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Deposited and harvested
+    vault, strategy, amount = levered
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # set emergency and exit
@@ -255,19 +226,14 @@ def test_decrease_debt_ratio(
     chain,
     gov,
     token,
-    vault,
-    strategy,
+    levered,
     user,
     strategist,
-    amount,
     ending_debt_ratio,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault and harvest
-    actions.user_deposit(user, vault, token, amount)
-    vault.updateStrategyDebtRatio(strategy.address, 10_000, {"from": gov})
-    utils.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Deposited and harvested with a 100% debt ratio
+    vault, strategy, amount = levered
 
     utils.strategy_status(vault, strategy)
 
@@ -288,13 +254,10 @@ def test_decrease_debt_ratio(
 
 
 def test_large_deleverage(
-    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
+    chain, gov, token, levered, user, strategist, RELATIVE_APPROX
 ):
-    # Deposit to the vault and harvest
-    actions.user_deposit(user, vault, token, amount)
-    vault.updateStrategyDebtRatio(strategy.address, 10_000, {"from": gov})
-    utils.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Deposited and harvested with a 100% debt ratio
+    vault, strategy, amount = levered
 
     utils.strategy_status(vault, strategy)
 
@@ -312,13 +275,10 @@ def test_large_deleverage(
 
 
 def test_larger_deleverage(
-    chain, gov, token, vault, strategy, user, strategist, big_amount, RELATIVE_APPROX
+    chain, gov, token, big_levered, user, strategist, RELATIVE_APPROX
 ):
-    # Deposit to the vault and harvest
-    actions.user_deposit(user, vault, token, big_amount)
-    vault.updateStrategyDebtRatio(strategy.address, 10_000, {"from": gov})
-    utils.sleep(1)
-    strategy.harvest({"from": strategist})
+    # Deposited and harvested with a 100% debt ratio
+    vault, strategy, big_amount = big_levered
 
     utils.strategy_status(vault, strategy)
 
@@ -372,16 +332,14 @@ def test_triggers(chain, gov, vault, strategy, token, amount, user, strategist):
     strategy.tendTrigger(0)
 
 
-def test_tend(
-    chain, gov, vault, strategy, token, amount, user, strategist, RELATIVE_APPROX
-):
-    # Deposit to the vault and harvest
-    actions.user_deposit(user, vault, token, amount)
-    chain.sleep(1)
-    strategy.harvest({"from": strategist})
+def test_tend(chain, gov, levered, token, user, strategist, RELATIVE_APPROX):
+    # Deposited and harvested
+    vault, strategy, amount = levered
 
     liquidationThreshold = (
-        Contract("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")  # ProtocolDataProvider
+        interface.IProtocolDataProvider(
+            "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+        )  # ProtocolDataProvider
         .getReserveConfigurationData(token)
         .dict()["liquidationThreshold"]
     )
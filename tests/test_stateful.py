@@ -0,0 +1,144 @@
+import pytest
+from brownie import accounts, chain
+from brownie.test import strategy as st
+from utils import actions
+from utils.mocks import reserve_configs
+from utils.tokens import token_prices
+
+
+@pytest.fixture(autouse=True)
+def only_local(local_aave):
+    if local_aave is None:
+        pytest.skip("thousands of examples only run against the local stand-ins")
+
+
+class StrategyStateMachine:
+    # shares of a balance, in bps
+    st_bps = st("uint256", min_value=1, max_value=10_000)
+    st_over_bps = st("uint256", min_value=1, max_value=12_000)
+    # oracle price moves, in bps of the current price
+    st_move_bps = st("int256", min_value=-2_000, max_value=2_000)
+    st_bool = st("bool")
+    st_depositor = st("uint256", max_value=1)
+
+    def __init__(cls, local_aave, token, vault, strategy, keeper, gov, depositors):
+        cls.local_aave = local_aave
+        cls.token = token
+        cls.vault = vault
+        cls.strategy = strategy
+        cls.keeper = keeper
+        cls.gov = gov
+        cls.depositors = depositors
+        # only the vault can call liquidatePosition, through strategy.withdraw
+        cls.vault_account = accounts.at(vault.address, force=True)
+        cls.symbol = token.symbol()
+        cls.liquidation_threshold = reserve_configs[cls.symbol][1] * 10 ** 14
+        for depositor in depositors:
+            token.approve(vault, 2 ** 256 - 1, {"from": depositor})
+
+    def setup(self):
+        # the chain is reverted between examples, and so are the oracle prices
+        self.prices = {s: token_prices[s] for s in {self.symbol, "DAI"}}
+        self.net_deposits = 0
+        # liquidatePosition may drop up to minWant per withdrawal as a loss
+        self.dust = 0
+
+    def rule_deposit(self, depositor="st_depositor", bps="st_bps"):
+        depositor = self.depositors[depositor]
+        amount = self.token.balanceOf(depositor) * bps // 10_000
+        if amount == 0:
+            return
+        self.vault.deposit(amount, {"from": depositor})
+        self.net_deposits += amount
+
+    def rule_withdraw(self, depositor="st_depositor", bps="st_bps"):
+        depositor = self.depositors[depositor]
+        shares = self.vault.balanceOf(depositor) * bps // 10_000
+        if shares == 0:
+            return
+        before = self.token.balanceOf(depositor)
+        self.vault.withdraw(shares, depositor, 10_000, {"from": depositor})
+        self.net_deposits -= self.token.balanceOf(depositor) - before
+        self.dust += self.strategy.minWant()
+
+    def rule_harvest(self):
+        chain.sleep(1)
+        self.strategy.harvest({"from": self.keeper})
+
+    def rule_tend(self):
+        self.strategy.tend({"from": self.keeper})
+
+    def rule_liquidate(self, bps="st_over_bps"):
+        # up to 20% more than the strategy has, so the loss branch runs too
+        amount = self.strategy.estimatedTotalAssets() * bps // 10_000
+        before = self.token.balanceOf(self.vault)
+        tx = self.strategy.withdraw(amount, {"from": self.vault_account})
+        freed = self.token.balanceOf(self.vault) - before
+        assert freed + tx.return_value <= amount
+        # the vault never booked it, hand the want back to the strategy
+        self.token.transfer(self.strategy, freed, {"from": self.vault_account})
+        self.dust += self.strategy.minWant()
+
+    def rule_set_collateral_targets(self, target_bps="st_bps", max_bps="st_bps"):
+        threshold = self.liquidation_threshold
+        target = (threshold - 2) * target_bps // 10_000
+        max_ratio = target + 1 + (threshold - target - 2) * max_bps // 10_000
+        self.strategy.setCollateralTargets(
+            target,
+            max_ratio,
+            self.strategy.maxBorrowCollatRatio(),
+            self.strategy.daiBorrowCollatRatio(),
+            {"from": self.gov},
+        )
+
+    def rule_set_flash_mint(self, active="st_bool"):
+        self.strategy.setIsFlashMintActive(active, {"from": self.gov})
+
+    def rule_move_price(self, move_bps="st_move_bps", dai="st_bool"):
+        symbol = "DAI" if dai else self.symbol
+        price = self.prices[symbol] * (10_000 + move_bps) / 10_000
+        # stay within a quarter and four times the price the pool was set up at
+        price = min(max(price, token_prices[symbol] / 4), token_prices[symbol] * 4)
+        self.local_aave.set_price(symbol, price)
+        self.prices[symbol] = price
+
+    def invariant_collat_ratio_below_liquidation(self):
+        assert self.strategy.getCurrentCollatRatio() < self.liquidation_threshold
+
+    def invariant_estimated_total_assets(self):
+        # the mocks emit no rewards, so the position is all there is
+        (deposits, borrows) = self.strategy.getCurrentPosition()
+        assets = self.strategy.estimatedTotalAssets()
+        assert assets == self.token.balanceOf(self.strategy) + deposits - borrows
+
+        # leverage, flash mints and price moves neither create nor lose want
+        held = self.token.balanceOf(self.vault) + assets
+        assert abs(held - self.net_deposits) <= self.dust + self.net_deposits // 10 ** 9
+
+
+def test_stateful(
+    request,
+    state_machine,
+    local_aave,
+    token,
+    token_whale,
+    vault,
+    strategy,
+    keeper,
+    gov,
+    user,
+    amount,
+):
+    depositors = [user, accounts[6]]
+    actions.fund_from_whale(token, token_whale, depositors[1], 1_000_000)
+    state_machine(
+        StrategyStateMachine,
+        local_aave,
+        token,
+        vault,
+        strategy,
+        keeper,
+        gov,
+        depositors,
+        settings={"max_examples": request.config.getoption("--stateful-examples")},
+    )
@@ -0,0 +1,52 @@
+import pytest
+from brownie import interface
+from scripts.status import snapshot_strategies, snapshot_strategy
+
+
+def test_snapshot_matches_views(token, levered):
+    vault, strategy, amount = levered
+    snapshot = snapshot_strategy(vault, strategy)
+
+    params = vault.strategies(strategy).dict()
+    (deposits, borrows) = strategy.getCurrentPosition()
+    assert snapshot["strategy"] == strategy.address
+    assert snapshot["want"] == token.address
+    assert snapshot["decimals"] == token.decimals()
+    assert snapshot["total_debt"] == params["totalDebt"]
+    assert snapshot["debt_ratio"] == params["debtRatio"]
+    assert snapshot["estimated_total_assets"] == strategy.estimatedTotalAssets()
+    assert snapshot["loose_want"] == token.balanceOf(strategy)
+    assert (snapshot["deposits"], snapshot["borrows"]) == (deposits, borrows)
+    assert snapshot["collat_ratio"] == strategy.getCurrentCollatRatio()
+    assert snapshot["target_collat_ratio"] == strategy.targetCollatRatio()
+
+
+def test_snapshot_many_strategies(levered, big_levered):
+    positions = [levered[:2], big_levered[:2]]
+    snapshots = snapshot_strategies(positions)
+
+    assert [s["strategy"] for s in snapshots] == [p[1].address for p in positions]
+    for (vault, strategy), snapshot in zip(positions, snapshots):
+        assert snapshot["vault"] == vault.address
+        assert snapshot["total_debt"] == vault.strategies(strategy).dict()["totalDebt"]
+
+
+def test_position_snapshot_matches_getters(token, levered):
+    vault, strategy, amount = levered
+    snapshot = strategy.getPositionSnapshot().dict()
+
+    (deposits, borrows) = strategy.getCurrentPosition()
+    liquidationThreshold = (
+        interface.IProtocolDataProvider("0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d")
+        .getReserveConfigurationData(token)
+        .dict()["liquidationThreshold"]
+    )
+    assert (snapshot["deposits"], snapshot["borrows"]) == (deposits, borrows)
+    assert snapshot["collatRatio"] == strategy.getCurrentCollatRatio()
+    assert snapshot["targetCollatRatio"] == strategy.targetCollatRatio()
+    assert snapshot["maxCollatRatio"] == strategy.maxCollatRatio()
+    assert snapshot["maxBorrowCollatRatio"] == strategy.maxBorrowCollatRatio()
+    assert snapshot["liquidationThreshold"] == liquidationThreshold * 10 ** 14
+    assert snapshot["wantBalance"] == token.balanceOf(strategy)
+    assert snapshot["stkAaveBalance"] == 0
+    assert snapshot["cooldownStatus"] == 0
@@ -0,0 +1,87 @@
+import pytest
+from brownie import Contract, FlashMintLib, interface
+from scripts.simulator import Scenarios
+from scripts.stress import DAI, PROTOCOL_DATA_PROVIDER
+from scripts.withdrawal_quote import (
+    max_withdrawal,
+    quote_free_funds,
+    quote_scenarios,
+    quote_withdrawal,
+)
+
+
+@pytest.mark.parametrize("flash_mint", [True, False], indirect=True)
+def test_quote_matches_the_withdrawal(token, levered, user, flash_mint):
+    vault, strategy, amount = levered
+    quote = quote_withdrawal(vault, strategy, amount // 2)
+    assert quote.fits
+    assert (quote.flash_mints > 0) == flash_mint
+    assert (quote.iterations > 0) != flash_mint
+
+    before = token.balanceOf(user)
+    tx = vault.withdraw(vault.balanceOf(user) // 2, {"from": user})
+    assert len(tx.events["Leverage"] if "Leverage" in tx.events else []) == (
+        quote.flash_mints
+    )
+    # interest accrues in the withdrawal block
+    assert pytest.approx(token.balanceOf(user) - before, rel=1e-4) == quote.amount
+    deposits, borrows = strategy.getCurrentPosition()
+    assert pytest.approx(deposits, rel=1e-5) == quote.deposits
+    assert pytest.approx(borrows, rel=1e-5) == quote.borrows
+
+
+def test_quote_from_loose_want(token, levered, user):
+    vault, strategy, amount = levered
+    token.transfer(strategy, amount // 100, {"from": user})
+    quote = quote_free_funds(strategy, amount // 200)
+    assert quote.amount_freed == amount // 200
+    assert quote.aave_calls == quote.flash_mints == quote.iterations == 0
+
+
+@pytest.mark.parametrize("flash_mint", [False], indirect=True)
+def test_max_withdrawal_fits_the_gas_limit(gov, levered, flash_mint):
+    vault, strategy, amount = levered
+    strategy.setMinsAndMaxs(strategy.minWant(), strategy.minRatio(), 15, {"from": gov})
+    # a block about half the aave calls of a full withdrawal fit in
+    gas_limit = 4_000_000
+    assert not quote_withdrawal(vault, strategy, amount, gas_limit).fits
+    allowed = max_withdrawal(vault, strategy, gas_limit)
+    assert 0 < allowed < amount
+    assert quote_withdrawal(vault, strategy, allowed, gas_limit).fits
+
+
+@pytest.mark.parametrize("flash_mint", [True, False], indirect=True)
+def test_offline_quotes_match_quote_free_funds(token, levered, flash_mint):
+    vault, strategy, amount = levered
+    dai = Contract(DAI)
+    oracle = interface.IPriceOracle(
+        interface.ILendingPoolAddressesProvider(
+            interface.IProtocolDataProvider(PROTOCOL_DATA_PROVIDER).ADDRESSES_PROVIDER()
+        ).getPriceOracle()
+    )
+    # the levered position is a fresh deposit of amount, as in the simulator
+    scenarios = Scenarios(
+        deposit=amount,
+        target_collat_ratio=strategy.targetCollatRatio(),
+        max_borrow_collat_ratio=strategy.maxBorrowCollatRatio(),
+        max_iterations=strategy.maxIterations(),
+        is_flash_mint_active=flash_mint,
+        max_collat_ratio=strategy.maxCollatRatio(),
+        dai_borrow_collat_ratio=strategy.daiBorrowCollatRatio(),
+        min_want=strategy.minWant(),
+        min_ratio=strategy.minRatio(),
+        want_price=oracle.getAssetPrice(token),
+        dai_price=oracle.getAssetPrice(dai),
+        want_decimals=token.decimals(),
+        want_is_dai=token == dai,
+        max_liquidity=FlashMintLib[-1].maxLiquidity(),
+    )
+    offline = quote_scenarios(scenarios, amount // 2)
+    quote = quote_free_funds(strategy, amount // 2)
+    assert offline["iterations"][0] == quote.iterations
+    assert offline["flash_mints"][0] == quote.flash_mints
+    assert offline["aave_calls"][0] == quote.aave_calls
+    assert offline["gas"][0] == quote.gas
+    # interest accrued since the harvest
+    assert pytest.approx(offline["deposits"][0], rel=1e-4) == quote.deposits
+    assert pytest.approx(offline["borrows"][0], rel=1e-4) == quote.borrows
@@ -1,7 +1,22 @@
 import pytest
+from collections import namedtuple
 from brownie import accounts, chain, interface, Contract
+from utils.tokens import token_prices
 
 # This file is reserved for standard actions like deposits
+LeveredState = namedtuple("LeveredState", ["vault", "strategy", "amount"])
+
+
+def fund_from_whale(token, token_whale, user, usd):
+    amount = round(usd / token_prices[token.symbol()]) * 10 ** token.decimals()
+    # In order to get some funds for the token you are about to use,
+    # it impersonate a whale address
+    if amount > token.balanceOf(token_whale):
+        amount = token.balanceOf(token_whale)
+    token.transfer(user, amount, {"from": token_whale})
+    return amount
+
+
 def user_deposit(user, vault, token, amount):
     if token.allowance(user, vault) < amount:
         token.approve(vault, 2 ** 256 - 1, {"from": user})
@@ -17,7 +32,7 @@ def generate_profit(strategy, token_whale, amount):
             ).ADDRESSES_PROVIDER()
         ).getLendingPool()
     )
-    token = Contract(strategy.want())
+    token = interface.IERC20(strategy.want())
     token.approve(lp, 2 ** 256 - 1, {"from": token_whale})
     lp.deposit(strategy.want(), amount, strategy, 0, {"from": token_whale})
     return
@@ -31,6 +46,14 @@ def generate_loss(strategy, amount):
     return
 
 
+def set_flash_mint_cap(max_dai):
+    # DssFlash is administered by maker's pause proxy, the local mock by anyone
+    lender = Contract("0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853")
+    admin = accounts.at("0xBE8E3e3618f7474F8cB1d074A26afFef007E98FB", force=True)
+    lender.file(b"max".ljust(32, b"\0"), max_dai, {"from": admin})
+    return
+
+
 def first_deposit_and_harvest(
     vault, strategy, token, user, gov, amount, RELATIVE_APPROX
 ):
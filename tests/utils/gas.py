@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+import pytest
+
+DEFAULT_BASELINE = Path(__file__).parent.parent / "gas_baseline.json"
+
+
+class GasBaseline:
+    def __init__(
+        self, path=DEFAULT_BASELINE, threshold=0.05, update=False, worker=None
+    ):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.update = update
+        # xdist workers only write their own part, merged by the controller
+        self.worker = worker
+        self.baseline = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.results = {}
+
+    def check(self, key, tx):
+        gas_used = tx.gas_used
+        self.results[key] = gas_used
+        expected = self.baseline.get(key)
+        print(f"gas {key}: {gas_used:,} (baseline {expected})")
+        if self.update:
+            return gas_used
+        if expected is None:
+            # recorded by save, there is nothing to compare it with yet
+            pytest.skip(
+                f"{key} has no gas baseline, record it with --update-gas-baseline"
+            )
+        limit = expected * (1 + self.threshold)
+        assert (
+            gas_used <= limit
+        ), f"{key} used {gas_used:,} gas, {gas_used / expected - 1:.2%} over baseline {expected:,}"
+        return gas_used
+
+    def save(self):
+        # benchmarks missing from the baseline are recorded without the flag too
+        results = self.results
+        if not self.update:
+            results = {k: v for k, v in results.items() if k not in self.baseline}
+        if not results:
+            return
+        if self.worker:
+            part = self.path.parent / f"{self.path.stem}.{self.worker}.json"
+            part.write_text(json.dumps(results))
+            return
+        merged = {**self.baseline, **results}
+        self.path.write_text(json.dumps(dict(sorted(merged.items())), indent=2) + "\n")
+
+
+def merge_parts(path=DEFAULT_BASELINE):
+    path = Path(path)
+    merged = json.loads(path.read_text()) if path.exists() else {}
+    parts = sorted(path.parent.glob(f"{path.stem}.*.json"))
+    for part in parts:
+        merged.update(json.loads(part.read_text()))
+        part.unlink()
+    if parts:
+        path.write_text(json.dumps(dict(sorted(merged.items())), indent=2) + "\n")
+
+
+def key(*parts):
+    return "-".join(str(p) for p in parts)
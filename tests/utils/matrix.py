@@ -0,0 +1,28 @@
+from xdist.scheduler import LoadFileScheduling
+from utils.tokens import token_addresses
+
+# brownie gives every worker its own ganache on its own port, so each one
+# forks, deploys and funds from the whales on a chain of its own.
+
+
+class TokenScheduling(LoadFileScheduling):
+    """
+    Brownie's file level scheduling, with the tests of each want token of a
+    file as their own unit. The module scoped deployments and levered positions
+    of a token are then built by one worker only.
+
+    A file split over workers is still isolated: every worker runs
+    module_isolation, which resets its own chain, before the module scoped
+    fixtures of that file, and everything a test leaves on the chain is reverted
+    by fn_isolation or the next reset. No chain state outlives a module.
+    """
+
+    def _split_scope(self, nodeid):
+        module = super()._split_scope(nodeid)
+        if "[" not in nodeid:
+            return module
+        params = nodeid[nodeid.index("[") + 1 : -1].split("-")
+        for symbol in token_addresses:
+            if symbol in params:
+                return f"{module}[{symbol}]"
+        return module
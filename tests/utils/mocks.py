@@ -0,0 +1,167 @@
+from brownie import (
+    accounts,
+    web3,
+    MockAToken,
+    MockDssFlash,
+    MockERC20,
+    MockIncentivesController,
+    MockLendingPool,
+    MockLendingPoolAddressesProvider,
+    MockPriceOracle,
+    MockProtocolDataProvider,
+    MockVariableDebtToken,
+)
+from utils.tokens import token_addresses, token_prices, whale_addresses
+
+# Strategy and FlashMintLib use constant mainnet addresses, so the Aave and
+# DssFlash stand-ins are placed at those same addresses on a plain local chain.
+LENDING_POOL = "0x7d2768dE32b0b80b7a3454c06BdAc94A69DDc7A9"
+PROTOCOL_DATA_PROVIDER = "0x057835Ad21a177dbdd3090bB1CAE03EaCF78Fc6d"
+INCENTIVES_CONTROLLER = "0xd784927Ff2f95ba542BfC824c8a8a98F3495f6b5"
+DSS_FLASH = "0x1EB4CF3A948E7D72A198fe073cCb8C7a948cD853"
+AAVE = "0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9"
+STK_AAVE = "0x4da27a545c0c5B758a6BA100e3a049001de870f5"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+DSS_FLASH_MAX = 500_000_000 * 10 ** 18
+# usd worth of every token minted to its whale and deposited as pool liquidity
+WHALE_BALANCE_USD = 100_000_000
+POOL_LIQUIDITY_USD = 1_000_000_000
+
+# ltv, liquidation threshold and liquidation bonus in bps, and decimals, as on mainnet
+reserve_configs = {
+    "WBTC": (7_000, 7_500, 10_650, 8),
+    "YFI": (4_000, 5_500, 11_500, 18),
+    "WETH": (8_000, 8_250, 10_500, 18),
+    "LINK": (7_000, 7_500, 10_750, 18),
+    "USDT": (0, 0, 0, 6),
+    "DAI": (7_500, 8_000, 10_500, 18),
+    "USDC": (8_000, 8_500, 10_500, 6),
+}
+
+
+def reserve_configuration(
+    ltv, liquidation_threshold, liquidation_bonus, decimals, reserve_factor=1_000
+):
+    # bit layout of aave's ReserveConfigurationMap, active and borrowing enabled
+    return (
+        ltv
+        | liquidation_threshold << 16
+        | liquidation_bonus << 32
+        | decimals << 48
+        | 1 << 56
+        | 1 << 58
+        | reserve_factor << 64
+    )
+
+
+def set_code(address, container, template):
+    code = web3.toHex(web3.eth.get_code(template.address))
+    for method in ("hardhat_setCode", "evm_setAccountCode"):
+        if "error" not in web3.provider.make_request(method, [address, code]):
+            return container.at(address)
+    raise RuntimeError(
+        "the local chain can't set account code, use hardhat or ganache>=7"
+    )
+
+
+def token_amount(symbol, usd):
+    return round(usd / token_prices[symbol]) * 10 ** reserve_configs[symbol][3]
+
+
+class LocalAave:
+    def __init__(self, deployer):
+        self.tx = {"from": deployer}
+
+        erc20 = MockERC20.deploy(self.tx)
+        self.tokens = {}
+        for symbol, address in token_addresses.items():
+            token = set_code(address, MockERC20, erc20)
+            token.initialize(symbol, symbol, reserve_configs[symbol][3], self.tx)
+            self.tokens[symbol] = token
+        self.aave = set_code(AAVE, MockERC20, erc20)
+        self.aave.initialize("Aave Token", "AAVE", 18, self.tx)
+        self.stkAave = set_code(STK_AAVE, MockERC20, erc20)
+        self.stkAave.initialize("Staked Aave", "stkAAVE", 18, self.tx)
+
+        self.addresses_provider = MockLendingPoolAddressesProvider.deploy(self.tx)
+        self.oracle = MockPriceOracle.deploy(self.tx)
+        self.addresses_provider.setPriceOracle(self.oracle, self.tx)
+
+        self.pool = set_code(
+            LENDING_POOL, MockLendingPool, MockLendingPool.deploy(self.tx)
+        )
+        self.pool.initialize(self.addresses_provider, self.tx)
+        self.addresses_provider.setLendingPoolImpl(self.pool, self.tx)
+
+        self.data_provider = set_code(
+            PROTOCOL_DATA_PROVIDER,
+            MockProtocolDataProvider,
+            MockProtocolDataProvider.deploy(self.tx),
+        )
+        self.data_provider.initialize(self.addresses_provider, self.tx)
+
+        self.incentives_controller = set_code(
+            INCENTIVES_CONTROLLER,
+            MockIncentivesController,
+            MockIncentivesController.deploy(self.tx),
+        )
+
+        self.lender = set_code(DSS_FLASH, MockDssFlash, MockDssFlash.deploy(self.tx))
+        self.lender.initialize(self.tokens["DAI"], self.tx)
+        self.lender.file(b"max".ljust(32, b"\0"), DSS_FLASH_MAX, self.tx)
+
+        for symbol in self.tokens:
+            self.set_price(symbol, token_prices[symbol])
+            self.add_reserve(symbol)
+            self.fund(symbol, whale_addresses[symbol], WHALE_BALANCE_USD)
+            accounts.at(whale_addresses[symbol], force=True)
+
+    def add_reserve(self, symbol):
+        token = self.tokens[symbol]
+        decimals = reserve_configs[symbol][3]
+
+        a_token = MockAToken.deploy(self.tx)
+        a_token.initialize(
+            self.pool,
+            ZERO_ADDRESS,
+            token,
+            self.incentives_controller,
+            decimals,
+            f"Aave interest bearing {symbol}",
+            f"a{symbol}",
+            b"",
+            self.tx,
+        )
+        debt_token = MockVariableDebtToken.deploy(self.tx)
+        debt_token.initialize(
+            self.pool,
+            token,
+            self.incentives_controller,
+            decimals,
+            f"Aave variable debt bearing {symbol}",
+            f"variableDebt{symbol}",
+            self.tx,
+        )
+        self.pool.initReserve(
+            token, a_token, ZERO_ADDRESS, debt_token, ZERO_ADDRESS, self.tx
+        )
+        self.pool.setConfiguration(
+            token, reserve_configuration(*reserve_configs[symbol]), self.tx
+        )
+
+        # other lenders, so the strategy can borrow more than it deposited
+        liquidity = token_amount(symbol, POOL_LIQUIDITY_USD)
+        token.mint(self.tx["from"], liquidity, self.tx)
+        token.approve(self.pool, liquidity, self.tx)
+        self.pool.deposit(token, liquidity, self.tx["from"], 0, self.tx)
+
+    def fund(self, symbol, to, usd):
+        amount = token_amount(symbol, usd)
+        self.tokens[symbol].mint(to, amount, self.tx)
+        return amount
+
+    def set_price(self, symbol, usd):
+        # aave v2 oracle prices are quoted in eth
+        price = int(usd * 10 ** 18 / token_prices["WETH"])
+        self.oracle.setAssetPrice(self.tokens[symbol], price, self.tx)
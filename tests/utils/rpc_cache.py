@@ -0,0 +1,166 @@
+import fcntl
+import gzip
+import json
+import os
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# ganache forks from a local proxy instead of the node provider: when recording
+# every answer is stored, when replaying they are served from the file and the
+# node provider is never contacted. The fork block is pinned, so the state
+# ganache asks for is the same in every session.
+DEFAULT_CASSETTE = Path(__file__).parent.parent / "rpc_cache.json.gz"
+
+# these depend on the head of the chain, not on the pinned block
+UNCACHEABLE = {"eth_blockNumber", "eth_gasPrice", "eth_syncing"}
+
+
+class RPCCacheMiss(Exception):
+    pass
+
+
+def _key(request):
+    return json.dumps([request["method"], request.get("params", [])], sort_keys=True)
+
+
+class RPCCache:
+    def __init__(self, path=DEFAULT_CASSETTE, mode="replay", upstream=None, block=None):
+        assert mode in ("record", "replay")
+        self.path = Path(path)
+        self.mode = mode
+        self.upstream = upstream
+        self.responses = {}
+        self.explorer = {}
+        self.misses = []
+        self.block = block
+        if self.path.exists():
+            data = json.loads(gzip.decompress(self.path.read_bytes()))
+            if block in (None, data["block"]):
+                self.responses = data["responses"]
+                self.explorer = data["explorer"]
+                self.block = data["block"]
+        if mode == "replay" and not self.path.exists():
+            raise RPCCacheMiss(f"no RPC cache at {self.path}, record one first")
+        if mode == "record" and (upstream is None or self.block is None):
+            raise ValueError("recording needs the upstream url and a fork block")
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def fork(self):
+        # ganache's --fork value
+        return f"{self.url}@{self.block}"
+
+    def handle(self, request):
+        key = _key(request)
+        if key in self.responses:
+            return {"jsonrpc": "2.0", "id": request.get("id"), **self.responses[key]}
+        if self.mode == "replay":
+            self.misses.append(key)
+            return {
+                "jsonrpc": "2.0",
+                "id": request.get("id"),
+                "error": {
+                    "code": -32000,
+                    "message": f"RPC cache miss, {key} was never recorded in "
+                    f"{self.path}. Record again with --rpc-cache record",
+                },
+            }
+
+        response = self._forward(request)
+        if "error" not in response and request["method"] not in UNCACHEABLE:
+            with self._lock:
+                self.responses[key] = {"result": response["result"]}
+        return response
+
+    def wrap_explorer(self, fetch):
+        # brownie's `_fetch_from_explorer`, used by `autofetch_sources`
+        def cached_fetch(address, action, silent):
+            key = f"{action}:{address.lower()}"
+            if key not in self.explorer:
+                if self.mode == "replay":
+                    self.misses.append(key)
+                    raise RPCCacheMiss(
+                        f"explorer response {key} was never recorded in {self.path}"
+                    )
+                self.explorer[key] = fetch(address, action, silent)
+            return self.explorer[key]
+
+        return cached_fetch
+
+    def _forward(self, request):
+        body = json.dumps(request).encode()
+        upstream = urllib.request.Request(
+            self.upstream, body, {"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(upstream, timeout=60) as response:
+            return json.loads(response.read())
+
+    def start(self):
+        cache = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                request = json.loads(self.rfile.read(length))
+                if isinstance(request, list):
+                    response = [cache.handle(r) for r in request]
+                else:
+                    response = cache.handle(request)
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        if self.mode == "record":
+            self.save()
+
+    def save(self):
+        # xdist workers merge one at a time with what the others recorded, and
+        # the file is only ever replaced whole
+        with open(self.path.with_suffix(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = {"block": self.block, "responses": {}, "explorer": {}}
+            if self.path.exists():
+                data = json.loads(gzip.decompress(self.path.read_bytes()))
+            if data["block"] != self.block:
+                # responses of another fork block are stale
+                data = {"block": self.block, "responses": {}, "explorer": {}}
+            data["responses"].update(self.responses)
+            data["explorer"].update(self.explorer)
+            data = json.dumps(
+                data,
+                sort_keys=True,
+                separators=(",", ":"),
+            )
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(gzip.compress(data.encode(), mtime=0))
+            os.replace(tmp, self.path)
+
+
+def fork_upstream(networks, network_id):
+    # brownie's fork setting is either an url or the id of the network to fork
+    fork = networks[network_id]["cmd_settings"]["fork"]
+    if fork in networks:
+        fork = networks[fork]["host"]
+    return os.path.expandvars(fork.split("@")[0])
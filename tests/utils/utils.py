@@ -1,5 +1,6 @@
 import brownie
 from brownie import interface, chain, Contract
+from scripts.status import snapshot_strategies, snapshot_strategy
 
 
 def vault_status(vault):
@@ -11,28 +12,31 @@ def vault_status(vault):
 
 
 def strategy_status(vault, strategy):
-    status = vault.strategies(strategy).dict()
-    (lend, borrow) = strategy.getCurrentPosition()
-    ratio = strategy.getCurrentCollatRatio()
-    print(f"--- Strategy {strategy.name()} ---")
-    print(f"Performance fee {status['performanceFee']}")
-    print(f"Debt Ratio {status['debtRatio']}")
-    print(f"Total Debt {to_units(vault, status['totalDebt'])}")
-    print(f"Total Gain {to_units(vault, status['totalGain'])}")
-    print(f"Total Loss {to_units(vault, status['totalLoss'])}")
-    print(f"Estimated Total Assets {to_units(vault, strategy.estimatedTotalAssets())}")
-    print(
-        f"Estimated Total Rewards {to_units(vault, strategy.estimatedRewardsInWant())}"
-    )
-    print(
-        f"Loose Want {to_units(vault, Contract(strategy.want()).balanceOf(strategy))}"
-    )
-    print(f"Current Lend {to_units(vault, lend)}")
-    print(f"Current Borrow {to_units(vault, borrow)}")
-    print(f"Current LTV Ratio {ratio/1e18:.4f}")
-    print(f"Target LTV Ratio {strategy.targetCollatRatio()/1e18:.4f}")
-    print(f"Max LTV Ratio {strategy.maxCollatRatio()/1e18:.4f}")
-    print(f"Max Borrow LTV Ratio {strategy.maxBorrowCollatRatio()/1e18:.4f}")
+    print_strategy_status(snapshot_strategy(vault, strategy))
+
+
+def strategies_status(positions):
+    for snapshot in snapshot_strategies(positions):
+        print_strategy_status(snapshot)
+
+
+def print_strategy_status(snapshot):
+    units = 10 ** snapshot["decimals"]
+    print(f"--- Strategy {snapshot['name']} ---")
+    print(f"Performance fee {snapshot['performance_fee']}")
+    print(f"Debt Ratio {snapshot['debt_ratio']}")
+    print(f"Total Debt {snapshot['total_debt'] / units}")
+    print(f"Total Gain {snapshot['total_gain'] / units}")
+    print(f"Total Loss {snapshot['total_loss'] / units}")
+    print(f"Estimated Total Assets {snapshot['estimated_total_assets'] / units}")
+    print(f"Estimated Total Rewards {snapshot['estimated_rewards'] / units}")
+    print(f"Loose Want {snapshot['loose_want'] / units}")
+    print(f"Current Lend {snapshot['deposits'] / units}")
+    print(f"Current Borrow {snapshot['borrows'] / units}")
+    print(f"Current LTV Ratio {snapshot['collat_ratio']/1e18:.4f}")
+    print(f"Target LTV Ratio {snapshot['target_collat_ratio']/1e18:.4f}")
+    print(f"Max LTV Ratio {snapshot['max_collat_ratio']/1e18:.4f}")
+    print(f"Max Borrow LTV Ratio {snapshot['max_borrow_collat_ratio']/1e18:.4f}")
 
 
 def to_units(token, amount):